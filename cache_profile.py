@@ -0,0 +1,104 @@
+import discord
+import importlib
+import logging
+import os
+from typing import Iterable, Set
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+# Cogs declare what they need with module-level attributes:
+#   REQUIRED_INTENTS = ("members", "presences")   gateway intents on top of the defaults
+#   MEMBER_CACHE = ("voice",)                     member cache flags
+#   MESSAGE_CACHE = 200                           size of the message cache they rely on
+#   CHUNK_GUILDS = (GUILD_ID,)                    guilds whose member list must be fully loaded
+#
+# CACHE_PROFILE=tuned (default) only enables what the loaded cogs declare;
+# CACHE_PROFILE=full keeps the historical everything-on configuration.
+#
+# With the current cogs, tuned still needs members and message_content;
+# presences is only requested when DEF_ONLINE_COUNTS=1 (see startguild.py).
+# The other savings come from the member cache flags, chunking only
+# CHUNK_GUILDS, and the message cache, disabled unless a cog declares one.
+CACHE_PROFILE = os.getenv("CACHE_PROFILE", "tuned").lower()
+
+
+class CacheProfile:
+    def __init__(self, extensions: Iterable[str], base_intents: Iterable[str] = ()):
+        self.intents: Set[str] = set(base_intents)
+        self.member_cache: Set[str] = set()
+        self.message_cache = 0
+        self.chunk_guilds: Set[int] = set()
+
+        for extension in extensions:
+            try:
+                module = importlib.import_module(extension)
+            except Exception:
+                logger.exception(f"Could not read cache requirements of {extension}")
+                continue
+            self.intents.update(getattr(module, "REQUIRED_INTENTS", ()))
+            self.member_cache.update(getattr(module, "MEMBER_CACHE", ()))
+            self.message_cache = max(self.message_cache, getattr(module, "MESSAGE_CACHE", 0))
+            self.chunk_guilds.update(getattr(module, "CHUNK_GUILDS", ()))
+
+    def build_intents(self) -> discord.Intents:
+        intents = discord.Intents.default()
+        if CACHE_PROFILE == "full":
+            intents.message_content = intents.members = intents.presences = True
+            return intents
+        for name in self.intents:
+            setattr(intents, name, True)
+        return intents
+
+    def bot_options(self) -> dict:
+        """Keyword arguments for the Bot constructor."""
+        intents = self.build_intents()
+        if CACHE_PROFILE == "full":
+            return {"intents": intents}
+
+        member_cache = discord.MemberCacheFlags.none()
+        member_cache.joined = intents.members
+        member_cache.voice = "voice" in self.member_cache and intents.voice_states
+        return {
+            "intents": intents,
+            "member_cache_flags": member_cache,
+            "max_messages": self.message_cache or None,
+            # Only the guilds that need a full member list are chunked, after login
+            "chunk_guilds_at_startup": False,
+        }
+
+    async def chunk_required_guilds(self, bot):
+        """Load the member list of the guilds the cogs declared."""
+        if CACHE_PROFILE == "full":
+            return
+        for guild_id in self.chunk_guilds:
+            guild = bot.get_guild(guild_id)
+            if guild and not guild.chunked:
+                await guild.chunk()
+
+
+def resident_memory_mb() -> float:
+    """Current RSS of the process in MiB (peak RSS where /proc isn't available)."""
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    if resource is None:
+        return 0.0
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def cache_report(bot) -> str:
+    members = sum(len(guild.members) for guild in bot.guilds)
+    messages = len(bot.cached_messages)
+    return (
+        f"Cache profile '{CACHE_PROFILE}': {len(bot.guilds)} guilds, {members} cached members, "
+        f"{messages} cached messages, RSS {resident_memory_mb():.1f} MiB"
+    )
@@ -3,6 +3,8 @@ from discord.ext import commands
 from discord import app_commands
 import logging
 
+logger = logging.getLogger(__name__)
+
 class Admin(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
@@ -17,7 +19,7 @@ class Admin(commands.Cog):
             self.blocked_users[guild_id].add(user.id)
             await interaction.response.send_message(f"{user.name} will no longer be greeted by the bot.")
         except Exception as e:
-            logging.exception("Error in block_user command")
+            logger.exception("Error in block_user command")
             await interaction.response.send_message("An error occurred while processing your command.")
 
     @app_commands.command(name="unblock_user", description="Unblock the bot from greeting a user")
@@ -30,7 +32,7 @@ class Admin(commands.Cog):
             else:
                 await interaction.response.send_message(f"{user.name} was not blocked.")
         except Exception as e:
-            logging.exception("Error in unblock_user command")
+            logger.exception("Error in unblock_user command")
             await interaction.response.send_message("An error occurred while processing your command.")
 
     @app_commands.command(name="addme", description="Add the bot to a server")
@@ -38,7 +40,7 @@ class Admin(commands.Cog):
         try:
             await interaction.response.send_message('Use this link to add me to your server: <invite_link>')
         except Exception as e:
-            logging.exception("Error in addme command")
+            logger.exception("Error in addme command")
             await interaction.response.send_message("An error occurred while processing your command.")
 
 async def setup(bot):
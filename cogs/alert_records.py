@@ -0,0 +1,86 @@
+import re
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+import discord
+
+# Patterns are compiled once at import; every alert/notification goes through them.
+INITIATOR_PATTERN = re.compile(r"<@!?(?P<user_id>\d+)>\*\* a déclenché une alerte pour \*\*(?P<guild>.+?)\*\*")
+NOTE_PATTERN = re.compile(r"^- \*\*(?P<author>.+?)\*\*: (?P<content>.*)$", re.MULTILINE)
+STATUS_PATTERN = re.compile(r"marquée comme \*\*(?P<status>[^*]+)\*\* par <@!?(?P<user_id>\d+)>")
+ATTACKER_PATTERN = re.compile(r"(?:attacker|attaquant|guilde attaquante)\s*:\s*(?P<attacker>[^\n,;—]+)", re.IGNORECASE)
+NOTIFICATION_PATTERN = re.compile(r"\b(?P<key>attacker|outcome)\s*:\s*(?P<value>\w+)", re.IGNORECASE)
+
+# Status labels shown on the alert embed and their normalised outcome
+STATUS_OUTCOMES = {"Gagnée": "Win", "Perdue": "Loss"}
+
+
+@dataclass
+class AlertNote:
+    author_name: str
+    content: str
+    author_id: Optional[int] = None
+    created_at: Optional[float] = None
+
+
+@dataclass
+class AlertRecord:
+    """Structured view of a defense alert posted by GuildPingView."""
+    message_id: int
+    channel_id: int
+    guild_name: str
+    created_at: float
+    initiator_id: Optional[int] = None
+    attacker: Optional[str] = None
+    outcome: Optional[str] = None
+    resolved_by: Optional[int] = None
+    resolved_at: Optional[float] = None
+    first_response_at: Optional[float] = None
+    notes: List[AlertNote] = field(default_factory=list)
+
+
+def parse_notification(content: str) -> dict:
+    """Extract the Attacker/Outcome tags of a notification in a single pass."""
+    values = {}
+    for match in NOTIFICATION_PATTERN.finditer(content):
+        values.setdefault(match.group("key").lower(), match.group("value"))
+    outcome = values.get("outcome", "").capitalize()
+    return {
+        "attacker": values.get("attacker", "Unknown"),
+        "outcome": outcome if outcome in ("Win", "Loss") else "Not Specified",
+    }
+
+
+def parse_attacker(text: str) -> Optional[str]:
+    """Return the attacking guild mentioned in a note, if any."""
+    match = ATTACKER_PATTERN.search(text)
+    return match.group("attacker").strip() if match else None
+
+
+def parse_alert_message(message: discord.Message) -> Optional[AlertRecord]:
+    """Rebuild an AlertRecord from the embed of an alert message."""
+    if not message.embeds:
+        return None
+    embed = message.embeds[0]
+    initiator = INITIATOR_PATTERN.search(embed.description or "")
+    if not initiator:
+        return None
+
+    record = AlertRecord(
+        message_id=message.id,
+        channel_id=message.channel.id,
+        guild_name=initiator.group("guild"),
+        created_at=message.created_at.timestamp(),
+        initiator_id=int(initiator.group("user_id")),
+    )
+    for embed_field in embed.fields:
+        if embed_field.name == "📝 Notes":
+            for note in NOTE_PATTERN.finditer(embed_field.value):
+                record.notes.append(AlertNote(author_name=note.group("author"), content=note.group("content")))
+                record.attacker = record.attacker or parse_attacker(note.group("content"))
+        elif embed_field.name == "Statut":
+            status = STATUS_PATTERN.search(embed_field.value)
+            if status:
+                record.outcome = STATUS_OUTCOMES.get(status.group("status"), status.group("status"))
+                record.resolved_by = int(status.group("user_id"))
+    return record
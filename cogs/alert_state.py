@@ -0,0 +1,161 @@
+import discord
+import asyncio
+import logging
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+NOTES_FIELD = "📝 Notes"
+STATUS_FIELD = "Statut"
+SECOND_DEFENSE_FIELD = "⚠️ Deuxième Défense"
+EMPTY_NOTES = "Aucune note."
+FIELD_LIMIT = 1024
+FLUSH_DELAY = 0.5  # Seconds changes are collected before the alert message is edited
+
+
+async def get_alert_thread(message: discord.Message) -> discord.Thread:
+    """Return the follow-up thread of an alert (screenshots, overflowing notes), creating it on first use."""
+    if message.thread:
+        return message.thread
+    try:
+        return await message.create_thread(name="🛡️ Suivi de l'alerte", auto_archive_duration=1440)
+    except discord.HTTPException:
+        # Another member created it concurrently
+        return message.guild.get_thread(message.id) or await message.guild.fetch_channel(message.id)
+
+
+class AlertChanges:
+    """Changes waiting to be applied to an alert message in a single edit."""
+
+    def __init__(self):
+        self.notes: List[Tuple[str, str]] = []
+        self.status: Optional[Tuple[str, discord.Color, str]] = None
+        self.second_defense: Optional[str] = None
+        self.image_url: Optional[str] = None
+        self.view: Optional[discord.ui.View] = None
+        self.waiters: List[asyncio.Future] = []
+
+
+class AlertEditor:
+    """Serialises the state transitions of alert messages.
+
+    Every alert has its own lock; changes submitted while an edit is pending
+    are merged, so one flush results in exactly one message.edit call.
+    Transitions: open -> (second defense) -> resolved; a resolved alert keeps
+    its status and notes that don't fit the embed spill into its thread.
+    The message is fetched again under the lock before each edit, so a flush
+    builds on the current embed rather than on the copy held by a modal or
+    a pending upload.
+    """
+
+    def __init__(self, flush_delay: float = FLUSH_DELAY):
+        self.flush_delay = flush_delay
+        self._locks: Dict[int, asyncio.Lock] = {}
+        self._pending: Dict[int, AlertChanges] = {}
+        self._channels: Dict[int, discord.abc.Messageable] = {}
+
+    def submit(self, message: discord.Message, *, note: Optional[Tuple[str, str]] = None,
+               status: Optional[Tuple[str, discord.Color, str]] = None, second_defense: Optional[str] = None,
+               image_url: Optional[str] = None, view: Optional[discord.ui.View] = None) -> asyncio.Future:
+        """Queue changes for an alert; the returned future resolves once they are on the message."""
+        changes = self._pending.get(message.id)
+        if changes is None:
+            changes = self._pending[message.id] = AlertChanges()
+            self._channels[message.id] = message.channel
+            asyncio.get_running_loop().create_task(self._flush(message.id))
+
+        if note:
+            changes.notes.append(note)
+        if status and not changes.status:
+            changes.status = status
+        if second_defense:
+            changes.second_defense = second_defense
+        if image_url and not changes.image_url:
+            changes.image_url = image_url
+        if view:
+            changes.view = view
+
+        waiter = asyncio.get_running_loop().create_future()
+        # Callers may fire and forget; failures are already logged by the flush
+        waiter.add_done_callback(lambda future: future.cancelled() or future.exception())
+        changes.waiters.append(waiter)
+        return waiter
+
+    async def _flush(self, alert_id: int):
+        await asyncio.sleep(self.flush_delay)
+        lock = self._locks.setdefault(alert_id, asyncio.Lock())
+        async with lock:
+            changes = self._pending.pop(alert_id)
+            try:
+                message = await self._channels[alert_id].fetch_message(alert_id)
+                await self._apply(message, changes)
+                for waiter in changes.waiters:
+                    if not waiter.done():
+                        waiter.set_result(None)
+            except Exception as e:
+                logger.exception(f"Failed to update alert {alert_id}: {e}")
+                for waiter in changes.waiters:
+                    if not waiter.done():
+                        waiter.set_exception(e)
+            finally:
+                if alert_id not in self._pending:
+                    # Nothing queued behind this flush: drop the per-alert state
+                    self._channels.pop(alert_id, None)
+                    self._locks.pop(alert_id, None)
+
+    async def _apply(self, message: discord.Message, changes: AlertChanges) -> discord.Message:
+        embed = message.embeds[0]
+        fields = {field.name: index for index, field in enumerate(embed.fields)}
+
+        if changes.notes:
+            await self._add_notes(message, embed, fields, changes.notes)
+        if changes.second_defense and SECOND_DEFENSE_FIELD not in fields:
+            embed.add_field(
+                name=SECOND_DEFENSE_FIELD,
+                value=f"Une équipe défend déjà un percepteur, besoin de monde pour une deuxième défense. {changes.second_defense}",
+                inline=False
+            )
+        if changes.image_url and not embed.image:
+            embed.set_image(url=changes.image_url)
+        if changes.status and STATUS_FIELD not in fields:
+            label, color, user_mention = changes.status
+            embed.color = color
+            embed.add_field(name=STATUS_FIELD, value=f"L'alerte a été marquée comme **{label}** par {user_mention}.", inline=False)
+
+        if changes.view:
+            return await message.edit(embed=embed, view=changes.view)
+        return await message.edit(embed=embed)
+
+    async def _add_notes(self, message: discord.Message, embed: discord.Embed, fields: Dict[str, int],
+                         notes: List[Tuple[str, str]]):
+        index = fields.get(NOTES_FIELD)
+        current = embed.fields[index].value if index is not None else EMPTY_NOTES
+        lines = [f"- **{author}**: {content}" for author, content in notes]
+
+        overflow = []
+        thread = None
+        for line in lines:
+            if overflow or len(current) + len(line) + 1 > FIELD_LIMIT - 60:
+                overflow.append(line)
+            else:
+                current = f"{current}\n{line}"
+
+        if overflow:
+            thread = await get_alert_thread(message)
+            chunk = ""
+            for line in overflow:
+                if len(chunk) + len(line) + 1 > 2000:
+                    await thread.send(chunk, allowed_mentions=discord.AllowedMentions.none())
+                    chunk = ""
+                chunk = f"{chunk}\n{line}" if chunk else line
+            await thread.send(chunk, allowed_mentions=discord.AllowedMentions.none())
+            if thread.mention not in current:
+                current = f"{current}\n➕ Suite des notes dans {thread.mention}"
+
+        if index is None:
+            embed.insert_field_at(0, name=NOTES_FIELD, value=current, inline=False)
+        else:
+            embed.set_field_at(index, name=NOTES_FIELD, value=current, inline=False)
+
+
+alert_editor = AlertEditor()
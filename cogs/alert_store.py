@@ -0,0 +1,324 @@
+import sqlite3
+import time
+from datetime import datetime
+from typing import Iterator, Optional
+from zoneinfo import ZoneInfo
+
+from local_db import get_connection
+from .alert_records import AlertNote, AlertRecord
+from .config import STATS_TIMEZONE
+
+STATS_TZ = ZoneInfo(STATS_TIMEZONE)
+
+
+class AlertStore:
+    """Indexed archive of alert notifications sent in the alert channel."""
+
+    def __init__(self, conn: Optional[sqlite3.Connection] = None):
+        self.conn = conn or get_connection()
+        self.initialize()
+
+    def initialize(self):
+        """Create the archive tables and indexes if they don't exist."""
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS notifications (
+                message_id INTEGER PRIMARY KEY,
+                channel_id INTEGER NOT NULL,
+                author_id INTEGER NOT NULL,
+                author_name TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                roles_tagged TEXT NOT NULL DEFAULT '',
+                attacker TEXT NOT NULL DEFAULT 'Unknown',
+                outcome TEXT NOT NULL DEFAULT 'Not Specified'
+            );
+            CREATE INDEX IF NOT EXISTS idx_notifications_channel_time
+                ON notifications (channel_id, created_at);
+            CREATE TABLE IF NOT EXISTS notification_cursors (
+                channel_id INTEGER PRIMARY KEY,
+                last_message_id INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS alerts (
+                message_id INTEGER PRIMARY KEY,
+                channel_id INTEGER NOT NULL,
+                guild_name TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                initiator_id INTEGER,
+                attacker TEXT,
+                outcome TEXT,
+                resolved_by INTEGER,
+                resolved_at REAL,
+                first_response_at REAL
+            );
+            CREATE INDEX IF NOT EXISTS idx_alerts_guild_time ON alerts (guild_name, created_at);
+            CREATE INDEX IF NOT EXISTS idx_alerts_attacker ON alerts (attacker);
+            CREATE TABLE IF NOT EXISTS alert_notes (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                message_id INTEGER NOT NULL,
+                author_id INTEGER,
+                author_name TEXT NOT NULL,
+                content TEXT NOT NULL,
+                created_at REAL
+            );
+            CREATE INDEX IF NOT EXISTS idx_alert_notes_message ON alert_notes (message_id);
+            CREATE TABLE IF NOT EXISTS alert_responders (
+                message_id INTEGER NOT NULL,
+                user_id INTEGER NOT NULL,
+                action TEXT NOT NULL,
+                responded_at REAL NOT NULL,
+                PRIMARY KEY (message_id, user_id, action)
+            );
+            CREATE TABLE IF NOT EXISTS defense_rollup_guild (
+                guild_name TEXT PRIMARY KEY,
+                alerts INTEGER NOT NULL DEFAULT 0,
+                wins INTEGER NOT NULL DEFAULT 0,
+                losses INTEGER NOT NULL DEFAULT 0,
+                responded INTEGER NOT NULL DEFAULT 0,
+                response_total REAL NOT NULL DEFAULT 0,
+                resolved INTEGER NOT NULL DEFAULT 0,
+                resolve_total REAL NOT NULL DEFAULT 0
+            );
+            CREATE TABLE IF NOT EXISTS defense_rollup_attacker (
+                attacker TEXT PRIMARY KEY,
+                wins INTEGER NOT NULL DEFAULT 0,
+                losses INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE TABLE IF NOT EXISTS defense_rollup_hour (
+                hour INTEGER PRIMARY KEY,
+                alerts INTEGER NOT NULL DEFAULT 0
+            );
+        """)
+        self.conn.commit()
+        has_rollups = self.conn.execute("SELECT 1 FROM defense_rollup_guild LIMIT 1").fetchone()
+        has_alerts = self.conn.execute("SELECT 1 FROM alerts LIMIT 1").fetchone()
+        if has_alerts and not has_rollups:
+            self.rebuild_rollups()
+
+    def add_notification(self, message_id: int, channel_id: int, author_id: int, author_name: str,
+                         created_at: float, roles_tagged: list, attacker: str, outcome: str,
+                         commit: bool = True):
+        """Store a notification; already archived messages are ignored."""
+        self.conn.execute("""
+            INSERT OR IGNORE INTO notifications
+                (message_id, channel_id, author_id, author_name, created_at, roles_tagged, attacker, outcome)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """, (message_id, channel_id, author_id, author_name, created_at,
+              ",".join(roles_tagged), attacker, outcome))
+        if commit:
+            self.conn.commit()
+
+    def get_cursor(self, channel_id: int) -> Optional[int]:
+        """Return the ID of the last message seen in a channel, if any."""
+        row = self.conn.execute(
+            "SELECT last_message_id FROM notification_cursors WHERE channel_id = ?", (channel_id,)
+        ).fetchone()
+        return row["last_message_id"] if row else None
+
+    def set_cursor(self, channel_id: int, message_id: int, commit: bool = True):
+        """Advance the last seen message ID of a channel (never moves backwards)."""
+        self.conn.execute("""
+            INSERT INTO notification_cursors (channel_id, last_message_id) VALUES (?, ?)
+            ON CONFLICT(channel_id) DO UPDATE SET last_message_id = MAX(last_message_id, excluded.last_message_id)
+        """, (channel_id, message_id))
+        if commit:
+            self.conn.commit()
+
+    def commit(self):
+        self.conn.commit()
+
+    def iter_notifications(self, channel_id: int, since: float, until: float) -> Iterator[sqlite3.Row]:
+        """Yield the notifications of a channel in [since, until), grouped by author."""
+        return self.conn.execute("""
+            SELECT * FROM notifications
+            WHERE channel_id = ? AND created_at >= ? AND created_at < ?
+            ORDER BY author_id, created_at
+        """, (channel_id, since, until))
+
+    def count_by_author(self, channel_id: int, since: float, until: float) -> dict:
+        """Return the number of notifications per author in [since, until)."""
+        rows = self.conn.execute("""
+            SELECT author_id, COUNT(*) AS total FROM notifications
+            WHERE channel_id = ? AND created_at >= ? AND created_at < ?
+            GROUP BY author_id
+        """, (channel_id, since, until))
+        return {row["author_id"]: row["total"] for row in rows}
+
+    def count_by_attacker_and_outcome(self, channel_id: int, since: float, until: float) -> list:
+        """Return (attacker, outcome, total) aggregates in [since, until)."""
+        return self.conn.execute("""
+            SELECT attacker, outcome, COUNT(*) AS total FROM notifications
+            WHERE channel_id = ? AND created_at >= ? AND created_at < ?
+            GROUP BY attacker, outcome
+            ORDER BY total DESC
+        """, (channel_id, since, until)).fetchall()
+
+    def save_alert(self, record: AlertRecord):
+        """Insert an alert record and its notes; existing alerts are left untouched."""
+        cursor = self.conn.execute("""
+            INSERT OR IGNORE INTO alerts
+                (message_id, channel_id, guild_name, created_at, initiator_id, attacker, outcome,
+                 resolved_by, resolved_at, first_response_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, (record.message_id, record.channel_id, record.guild_name, record.created_at, record.initiator_id,
+              record.attacker, record.outcome, record.resolved_by, record.resolved_at, record.first_response_at))
+        if cursor.rowcount:
+            self._rollup_new_alert(record)
+            self.conn.executemany("""
+                INSERT INTO alert_notes (message_id, author_id, author_name, content, created_at)
+                VALUES (?, ?, ?, ?, ?)
+            """, [(record.message_id, note.author_id, note.author_name, note.content, note.created_at)
+                  for note in record.notes])
+        self.conn.commit()
+
+    def get_alert(self, message_id: int) -> Optional[AlertRecord]:
+        """Load an alert record with its notes."""
+        row = self.conn.execute("SELECT * FROM alerts WHERE message_id = ?", (message_id,)).fetchone()
+        if not row:
+            return None
+        record = AlertRecord(**dict(row))
+        record.notes = [
+            AlertNote(author_name=note["author_name"], content=note["content"],
+                      author_id=note["author_id"], created_at=note["created_at"])
+            for note in self.conn.execute(
+                "SELECT * FROM alert_notes WHERE message_id = ? ORDER BY id", (message_id,)
+            )
+        ]
+        return record
+
+    def has_alert(self, message_id: int) -> bool:
+        return self.conn.execute("SELECT 1 FROM alerts WHERE message_id = ?", (message_id,)).fetchone() is not None
+
+    def add_responder(self, message_id: int, user_id: int, action: str, responded_at: Optional[float] = None):
+        """Record a member acting on an alert and keep the first response time."""
+        responded_at = responded_at or time.time()
+        self.conn.execute("""
+            INSERT OR IGNORE INTO alert_responders (message_id, user_id, action, responded_at)
+            VALUES (?, ?, ?, ?)
+        """, (message_id, user_id, action, responded_at))
+        alert = self.conn.execute(
+            "SELECT guild_name, created_at, first_response_at FROM alerts WHERE message_id = ?", (message_id,)
+        ).fetchone()
+        if alert and alert["first_response_at"] is None:
+            self._bump("defense_rollup_guild", "guild_name", alert["guild_name"],
+                       responded=1, response_total=max(0.0, responded_at - alert["created_at"]))
+        elif alert and responded_at < alert["first_response_at"]:
+            # An earlier response recorded late (e.g. by a backfill): the first response moves back
+            self._bump("defense_rollup_guild", "guild_name", alert["guild_name"],
+                       response_total=responded_at - alert["first_response_at"])
+        self.conn.execute("""
+            UPDATE alerts SET first_response_at = ?
+            WHERE message_id = ? AND (first_response_at IS NULL OR first_response_at > ?)
+        """, (responded_at, message_id, responded_at))
+        self.conn.commit()
+
+    def add_note(self, message_id: int, author_id: int, author_name: str, content: str,
+                 attacker: Optional[str] = None):
+        """Store a note on an alert, filling in the attacker if it is still unknown."""
+        now = time.time()
+        self.conn.execute("""
+            INSERT INTO alert_notes (message_id, author_id, author_name, content, created_at)
+            VALUES (?, ?, ?, ?, ?)
+        """, (message_id, author_id, author_name, content, now))
+        if attacker:
+            cursor = self.conn.execute(
+                "UPDATE alerts SET attacker = ? WHERE message_id = ? AND attacker IS NULL", (attacker, message_id)
+            )
+            outcome = self.conn.execute("SELECT outcome FROM alerts WHERE message_id = ?", (message_id,)).fetchone()
+            if cursor.rowcount and outcome and outcome["outcome"]:
+                # Already resolved under "Unknown": move its win or loss to the attacker
+                wins, losses = int(outcome["outcome"] == "Win"), int(outcome["outcome"] == "Loss")
+                self._bump("defense_rollup_attacker", "attacker", "Unknown", wins=-wins, losses=-losses)
+                self._bump("defense_rollup_attacker", "attacker", attacker, wins=wins, losses=losses)
+        self.add_responder(message_id, author_id, "note", now)
+
+    def resolve_alert(self, message_id: int, outcome: str, resolved_by: int) -> bool:
+        """Mark an alert as won or lost; returns False if it was already resolved."""
+        now = time.time()
+        cursor = self.conn.execute("""
+            UPDATE alerts SET outcome = ?, resolved_by = ?, resolved_at = ?
+            WHERE message_id = ? AND outcome IS NULL
+        """, (outcome, resolved_by, now, message_id))
+        if cursor.rowcount:
+            alert = self.conn.execute(
+                "SELECT guild_name, attacker, created_at FROM alerts WHERE message_id = ?", (message_id,)
+            ).fetchone()
+            self._rollup_outcome(alert["guild_name"], alert["attacker"], outcome)
+            self._bump("defense_rollup_guild", "guild_name", alert["guild_name"],
+                       resolved=1, resolve_total=max(0.0, now - alert["created_at"]))
+        self.add_responder(message_id, resolved_by, "resolve", now)
+        return bool(cursor.rowcount)
+
+    def attacker_stats(self) -> list:
+        """Return wins, losses and average response time per attacking guild."""
+        return self.conn.execute("""
+            SELECT COALESCE(attacker, 'Unknown') AS attacker,
+                   COUNT(*) AS total,
+                   SUM(outcome = 'Win') AS wins,
+                   SUM(outcome = 'Loss') AS losses,
+                   AVG(first_response_at - created_at) AS avg_response
+            FROM alerts
+            GROUP BY COALESCE(attacker, 'Unknown')
+            ORDER BY total DESC
+        """).fetchall()
+
+    def _bump(self, table: str, key_column: str, key, **increments):
+        """Add the given increments to a rollup row, creating it if needed."""
+        columns = ", ".join(increments)
+        placeholders = ", ".join("?" for _ in increments)
+        updates = ", ".join(f"{column} = {column} + excluded.{column}" for column in increments)
+        self.conn.execute(
+            f"INSERT INTO {table} ({key_column}, {columns}) VALUES (?, {placeholders}) "
+            f"ON CONFLICT({key_column}) DO UPDATE SET {updates}",
+            (key, *increments.values())
+        )
+
+    def _rollup_outcome(self, guild_name: str, attacker: Optional[str], outcome: str):
+        wins, losses = int(outcome == "Win"), int(outcome == "Loss")
+        self._bump("defense_rollup_guild", "guild_name", guild_name, wins=wins, losses=losses)
+        self._bump("defense_rollup_attacker", "attacker", attacker or "Unknown", wins=wins, losses=losses)
+
+    def _rollup_new_alert(self, record: AlertRecord):
+        self._bump("defense_rollup_guild", "guild_name", record.guild_name, alerts=1)
+        self._bump("defense_rollup_hour", "hour", datetime.fromtimestamp(record.created_at, STATS_TZ).hour, alerts=1)
+        if record.outcome:
+            self._rollup_outcome(record.guild_name, record.attacker, record.outcome)
+        if record.first_response_at:
+            self._bump("defense_rollup_guild", "guild_name", record.guild_name,
+                       responded=1, response_total=record.first_response_at - record.created_at)
+        if record.resolved_at:
+            self._bump("defense_rollup_guild", "guild_name", record.guild_name,
+                       resolved=1, resolve_total=record.resolved_at - record.created_at)
+
+    def rebuild_rollups(self):
+        """Recompute every rollup from the alerts table."""
+        self.conn.executescript("""
+            DELETE FROM defense_rollup_guild;
+            DELETE FROM defense_rollup_attacker;
+            DELETE FROM defense_rollup_hour;
+        """)
+        for row in self.conn.execute("SELECT * FROM alerts").fetchall():
+            self._rollup_new_alert(AlertRecord(**dict(row)))
+        self.conn.commit()
+
+    def guild_rollups(self) -> list:
+        """Return the defense rollup of every attacked guild."""
+        return self.conn.execute("SELECT * FROM defense_rollup_guild ORDER BY alerts DESC").fetchall()
+
+    def attacker_rollups(self, limit: int = 10) -> list:
+        """Return the attackers we faced the most."""
+        return self.conn.execute("""
+            SELECT * FROM defense_rollup_attacker ORDER BY wins + losses DESC LIMIT ?
+        """, (limit,)).fetchall()
+
+    def hour_rollups(self) -> dict:
+        """Return the number of alerts per hour of the day."""
+        return {row["hour"]: row["alerts"] for row in self.conn.execute("SELECT * FROM defense_rollup_hour")}
+
+
+_store = None
+
+def get_alert_store() -> AlertStore:
+    """Return the alert store shared by the alert cogs and views."""
+    global _store
+    if _store is None:
+        _store = AlertStore()
+    return _store
@@ -2,61 +2,192 @@ import discord
 from discord.ext import commands
 from discord import app_commands
 from discord.utils import utcnow
-from datetime import timedelta
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+import csv
+import io
+import json
 import os
-import re
 import logging
-import aiofiles
 from discord.ext.commands import CooldownMapping, BucketType
+from sharding import is_primary_worker
+from .alert_records import parse_notification
+from .alert_store import get_alert_store
 
-# Set up logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+REQUIRED_INTENTS = ("message_content",)
+
 class Alerts(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         self.allowed_channel_id = 1247728738326679583  # Replace with your specific channel ID
         self._cd = CooldownMapping.from_cooldown(1, 60, BucketType.user)  # 1 use per 60 seconds per user
+        self.store = get_alert_store()
+        self.backfill_days = int(os.getenv("ALERT_BACKFILL_DAYS", "30"))  # History walked on the very first backfill
+        self.backfill_done = False
+        self.backfill_task = None
+
+    @staticmethod
+    def is_relevant(message):
+        """Check if a message is sent by a bot and mentions everyone or roles."""
+        return message.author.bot and (message.mention_everyone or message.role_mentions)
+
+    def archive_message(self, message, commit=True):
+        """Store a relevant message in the notification archive."""
+        parsed_data = self.parse_notification_data(message)
+        self.store.add_notification(
+            message_id=message.id,
+            channel_id=message.channel.id,
+            author_id=message.author.id,
+            author_name=message.author.name,
+            created_at=message.created_at.timestamp(),
+            roles_tagged=parsed_data["roles_tagged"],
+            attacker=parsed_data["attacker"],
+            outcome=parsed_data["outcome"],
+            commit=commit
+        )
+
+    async def backfill(self):
+        """Archive the channel history missed while the bot was offline, resuming from the last seen message."""
+        channel = self.bot.get_channel(self.allowed_channel_id)
+        if not channel:
+            logger.warning("Alert channel not found, skipping notification backfill")
+            return
+
+        last_id = self.store.get_cursor(channel.id)
+        after = discord.Object(id=last_id) if last_id else utcnow() - timedelta(days=self.backfill_days)
+        count = 0
+        try:
+            async for message in channel.history(limit=None, after=after, oldest_first=True):
+                if self.is_relevant(message):
+                    self.archive_message(message, commit=False)
+                self.store.set_cursor(channel.id, message.id, commit=False)
+                count += 1
+                if count % 100 == 0:
+                    self.store.commit()  # Checkpoint so an interrupted backfill resumes from here
+            self.store.commit()
+            self.backfill_done = True
+            logger.info(f"Notification backfill complete: {count} messages scanned")
+        except discord.Forbidden:
+            logger.error("Missing permission to read the alert channel history")
 
-    def filter_relevant_messages(self, messages):
-        """Filter messages that are sent by bots and mention everyone or roles."""
-        return [
-            message for message in messages
-            if message.author.bot and (message.mention_everyone or message.role_mentions)
-        ]
+    @commands.Cog.listener()
+    async def on_ready(self):
+        if self.backfill_task is None and is_primary_worker():
+            self.backfill_task = self.bot.loop.create_task(self.backfill())
+
+    @commands.Cog.listener()
+    async def on_message(self, message):
+        """Capture alert notifications as they arrive."""
+        if message.channel.id != self.allowed_channel_id:
+            return
+        if self.is_relevant(message):
+            self.archive_message(message, commit=False)
+        if self.backfill_done:
+            # Until the backfill has caught up, the cursor must keep pointing at the gap
+            self.store.set_cursor(message.channel.id, message.id, commit=False)
+        self.store.commit()
+
+    def cog_unload(self):
+        if self.backfill_task:
+            self.backfill_task.cancel()
 
     def parse_notification_data(self, message):
         """Parse notification data from a message."""
-        attacker_match = re.search(r"Attacker:\s*(\w+)", message.content, re.IGNORECASE)
-        outcome_match = re.search(r"Outcome:\s*(Win|Loss)", message.content, re.IGNORECASE)
         return {
             "timestamp": message.created_at.strftime("%Y-%m-%d %H:%M:%S"),
             "roles_tagged": [role.name for role in message.role_mentions],
-            "attacker": attacker_match.group(1) if attacker_match else "Unknown",
-            "outcome": outcome_match.group(1) if outcome_match else "Not Specified"
+            **parse_notification(message.content)
         }
 
-    async def generate_report(self, notification_data, now):
-        """Generate a report file with notification data."""
-        report_filename = f"notification_report_{now.strftime('%Y%m%d_%H%M%S')}.txt"
-        async with aiofiles.open(report_filename, "w") as report_file:
-            if not notification_data:
-                await report_file.write("No notifications were sent in the last 7 days.\n")
-            else:
-                for user_id, data in notification_data.items():
-                    await report_file.write(f"User: {data['username']}\n")
-                    await report_file.write(f"Total Notifications Sent: {len(data['notifications'])}\n\n")
-                    for notification in data["notifications"]:
-                        await report_file.write(f"  - Timestamp: {notification['timestamp']}\n")
-                        await report_file.write(f"    Roles Tagged: {', '.join(notification['roles_tagged']) if notification['roles_tagged'] else 'None'}\n")
-                        await report_file.write(f"    Attacker: {notification['attacker']}\n")
-                        await report_file.write(f"    Outcome: {notification['outcome']}\n\n")
-        return report_filename
-
-    @app_commands.command(name="alert", description="Generate a report of notifications sent in this channel for the last 7 days.")
-    async def alert(self, interaction: discord.Interaction):
-        """Generate a report of notifications sent in the last 7 days."""
+    @staticmethod
+    def format_timestamp(created_at):
+        return datetime.fromtimestamp(created_at, timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+
+    def write_text_report(self, out, channel_id, since, until):
+        """Stream the notifications grouped by user as plain text."""
+        totals = self.store.count_by_author(channel_id, since, until)
+        if not totals:
+            out.write("No notifications were sent in the selected period.\n")
+            return
+
+        current_author = None
+        for row in self.store.iter_notifications(channel_id, since, until):
+            if row["author_id"] != current_author:
+                current_author = row["author_id"]
+                out.write(f"User: {row['author_name']}\n")
+                out.write(f"Total Notifications Sent: {totals[current_author]}\n\n")
+            out.write(
+                f"  - Timestamp: {self.format_timestamp(row['created_at'])}\n"
+                f"    Roles Tagged: {row['roles_tagged'].replace(',', ', ') if row['roles_tagged'] else 'None'}\n"
+                f"    Attacker: {row['attacker']}\n"
+                f"    Outcome: {row['outcome']}\n\n"
+            )
+
+    def write_csv_report(self, out, channel_id, since, until):
+        """Stream one CSV row per notification."""
+        writer = csv.writer(out)
+        writer.writerow(["timestamp", "user", "roles_tagged", "attacker", "outcome", "message_id"])
+        for row in self.store.iter_notifications(channel_id, since, until):
+            writer.writerow([
+                self.format_timestamp(row["created_at"]), row["author_name"],
+                row["roles_tagged"].replace(",", ";"), row["attacker"], row["outcome"], row["message_id"]
+            ])
+
+    def write_json_summary(self, out, channel_id, since, until):
+        """Write per-attacker and per-outcome aggregates as JSON."""
+        by_attacker = {}
+        by_outcome = {}
+        for row in self.store.count_by_attacker_and_outcome(channel_id, since, until):
+            attacker = by_attacker.setdefault(row["attacker"], {"total": 0, "outcomes": {}})
+            attacker["total"] += row["total"]
+            attacker["outcomes"][row["outcome"]] = row["total"]
+            by_outcome[row["outcome"]] = by_outcome.get(row["outcome"], 0) + row["total"]
+
+        json.dump({
+            "since": self.format_timestamp(since),
+            "until": self.format_timestamp(until),
+            "total": sum(by_outcome.values()),
+            "by_outcome": by_outcome,
+            "by_attacker": by_attacker,
+        }, out, ensure_ascii=False, indent=2)
+
+    def generate_report(self, channel_id, since, until, report_format="text"):
+        """Build the report in an in-memory buffer, streaming rows from the archive."""
+        writers = {
+            "text": self.write_text_report,
+            "csv": self.write_csv_report,
+            "json": self.write_json_summary,
+        }
+        buffer = io.BytesIO()
+        out = io.TextIOWrapper(buffer, encoding="utf-8", newline="")
+        writers[report_format](out, channel_id, since, until)
+        out.flush()
+        out.detach()  # Keep the buffer open once the wrapper is gone
+        buffer.seek(0)
+        return buffer
+
+    @app_commands.command(name="alert", description="Generate a report of notifications sent in this channel.")
+    @app_commands.describe(
+        period="Period covered by the report (default: last 7 days)",
+        days="Custom number of days, overrides the period",
+        report_format="Output format of the report (default: text)"
+    )
+    @app_commands.rename(report_format="format")
+    @app_commands.choices(period=[
+        app_commands.Choice(name="Last 24 hours", value=1),
+        app_commands.Choice(name="Last 7 days", value=7),
+        app_commands.Choice(name="Last 30 days", value=30),
+    ], report_format=[
+        app_commands.Choice(name="Text", value="text"),
+        app_commands.Choice(name="CSV", value="csv"),
+        app_commands.Choice(name="JSON summary", value="json"),
+    ])
+    async def alert(self, interaction: discord.Interaction, period: Optional[app_commands.Choice[int]] = None,
+                    days: Optional[app_commands.Range[int, 1, 365]] = None,
+                    report_format: Optional[app_commands.Choice[str]] = None):
+        """Generate a report of notifications sent in the selected period."""
         # Check cooldown
         bucket = self._cd.get_bucket(interaction.user.id)  # Use the user's ID for cooldown tracking
         retry_after = bucket.update_rate_limit()
@@ -69,47 +200,20 @@ class Alerts(commands.Cog):
             await interaction.response.send_message("This command can only be used in the designated channel.", ephemeral=True)
             return
 
-        # Get the message history for the last 7 days
-        channel = interaction.channel
         now = utcnow()
-        seven_days_ago = now - timedelta(days=7)
+        window_days = days or (period.value if period else 7)
+        since = now - timedelta(days=window_days)
 
         try:
-            # Collect relevant messages asynchronously
-            messages = []
-            async for message in channel.history(after=seven_days_ago):
-                messages.append(message)
-
-            # Filter relevant messages
-            relevant_messages = self.filter_relevant_messages(messages)
-
-            # Collect notification data
-            notification_data = {}
-            for message in relevant_messages:
-                author = message.author
-                parsed_data = self.parse_notification_data(message)
-
-                # Initialize data for the author if not already done
-                if author.id not in notification_data:
-                    notification_data[author.id] = {
-                        "username": author.name,
-                        "notifications": []
-                    }
+            # Answer from the local archive and build the report in memory
+            extension = {"text": "txt", "csv": "csv", "json": "json"}
+            fmt = report_format.value if report_format else "text"
+            report = self.generate_report(interaction.channel_id, since.timestamp(), now.timestamp(), fmt)
+            report_filename = f"notification_report_{now.strftime('%Y%m%d_%H%M%S')}.{extension[fmt]}"
 
-                # Append notification details
-                notification_data[author.id]["notifications"].append(parsed_data)
+            # Notify the user and attach the report
+            await interaction.response.send_message("Report generated:", file=discord.File(report, filename=report_filename), ephemeral=True)
 
-            # Generate the report
-            report_filename = await self.generate_report(notification_data, now)
-
-            # Notify the user and attach the file
-            await interaction.response.send_message("Report generated:", file=discord.File(report_filename), ephemeral=True)
-
-            # Clean up the file after sending
-            os.remove(report_filename)
-
-        except discord.Forbidden:
-            await interaction.response.send_message("I don't have permission to read messages in this channel.", ephemeral=True)
         except Exception as e:
             logger.error(f"An error occurred: {e}")
             await interaction.response.send_message(f"An error occurred: {e}", ephemeral=True)
@@ -0,0 +1,69 @@
+import discord
+import logging
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Awaitable, Callable, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+BULK_CHUNK = 100  # Most messages a single bulk delete accepts
+BULK_MAX_AGE = timedelta(days=14) - timedelta(minutes=5)  # Older messages must be deleted one by one
+PROGRESS_EVERY = 10  # Single deletes between two progress callbacks
+
+
+@dataclass
+class DeleteResult:
+    deleted: int = 0
+    missing: int = 0  # Already deleted by someone else
+    failed: int = 0
+
+    @property
+    def processed(self) -> int:
+        return self.deleted + self.missing + self.failed
+
+
+def can_bulk_delete(message: discord.abc.Snowflake) -> bool:
+    return discord.utils.utcnow() - discord.utils.snowflake_time(message.id) < BULK_MAX_AGE
+
+
+async def delete_messages(channel: discord.abc.Messageable, messages: Sequence[discord.Message],
+                          on_progress: Optional[Callable[[DeleteResult], Awaitable[None]]] = None) -> DeleteResult:
+    """Delete messages of a channel with as few requests as possible.
+
+    Messages younger than 14 days go through bulk deletes of up to 100
+    messages; older ones are deleted one at a time, which discord.py paces
+    according to the route's rate limit.
+    """
+    result = DeleteResult()
+    recent = [message for message in messages if can_bulk_delete(message)]
+    singles: List[discord.Message] = [message for message in messages if not can_bulk_delete(message)]
+
+    for start in range(0, len(recent), BULK_CHUNK):
+        chunk = recent[start:start + BULK_CHUNK]
+        if len(chunk) == 1:
+            singles.insert(0, chunk[0])
+            continue
+        try:
+            await channel.delete_messages(chunk)
+            result.deleted += len(chunk)
+        except discord.NotFound:
+            # Part of the chunk is already gone: retry its messages individually
+            singles.extend(chunk)
+        except discord.HTTPException as e:
+            logger.warning(f"Bulk delete of {len(chunk)} messages in {channel} failed: {e}")
+            result.failed += len(chunk)
+        if on_progress:
+            await on_progress(result)
+
+    for position, message in enumerate(singles, start=1):
+        try:
+            await message.delete()
+            result.deleted += 1
+        except discord.NotFound:
+            result.missing += 1
+        except discord.HTTPException as e:
+            logger.warning(f"Could not delete message {message.id} in {channel}: {e}")
+            result.failed += 1
+        if on_progress and position % PROGRESS_EVERY == 0:
+            await on_progress(result)
+    return result
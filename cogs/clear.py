@@ -1,28 +1,216 @@
 import discord
 from discord.ext import commands
 from discord import app_commands
+import asyncio
+import logging
+import re
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Optional, Pattern
+from zoneinfo import ZoneInfo
+
+from .bulk_delete import BULK_CHUNK, DeleteResult, delete_messages
+from .config import STATS_TIMEZONE
+
+logger = logging.getLogger(__name__)
+
+MAX_COUNT = 10000  # Messages deleted by one /clear
+SCAN_FACTOR = 20  # Messages scanned per message to delete when filters are set
+PROGRESS_INTERVAL = 3  # Seconds between two progress updates
+TOKEN_LIFETIME = 14 * 60  # Interaction tokens expire after 15 minutes; later updates go to a regular message
+LOCAL_TZ = ZoneInfo(STATS_TIMEZONE)
+
+
+@dataclass
+class PurgeFilter:
+    author: Optional[discord.abc.User] = None
+    bots_only: bool = False
+    with_attachments: bool = False
+    pattern: Optional[Pattern] = None
+
+    @property
+    def active(self) -> bool:
+        return bool(self.author or self.bots_only or self.with_attachments or self.pattern)
+
+    def matches(self, message: discord.Message) -> bool:
+        if self.author and message.author.id != self.author.id:
+            return False
+        if self.bots_only and not message.author.bot:
+            return False
+        if self.with_attachments and not message.attachments:
+            return False
+        if self.pattern and not self.pattern.search(message.content):
+            return False
+        return True
+
+
+def parse_boundary(value: Optional[str]) -> Optional[discord.abc.Snowflake]:
+    """A message ID, or a date such as '2024-05-01' or '2024-05-01 21:30' (French time)."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return discord.Object(id=int(value))
+    moment = datetime.fromisoformat(value)
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=LOCAL_TZ)
+    return discord.Object(id=discord.utils.time_snowflake(moment))
+
+
+class CancelPurgeView(discord.ui.View):
+    def __init__(self, owner_id: int):
+        super().__init__(timeout=None)
+        self.owner_id = owner_id
+        self.task: Optional[asyncio.Task] = None
+
+    @discord.ui.button(label="Annuler", style=discord.ButtonStyle.danger, emoji="✖️")
+    async def cancel(self, interaction: discord.Interaction, button: discord.ui.Button):
+        if interaction.user.id != self.owner_id:
+            await interaction.response.send_message("Only the member who started this purge can cancel it.", ephemeral=True)
+            return
+        if self.task:
+            self.task.cancel()
+        await interaction.response.defer()
+
 
 class ClearMessages(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        self.jobs: Dict[int, asyncio.Task] = {}  # Running purge by channel ID
+
+    async def cog_unload(self):
+        for task in self.jobs.values():
+            task.cancel()
 
-    @app_commands.command(name="clear", description="Delete a specified number of messages in this channel (1-50).")
+    @app_commands.command(name="clear", description="Delete messages in this channel, optionally filtered.")
+    @app_commands.describe(
+        count=f"Maximum number of messages to delete (1-{MAX_COUNT})",
+        user="Only delete messages from this member",
+        bots_only="Only delete messages sent by bots",
+        with_attachments="Only delete messages with attachments",
+        pattern="Only delete messages matching this regular expression",
+        before="Only delete messages before this message ID or date (YYYY-MM-DD HH:MM)",
+        after="Only delete messages after this message ID or date (YYYY-MM-DD HH:MM)"
+    )
     @app_commands.checks.has_permissions(manage_messages=True)
-    async def clear(self, interaction: discord.Interaction, count: int):
-        if count < 1 or count > 50:
-            await interaction.response.send_message("You can only delete between 1 and 50 messages.", ephemeral=True)
+    async def clear(self, interaction: discord.Interaction, count: int, user: discord.User = None,
+                    bots_only: bool = False, with_attachments: bool = False, pattern: str = None,
+                    before: str = None, after: str = None):
+        if count < 1 or count > MAX_COUNT:
+            await interaction.response.send_message(f"You can only delete between 1 and {MAX_COUNT} messages.", ephemeral=True)
+            return
+        if interaction.channel_id in self.jobs:
+            await interaction.response.send_message("A purge is already running in this channel.", ephemeral=True)
+            return
+
+        try:
+            purge_filter = PurgeFilter(user, bots_only, with_attachments, re.compile(pattern, re.IGNORECASE) if pattern else None)
+            before_object, after_object = parse_boundary(before), parse_boundary(after)
+        except re.error as e:
+            await interaction.response.send_message(f"Invalid regular expression: {e}", ephemeral=True)
+            return
+        except ValueError:
+            await interaction.response.send_message("Dates must look like 2024-05-01 or 2024-05-01 21:30.", ephemeral=True)
             return
 
         # Defer the interaction response to avoid timeouts during message deletion
         await interaction.response.defer(ephemeral=True)
 
+        view = CancelPurgeView(interaction.user.id)
+        await interaction.edit_original_response(content="Purge started…", view=view)
+
+        # The purge runs in the background; progress is shown on the deferred response
+        view.task = asyncio.create_task(self.purge(interaction, count, purge_filter, before_object, after_object))
+        self.jobs[interaction.channel_id] = view.task
+        view.task.add_done_callback(lambda _: self.jobs.pop(interaction.channel_id, None))
+
+    async def purge(self, interaction: discord.Interaction, count: int, purge_filter: PurgeFilter,
+                    before: Optional[discord.abc.Snowflake], after: Optional[discord.abc.Snowflake]):
+        """Background job: scan the channel history and delete the matching messages in chunks."""
+        channel = interaction.channel
+        scan_limit = count * SCAN_FACTOR if purge_filter.active else count
+        result = DeleteResult()
+        scanned = 0
+        started = time.monotonic()
+        last_update = 0.0
+        status_message: Optional[discord.Message] = None
+
+        async def report(done: DeleteResult, final: str = None):
+            nonlocal last_update, status_message
+            now = time.monotonic()
+            if final is None and now - last_update < PROGRESS_INTERVAL:
+                return
+            last_update = now
+            status = final or f"Purging… {result.deleted + done.deleted} deleted, {scanned} messages scanned."
+            try:
+                if now - started < TOKEN_LIFETIME:
+                    await interaction.edit_original_response(content=status, view=None if final else discord.utils.MISSING)
+                elif status_message is None:
+                    status_message = await self.open_status_message(interaction, status)
+                else:
+                    await status_message.edit(content=self.status_text(interaction, status_message, status))
+            except discord.HTTPException as e:
+                logger.warning(f"Could not update purge progress: {e}")
+
+        async def flush(batch):
+            chunk_result = await delete_messages(channel, batch, on_progress=report)
+            result.deleted += chunk_result.deleted
+            result.missing += chunk_result.missing
+            result.failed += chunk_result.failed
+
+        batch = []
         try:
-            deleted = await interaction.channel.purge(limit=count + 1)  # +1 to include the command message
-            await interaction.followup.send(f"Deleted {len(deleted) - 1} messages.", ephemeral=True)
+            async for message in channel.history(limit=scan_limit, before=before, after=after):
+                scanned += 1
+                if not purge_filter.matches(message):
+                    continue
+                batch.append(message)
+                if result.deleted + result.failed + len(batch) >= count:
+                    break
+                if len(batch) == BULK_CHUNK:
+                    await flush(batch)
+                    batch = []
+            if batch:
+                await flush(batch)
+        except asyncio.CancelledError:
+            await report(DeleteResult(), final=f"Purge cancelled after deleting {result.deleted} messages.")
+            raise
         except discord.Forbidden:
-            await interaction.followup.send("I do not have permission to delete messages in this channel.", ephemeral=True)
+            await report(DeleteResult(), final="I do not have permission to delete messages in this channel.")
+            return
         except discord.HTTPException as e:
-            await interaction.followup.send(f"Failed to delete messages: {e}", ephemeral=True)
+            await report(DeleteResult(), final=f"Failed to delete messages: {e}")
+            return
+
+        summary = f"Deleted {result.deleted} messages ({scanned} scanned)."
+        if result.failed:
+            summary += f" {result.failed} could not be deleted."
+        logger.info(f"Purge in {channel} by {interaction.user}: {summary}")
+        await report(DeleteResult(), final=summary)
+
+    async def open_status_message(self, interaction: discord.Interaction, status: str) -> discord.Message:
+        """Move progress reports of a long purge to the invoker's DMs (or the channel) before the token expires."""
+        try:
+            message = await interaction.user.send(f"{interaction.channel.mention}: {status}")
+            where = "your DMs"
+        except discord.Forbidden:
+            message = await interaction.channel.send(
+                f"{interaction.user.mention} {status}", allowed_mentions=discord.AllowedMentions.none()
+            )
+            where = "this channel"
+        try:
+            # Last edit the interaction token allows; the cancel button keeps working
+            await interaction.edit_original_response(content=f"Purge still running, progress continues in {where}.")
+        except discord.HTTPException as e:
+            logger.warning(f"Could not update purge progress: {e}")
+        return message
+
+    @staticmethod
+    def status_text(interaction: discord.Interaction, message: discord.Message, status: str) -> str:
+        if isinstance(message.channel, discord.DMChannel):
+            return f"{interaction.channel.mention}: {status}"
+        return f"{interaction.user.mention} {status}"
 
 async def setup(bot):
     await bot.add_cog(ClearMessages(bot))
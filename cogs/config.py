@@ -1,7 +1,9 @@
 # Configuration
 GUILD_ID = 1300093554064097400  # Replace with your guild ID
+OWNER_ID = 486652069831376943  # Replace with your Discord user ID (receives the relayed DMs)
 PING_DEF_CHANNEL_ID = 1307429490158342256  # Replace with your ping channel ID
 ALERTE_DEF_CHANNEL_ID = 1300093554399645715  # Replace with your alert channel ID
+STATS_TIMEZONE = "Europe/Paris"  # Timezone used for the busiest hours of /defense_stats
 
 # Guild emojis with IDs and corresponding role IDs
 GUILD_EMOJIS_ROLES = {
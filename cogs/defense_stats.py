@@ -0,0 +1,114 @@
+import discord
+from discord.ext import commands
+from discord import app_commands
+from PIL import Image, ImageDraw, ImageFont
+import asyncio
+import io
+import logging
+from .alert_store import get_alert_store
+
+logger = logging.getLogger(__name__)
+
+CHART_SIZE = (720, 300)
+CHART_MARGIN = 30
+
+
+def format_duration(seconds):
+    """Format a duration in seconds as '1h05', '4m12' or '37s'."""
+    if seconds is None:
+        return "—"
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600}h{(seconds % 3600) // 60:02d}"
+    if seconds >= 60:
+        return f"{seconds // 60}m{seconds % 60:02d}"
+    return f"{seconds}s"
+
+
+def win_ratio(wins, losses):
+    total = wins + losses
+    return f"{wins / total:.0%}" if total else "—"
+
+
+def render_hours_chart(hours: dict) -> io.BytesIO:
+    """Render the alerts-per-hour bar chart as a PNG (runs in a worker thread)."""
+    width, height = CHART_SIZE
+    image = Image.new("RGB", CHART_SIZE, (47, 49, 54))
+    draw = ImageDraw.Draw(image)
+    font = ImageFont.load_default()
+
+    peak = max(hours.values(), default=0) or 1
+    bar_width = (width - 2 * CHART_MARGIN) / 24
+    for hour in range(24):
+        count = hours.get(hour, 0)
+        bar_height = (height - 2 * CHART_MARGIN) * count / peak
+        x0 = CHART_MARGIN + hour * bar_width + 2
+        y0 = height - CHART_MARGIN - bar_height
+        draw.rectangle([x0, y0, x0 + bar_width - 4, height - CHART_MARGIN], fill=(237, 66, 69))
+        draw.text((x0, height - CHART_MARGIN + 6), f"{hour:02d}", fill=(220, 221, 222), font=font)
+        if count:
+            draw.text((x0, y0 - 12), str(count), fill=(220, 221, 222), font=font)
+
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    buffer.seek(0)
+    return buffer
+
+
+class DefenseStats(commands.Cog):
+    def __init__(self, bot):
+        self.bot = bot
+        self.store = get_alert_store()
+
+    def create_stats_embed(self) -> discord.Embed:
+        """Build the dashboard from the pre-aggregated rollups."""
+        embed = discord.Embed(title="📊 Statistiques de Défense", color=discord.Color.gold())
+
+        guild_lines = []
+        for row in self.store.guild_rollups():
+            avg_response = row["response_total"] / row["responded"] if row["responded"] else None
+            avg_resolve = row["resolve_total"] / row["resolved"] if row["resolved"] else None
+            guild_lines.append(
+                f"**{row['guild_name']}** · {row['alerts']} alertes · "
+                f"{row['wins']}V/{row['losses']}D ({win_ratio(row['wins'], row['losses'])})\n"
+                f"⏱ 1er défenseur: {format_duration(avg_response)} · Résolution: {format_duration(avg_resolve)}"
+            )
+        embed.add_field(name="🛡️ Par guilde", value="\n".join(guild_lines) or "Aucune alerte enregistrée.", inline=False)
+
+        attacker_lines = [
+            f"`{index}.` **{row['attacker']}** · {row['wins']}V/{row['losses']}D ({win_ratio(row['wins'], row['losses'])})"
+            for index, row in enumerate(self.store.attacker_rollups(), start=1)
+        ]
+        embed.add_field(name="⚔️ Attaquants les plus fréquents", value="\n".join(attacker_lines) or "Aucune donnée.", inline=False)
+
+        hours = self.store.hour_rollups()
+        busiest = sorted(hours.items(), key=lambda item: item[1], reverse=True)[:3]
+        embed.add_field(
+            name="🕒 Heures les plus chargées",
+            value=" · ".join(f"{hour:02d}h ({count})" for hour, count in busiest) or "Aucune donnée.",
+            inline=False
+        )
+        return embed
+
+    @app_commands.command(name="defense_stats", description="Statistiques de défense : victoires, temps de réponse et attaquants.")
+    @app_commands.describe(graphique="Joindre le graphique des alertes par heure")
+    async def defense_stats(self, interaction: discord.Interaction, graphique: bool = False):
+        try:
+            embed = self.create_stats_embed()
+            if not graphique:
+                await interaction.response.send_message(embed=embed, ephemeral=True)
+                return
+
+            await interaction.response.defer(ephemeral=True)
+            chart = await asyncio.to_thread(render_hours_chart, self.store.hour_rollups())
+            embed.set_image(url="attachment://defense_hours.png")
+            await interaction.followup.send(embed=embed, file=discord.File(chart, filename="defense_hours.png"), ephemeral=True)
+        except Exception as e:
+            logger.exception(f"Error in defense_stats command: {e}")
+            if interaction.response.is_done():
+                await interaction.followup.send("Une erreur est survenue.", ephemeral=True)
+            else:
+                await interaction.response.send_message("Une erreur est survenue.", ephemeral=True)
+
+async def setup(bot):
+    await bot.add_cog(DefenseStats(bot))
@@ -0,0 +1,212 @@
+import discord
+from discord.ext import commands, tasks
+import asyncio
+import logging
+import sqlite3
+import time
+from collections import OrderedDict, deque
+from typing import Deque, Dict, List, Optional
+
+from local_db import get_connection
+from .config import OWNER_ID
+from .fanout import chunk_lines
+from .relocation import copyable_embeds
+from .transfers import TransferError, attachment_transfers
+
+logger = logging.getLogger(__name__)
+
+REQUIRED_INTENTS = ("message_content",)  # Relayed DMs keep their text
+
+DIGEST_INTERVAL = 60  # Seconds between two digests sent to the owner
+SENDER_LIMIT = 5  # Messages relayed per sender within SENDER_WINDOW; the rest are only counted
+SENDER_WINDOW = 300  # Seconds
+REPLY_MAP_SIZE = 2000  # Relayed messages the owner can still reply to
+
+
+class ReplyMapStore:
+    """Relayed message ID -> original sender, persisted so owner replies survive a restart."""
+
+    def __init__(self, conn: Optional[sqlite3.Connection] = None):
+        self.conn = conn or get_connection()
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS dm_relay_replies (
+                message_id INTEGER PRIMARY KEY,
+                sender_id INTEGER NOT NULL
+            );
+        """)
+        self.conn.commit()
+
+    def add(self, message_id: int, sender_id: int):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO dm_relay_replies (message_id, sender_id) VALUES (?, ?)", (message_id, sender_id)
+        )
+        # Message IDs grow with time: keep the REPLY_MAP_SIZE most recent relays
+        self.conn.execute("""
+            DELETE FROM dm_relay_replies WHERE message_id < (
+                SELECT message_id FROM dm_relay_replies ORDER BY message_id DESC LIMIT 1 OFFSET ?
+            )
+        """, (REPLY_MAP_SIZE - 1,))
+        self.conn.commit()
+
+    def sender_of(self, message_id: int) -> Optional[int]:
+        row = self.conn.execute("SELECT sender_id FROM dm_relay_replies WHERE message_id = ?", (message_id,)).fetchone()
+        return row["sender_id"] if row else None
+
+
+class DMRelay(commands.Cog):
+    """Relays the DMs the bot receives to its owner, and the owner's replies back.
+
+    Incoming DMs are queued and sent to the owner as one digest per sender
+    every DIGEST_INTERVAL, attachments included. Each sender gets at most
+    SENDER_LIMIT relayed messages per SENDER_WINDOW. The owner answers by
+    replying (Discord reply) to a relayed message: the reply-to mapping
+    tells which user the answer goes to.
+    """
+
+    def __init__(self, bot):
+        self.bot = bot
+        self._owner_channel: Optional[discord.DMChannel] = None
+        self._owner_lock = asyncio.Lock()
+        self.pending: "OrderedDict[int, List[discord.Message]]" = OrderedDict()  # Queued DMs by sender ID
+        self.dropped: Dict[int, int] = {}  # Rate-limited DMs by sender ID, since the last digest
+        self.recent: Dict[int, Deque[float]] = {}  # Relay times by sender ID
+        self.reply_to = ReplyMapStore()  # Owner-side message ID -> sender ID
+
+    async def cog_load(self):
+        self.send_digest.start()
+
+    async def cog_unload(self):
+        self.send_digest.cancel()
+        try:
+            await self.flush()
+        except discord.HTTPException as e:
+            logger.warning(f"Could not send the last DM digest: {e}")
+
+    async def owner_channel(self) -> discord.DMChannel:
+        """The owner's DM channel, resolved with a single request and cached."""
+        if self._owner_channel is None:
+            async with self._owner_lock:
+                if self._owner_channel is None:
+                    owner = self.bot.get_user(OWNER_ID) or await self.bot.fetch_user(OWNER_ID)
+                    self._owner_channel = owner.dm_channel or await owner.create_dm()
+        return self._owner_channel
+
+    def allow(self, sender_id: int) -> bool:
+        now = time.monotonic()
+        times = self.recent.setdefault(sender_id, deque())
+        while times and now - times[0] > SENDER_WINDOW:
+            times.popleft()
+        if len(times) >= SENDER_LIMIT:
+            return False
+        times.append(now)
+        return True
+
+    def remember(self, relayed: discord.Message, sender_id: int):
+        self.reply_to.add(relayed.id, sender_id)
+
+    @commands.Cog.listener()
+    async def on_message(self, message: discord.Message):
+        if not isinstance(message.channel, discord.DMChannel) or message.author.bot:
+            return
+        if message.author.id == OWNER_ID:
+            if message.reference and message.reference.message_id:
+                await self.relay_reply(message)
+            return
+
+        if self.allow(message.author.id):
+            self.pending.setdefault(message.author.id, []).append(message)
+        else:
+            self.dropped[message.author.id] = self.dropped.get(message.author.id, 0) + 1
+
+    @tasks.loop(seconds=DIGEST_INTERVAL)
+    async def send_digest(self):
+        try:
+            await self.flush()
+        except discord.HTTPException as e:
+            logger.warning(f"Could not send the DM digest: {e}")
+
+    @send_digest.before_loop
+    async def before_send_digest(self):
+        await self.bot.wait_until_ready()
+
+    async def flush(self):
+        pending, self.pending = self.pending, OrderedDict()
+        dropped, self.dropped = self.dropped, {}
+        now = time.monotonic()
+        self.recent = {
+            sender_id: times for sender_id, times in self.recent.items() if times and now - times[-1] <= SENDER_WINDOW
+        }
+        if not pending and not dropped:
+            return
+
+        channel = await self.owner_channel()
+        for sender_id in list(pending) + [sender_id for sender_id in dropped if sender_id not in pending]:
+            await self.send_sender_digest(channel, sender_id, pending.get(sender_id, []), dropped.get(sender_id, 0))
+
+    async def send_sender_digest(self, channel: discord.DMChannel, sender_id: int,
+                                 messages: List[discord.Message], dropped: int):
+        """Relay one sender's DMs: their text grouped, then one message per DM with attachments or embeds."""
+        author = messages[0].author if messages else await self.bot.fetch_user(sender_id)
+        lines = [f"📨 **{author}** (`{sender_id}`), {len(messages)} message(s):"]
+        for message in messages:
+            timestamp = discord.utils.format_dt(message.created_at, "t")
+            lines.append(f"{timestamp} {message.content}" if message.content else f"{timestamp} *(no text)*")
+        if dropped:
+            lines.append(f"⚠️ {dropped} more message(s) not relayed (over {SENDER_LIMIT} per {SENDER_WINDOW // 60} min).")
+        lines.append("*Reply to this message to answer.*")
+
+        for chunk in chunk_lines(lines):
+            self.remember(await channel.send(chunk, allowed_mentions=discord.AllowedMentions.none()), sender_id)
+
+        for message in messages:
+            embeds = copyable_embeds(message)
+            if message.attachments or embeds:
+                await self.relay_files(channel, message, embeds, sender_id)
+
+    async def relay_files(self, channel: discord.DMChannel, message: discord.Message,
+                          embeds: List[discord.Embed], sender_id: int):
+        note = f"📎 From **{message.author}**, {discord.utils.format_dt(message.created_at, 't')}"
+        try:
+            batch = await attachment_transfers.fetch(message.attachments)
+        except TransferError as e:
+            logger.warning(f"Could not download the attachments of DM {message.id}: {e}")
+            urls = "\n".join(attachment.url for attachment in message.attachments)
+            self.remember(await channel.send(f"{note}\n{urls}", embeds=embeds), sender_id)
+            return
+        try:
+            self.remember(await channel.send(note, files=batch.files, embeds=embeds), sender_id)
+        except discord.HTTPException as e:
+            # Most likely above the upload limit: link the files instead
+            logger.info(f"Could not upload the attachments of DM {message.id}: {e}")
+            urls = "\n".join(attachment.url for attachment in message.attachments)
+            self.remember(await channel.send(f"{note}\n{urls}", embeds=embeds), sender_id)
+        finally:
+            batch.close()
+
+    async def relay_reply(self, message: discord.Message):
+        """Send the owner's reply to the user whose relayed message it answers."""
+        sender_id = self.reply_to.sender_of(message.reference.message_id)
+        if sender_id is None:
+            replied = message.reference.resolved
+            if isinstance(replied, discord.Message) and replied.author == self.bot.user:
+                await message.reply("This relayed message is too old: the reply can no longer be routed to its sender.")
+            return
+        try:
+            user = self.bot.get_user(sender_id) or await self.bot.fetch_user(sender_id)
+            batch = await attachment_transfers.fetch(message.attachments)
+            try:
+                await user.send(message.content or None, files=batch.files)
+            finally:
+                batch.close()
+        except discord.Forbidden:
+            await message.reply(f"Could not DM {sender_id}: they do not accept DMs from the bot.")
+            return
+        except (discord.HTTPException, TransferError) as e:
+            logger.warning(f"Could not relay the owner's reply to {sender_id}: {e}")
+            await message.reply(f"Could not relay the reply: {e}")
+            return
+        await message.add_reaction("✅")
+
+
+async def setup(bot):
+    await bot.add_cog(DMRelay(bot))
@@ -0,0 +1,111 @@
+import aiohttp
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DOFAPI_URL = "https://fr.dofus.dofapi.fr"
+FRESH_TTL = 6 * 3600  # Seconds an item is served without revalidation
+STALE_TTL = 7 * 24 * 3600  # Seconds a stale item is still served while it is refreshed
+MISSING_TTL = 10 * 60  # Seconds a "not found" answer is remembered
+MAX_ENTRIES = 5000
+REQUEST_TIMEOUT = aiohttp.ClientTimeout(total=10)
+MAX_CONNECTIONS = 10
+
+CacheKey = Tuple[str, int]
+
+
+@dataclass
+class CacheEntry:
+    data: Optional[dict]  # None when DOFAPI answered 404
+    fetched_at: float
+
+    def age(self) -> float:
+        return time.monotonic() - self.fetched_at
+
+    def is_fresh(self) -> bool:
+        return self.age() < (FRESH_TTL if self.data is not None else MISSING_TTL)
+
+    def is_usable(self) -> bool:
+        return self.data is not None and self.age() < STALE_TTL
+
+
+class DofapiClient:
+    """Async DOFAPI client with a shared connection pool and a stale-while-revalidate cache.
+
+    Concurrent lookups of the same (category, id) share a single upstream request.
+    """
+
+    def __init__(self):
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._cache: Dict[CacheKey, CacheEntry] = {}
+        self._inflight: Dict[CacheKey, asyncio.Task] = {}
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                timeout=REQUEST_TIMEOUT,
+                connector=aiohttp.TCPConnector(limit=MAX_CONNECTIONS, ttl_dns_cache=300),
+            )
+        return self._session
+
+    async def close(self):
+        for task in self._inflight.values():
+            task.cancel()
+        if self._session is not None:
+            await self._session.close()
+
+    @staticmethod
+    def _key(category: str, item_id: int) -> CacheKey:
+        return category.strip().lower(), item_id
+
+    def is_cached(self, category: str, item_id: int) -> bool:
+        """True when get() can answer without waiting for DOFAPI."""
+        entry = self._cache.get(self._key(category, item_id))
+        return entry is not None and (entry.is_fresh() or entry.is_usable())
+
+    async def get(self, category: str, item_id: int) -> Optional[dict]:
+        """Return the item, or None if it doesn't exist or DOFAPI can't be reached."""
+        key = self._key(category, item_id)
+        entry = self._cache.get(key)
+        if entry is not None and entry.is_fresh():
+            return entry.data
+        if entry is not None and entry.is_usable():
+            # Serve the stale copy and refresh it in the background
+            self._fetch(key)
+            return entry.data
+        return await asyncio.shield(self._fetch(key))
+
+    def _fetch(self, key: CacheKey) -> asyncio.Task:
+        task = self._inflight.get(key)
+        if task is None:
+            task = self._inflight[key] = asyncio.get_running_loop().create_task(self._download(key))
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return task
+
+    async def _download(self, key: CacheKey) -> Optional[dict]:
+        category, item_id = key
+        try:
+            async with self._get_session().get(f"{DOFAPI_URL}/{category}/{item_id}") as response:
+                if response.status == 404:
+                    self._store(key, None)
+                    return None
+                response.raise_for_status()
+                data = await response.json(content_type=None)
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+            logger.error(f"Error fetching data from DOFAPI: {e}")
+            # Keep serving what we had, even past its freshness
+            entry = self._cache.get(key)
+            return entry.data if entry is not None else None
+        self._store(key, data)
+        return data
+
+    def _store(self, key: CacheKey, data: Optional[dict]):
+        self._cache.pop(key, None)
+        self._cache[key] = CacheEntry(data, time.monotonic())
+        while len(self._cache) > MAX_ENTRIES:
+            # Dicts keep insertion order: the first key is the oldest fetch
+            del self._cache[next(iter(self._cache))]
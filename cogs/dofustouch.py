@@ -1,24 +1,55 @@
 import discord
 from discord import app_commands
-from discord.ext import commands
-import requests
-from requests.exceptions import RequestException
+from discord.ext import commands, tasks
+import logging
+from typing import List
+
+from sharding import is_primary_worker
+from .dofapi import DofapiClient
+from .item_catalogue import ItemCatalogue
+
+logger = logging.getLogger(__name__)
+
+REFRESH_AGE = 7 * 24 * 3600  # Seconds before a catalogue item is refreshed from DOFAPI
+REFRESH_BATCH = 50  # Items refreshed per run of the background refresh
 
 class DofusTouch(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        self.dofapi = DofapiClient()
+        # Local copy of DOFAPI, imported with `python -m cogs.item_catalogue dump.json`
+        self.catalogue = ItemCatalogue()
 
-    # Function to fetch data from DOFAPI
-    def fetch_dofus_data(self, category, item_id):
-        url = f"https://fr.dofus.dofapi.fr/{category}/{item_id}"
-        try:
-            response = requests.get(url, timeout=10)  # Add a timeout
-            response.raise_for_status()  # Raise an exception for HTTP errors
-            data = response.json()
-            return data
-        except RequestException as e:
-            print(f"Error fetching data from DOFAPI: {e}")
-            return None
+    async def cog_load(self):
+        if is_primary_worker():
+            self.refresh_catalogue.start()
+
+    async def cog_unload(self):
+        self.refresh_catalogue.cancel()
+        await self.dofapi.close()
+
+    @tasks.loop(hours=1)
+    async def refresh_catalogue(self):
+        """Refresh the oldest catalogue entries from the live API, a batch at a time."""
+        refreshed = 0
+        failed = []
+        for category, item_id in self.catalogue.stale_items(REFRESH_AGE, REFRESH_BATCH):
+            data = await self.dofapi.get(category, item_id)
+            if data and self.catalogue.upsert(category, [data], reindex=False):
+                refreshed += 1
+            else:
+                failed.append((category, item_id))
+        if failed:
+            # Missing from DOFAPI or unreachable: retried after REFRESH_AGE instead of taking every batch
+            self.catalogue.touch(failed)
+            logger.info(f"{len(failed)} catalogue items could not be refreshed from DOFAPI")
+        if refreshed:
+            self.catalogue.load_index()
+            logger.info(f"Refreshed {refreshed} catalogue items from DOFAPI")
+
+    @refresh_catalogue.before_loop
+    async def before_refresh_catalogue(self):
+        await self.bot.wait_until_ready()
 
     # Function to format the API response
     def format_response(self, data):
@@ -31,15 +62,62 @@ class DofusTouch(commands.Cog):
             response += f"\n{image_url}"
         return response
 
-    # Slash command: /item <category> <item_id>
-    @app_commands.command(name="item", description="Fetch item data from DOFAPI by ID")
-    @app_commands.describe(category="The category of the item (e.g., weapons, equipment)", item_id="The ID of the item")
-    async def item(self, interaction: discord.Interaction, category: str, item_id: int):
-        data = self.fetch_dofus_data(category, item_id)
+    async def fetch_item(self, interaction: discord.Interaction, category: str, item_id: int):
+        """Serve an item from the catalogue, or from DOFAPI when it isn't imported yet."""
+        data = self.catalogue.get(category, item_id)
+        if data is not None:
+            return data
+        if not self.dofapi.is_cached(category, item_id):
+            # DOFAPI may take longer than the 3 seconds allowed to answer an interaction
+            await interaction.response.defer()
+        data = await self.dofapi.get(category, item_id)
         if data:
-            await interaction.response.send_message(self.format_response(data))
+            self.catalogue.upsert(category, [data])
+        return data
+
+    # Slash command: /item <category> <item>
+    @app_commands.command(name="item", description="Fetch item data from DOFAPI by name or ID")
+    @app_commands.describe(category="The category of the item (e.g., weapons, equipment)", item="The name or ID of the item")
+    async def item(self, interaction: discord.Interaction, category: str, item: str):
+        item = item.strip()
+        choice_category, _, choice_id = item.rpartition(":")
+        if item.isdigit():
+            item_id = int(item)
+        elif choice_category and choice_id.isdigit():
+            # Picked from the autocomplete suggestions
+            category, item_id = choice_category, int(choice_id)
+        else:
+            match = self.catalogue.find_by_name(item, category)
+            if match is None:
+                await interaction.response.send_message(f"No item named '{item}' in category '{category}'.")
+                return
+            category, item_id = match
+
+        data = await self.fetch_item(interaction, category, item_id)
+        if data:
+            content = self.format_response(data)
         else:
-            await interaction.response.send_message(f"Item with ID '{item_id}' not found in category '{category}'.")
+            content = f"Item with ID '{item_id}' not found in category '{category}'."
+        if interaction.response.is_done():
+            await interaction.followup.send(content)
+        else:
+            await interaction.response.send_message(content)
+
+    @item.autocomplete("category")
+    async def category_autocomplete(self, interaction: discord.Interaction, current: str) -> List[app_commands.Choice[str]]:
+        return [app_commands.Choice(name=category, value=category) for category in self.catalogue.search_categories(current)]
+
+    @item.autocomplete("item")
+    async def item_autocomplete(self, interaction: discord.Interaction, current: str) -> List[app_commands.Choice[str]]:
+        if not current:
+            return []
+        category = getattr(interaction.namespace, "category", None)
+        if category and category.strip().lower() not in self.catalogue.categories:
+            category = None
+        return [
+            app_commands.Choice(name=f"{name} ({item_category})"[:100], value=f"{item_category}:{item_id}")
+            for item_category, item_id, name in self.catalogue.search(current, category)
+        ]
 
 # Cog setup function
 async def setup(bot):
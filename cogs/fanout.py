@@ -0,0 +1,156 @@
+import discord
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, List, Optional
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+CONCURRENCY = 8  # Operations running at once by default
+PROGRESS_INTERVAL = 2.0  # Minimum seconds between two progress callbacks
+MAX_RETRIES = 3  # Attempts of an operation that keeps hitting 429
+DEFAULT_RETRY_AFTER = 5.0  # Pause when a 429 doesn't say how long to wait
+
+
+@dataclass
+class FanOutReport:
+    total: int
+    results: Dict[Hashable, Any] = field(default_factory=dict)
+    failures: Dict[Hashable, BaseException] = field(default_factory=dict)
+    rate_limited: int = 0
+    cancelled: bool = False
+
+    @property
+    def done(self) -> int:
+        return len(self.results) + len(self.failures)
+
+
+def retry_after(error: BaseException) -> Optional[float]:
+    """Seconds to wait when `error` is a rate limit, None otherwise."""
+    if isinstance(error, discord.RateLimited):
+        return error.retry_after
+    if isinstance(error, discord.HTTPException) and error.status == 429:
+        return getattr(error, "retry_after", None) or DEFAULT_RETRY_AFTER
+    return None
+
+
+def rate_limit_count() -> float:
+    return sum(metrics.HTTP_RATE_LIMITS.values.values())
+
+
+class FanOut:
+    """Runs one coroutine per item (usually per guild) with bounded concurrency.
+
+    discord.py already queues requests per route bucket; on top of that the
+    executor halves its concurrency whenever Discord starts answering 429,
+    pauses every worker when an operation is rate limited and retries it.
+    Results and failures are collected per item and reported through
+    `on_progress` while the run goes on.
+    """
+
+    def __init__(self, concurrency: int = CONCURRENCY,
+                 on_progress: Optional[Callable[[FanOutReport], Awaitable[None]]] = None,
+                 progress_interval: float = PROGRESS_INTERVAL):
+        self.concurrency = max(1, concurrency)
+        self.on_progress = on_progress
+        self.progress_interval = progress_interval
+        self._resume = asyncio.Event()
+        self._resume.set()
+        self._active = 0
+        self._limit = self.concurrency
+        self._slot = asyncio.Condition()
+        self._last_progress = 0.0
+
+    async def run(self, items: Iterable[Any], operation: Callable[[Any], Awaitable[Any]],
+                  key: Callable[[Any], Hashable] = lambda item: getattr(item, "id", item)) -> FanOutReport:
+        items = list(items)
+        report = FanOutReport(total=len(items))
+        queue: asyncio.Queue = asyncio.Queue()
+        for item in items:
+            queue.put_nowait(item)
+
+        async def worker():
+            while not queue.empty():
+                item = queue.get_nowait()
+                await self._run_one(item, key(item), operation, report)
+                await self._report_progress(report)
+
+        workers = [asyncio.create_task(worker()) for _ in range(min(self.concurrency, len(items)))]
+        try:
+            await asyncio.gather(*workers)
+        except asyncio.CancelledError:
+            report.cancelled = True
+            for task in workers:
+                task.cancel()
+            raise
+        finally:
+            await self._report_progress(report, force=True)
+        return report
+
+    async def _run_one(self, item, item_key, operation, report: FanOutReport):
+        for attempt in range(1, MAX_RETRIES + 1):
+            await self._acquire()
+            seen_rate_limits = rate_limit_count()
+            try:
+                report.results[item_key] = await operation(item)
+                return
+            except Exception as e:
+                delay = retry_after(e)
+                if delay is None or attempt == MAX_RETRIES:
+                    logger.warning(f"Fan-out operation failed for {item_key}: {e}")
+                    report.failures[item_key] = e
+                    return
+                report.rate_limited += 1
+                await self._pause(delay)
+            finally:
+                await self._release(rate_limit_count() > seen_rate_limits)
+
+    async def _acquire(self):
+        await self._resume.wait()
+        async with self._slot:
+            await self._slot.wait_for(lambda: self._active < self._limit)
+            self._active += 1
+
+    async def _release(self, rate_limited: bool):
+        async with self._slot:
+            self._active -= 1
+            if rate_limited and self._limit > 1:
+                # Discord is pushing back: halve the parallelism for the rest of the run
+                self._limit = max(1, self._limit // 2)
+                logger.info(f"Rate limited, fan-out concurrency lowered to {self._limit}")
+            self._slot.notify_all()
+
+    async def _pause(self, delay: float):
+        if not self._resume.is_set():
+            return
+        self._resume.clear()
+        logger.info(f"Fan-out paused for {delay:.1f}s after a 429")
+        await asyncio.sleep(delay)
+        self._resume.set()
+
+    async def _report_progress(self, report: FanOutReport, force: bool = False):
+        now = time.monotonic()
+        if self.on_progress is None or (not force and now - self._last_progress < self.progress_interval):
+            return
+        self._last_progress = now
+        try:
+            await self.on_progress(report)
+        except discord.HTTPException as e:
+            logger.warning(f"Could not report fan-out progress: {e}")
+
+
+def chunk_lines(lines: List[str], limit: int = 1900) -> List[str]:
+    """Group lines into messages that fit in Discord's 2000 characters."""
+    chunks, current = [], ""
+    for line in lines:
+        line = line[:limit]
+        if current and len(current) + len(line) + 1 > limit:
+            chunks.append(current)
+            current = ""
+        current = f"{current}\n{line}" if current else line
+    if current:
+        chunks.append(current)
+    return chunks
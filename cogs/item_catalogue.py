@@ -0,0 +1,193 @@
+import argparse
+import json
+import sqlite3
+import time
+import unicodedata
+from bisect import bisect_left, bisect_right
+from itertools import accumulate, islice
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from local_db import get_connection
+
+MAX_SUGGESTIONS = 25  # Discord's limit for autocomplete choices
+ID_FIELDS = ("ankamaId", "_id", "id")
+
+
+def normalize(text: str) -> str:
+    """Lowercase, accent-free form used for matching ('Épée' -> 'epee')."""
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(char for char in decomposed if not unicodedata.combining(char)).lower().strip()
+
+
+def item_id_of(item: dict) -> Optional[int]:
+    for field in ID_FIELDS:
+        value = item.get(field)
+        if isinstance(value, int) or (isinstance(value, str) and value.isdigit()):
+            return int(value)
+    return None
+
+
+class ItemCatalogue:
+    """Local copy of the DOFAPI items with an in-memory name index for autocomplete.
+
+    The index is a list of (normalized name, category, item id, display name)
+    sorted by name: prefixes are found by bisection and the rest of the
+    suggestions come from str.find over all the names joined in one string,
+    both well under 10 ms for the size of the DOFAPI catalogue.
+    """
+
+    def __init__(self, conn: Optional[sqlite3.Connection] = None):
+        self.conn = conn or get_connection()
+        self.initialize()
+        self._index: List[Tuple[str, str, int, str]] = []
+        self._categories: List[str] = []
+        self._names = ""  # Every normalized name, one per line, in index order
+        self._offsets: List[int] = []  # Position of each name in self._names
+        self.load_index()
+
+    def initialize(self):
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS items (
+                category TEXT NOT NULL,
+                item_id INTEGER NOT NULL,
+                name TEXT NOT NULL,
+                name_key TEXT NOT NULL,
+                data TEXT NOT NULL,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (category, item_id)
+            );
+            CREATE INDEX IF NOT EXISTS idx_items_name ON items (name_key);
+            CREATE INDEX IF NOT EXISTS idx_items_updated ON items (updated_at);
+        """)
+        self.conn.commit()
+
+    def load_index(self):
+        rows = self.conn.execute("SELECT name_key, category, item_id, name FROM items").fetchall()
+        self._index = sorted(tuple(row) for row in rows)
+        self._categories = sorted({row[1] for row in self._index})
+        self._names = "\n".join(entry[0] for entry in self._index)
+        self._offsets = [0, *accumulate(len(entry[0]) + 1 for entry in self._index[:-1])] if self._index else []
+
+    def __len__(self):
+        return len(self._index)
+
+    @property
+    def categories(self) -> List[str]:
+        return self._categories
+
+    def upsert(self, category: str, items: Iterable[dict], *, reindex: bool = True) -> int:
+        """Store items of a category; returns how many had a usable ID and name."""
+        category = category.strip().lower()
+        now = time.time()
+        rows = []
+        for item in items:
+            item_id = item_id_of(item)
+            name = item.get("name")
+            if item_id is None or not name:
+                continue
+            rows.append((category, item_id, name, normalize(name), json.dumps(item, ensure_ascii=False), now))
+        self.conn.executemany("""
+            INSERT INTO items (category, item_id, name, name_key, data, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT (category, item_id) DO UPDATE SET
+                name = excluded.name, name_key = excluded.name_key,
+                data = excluded.data, updated_at = excluded.updated_at
+        """, rows)
+        self.conn.commit()
+        if reindex and rows:
+            self.load_index()
+        return len(rows)
+
+    def get(self, category: str, item_id: int) -> Optional[dict]:
+        row = self.conn.execute(
+            "SELECT data FROM items WHERE category = ? AND item_id = ?", (category.strip().lower(), item_id)
+        ).fetchone()
+        return json.loads(row["data"]) if row else None
+
+    def find_by_name(self, name: str, category: Optional[str] = None) -> Optional[Tuple[str, int]]:
+        """(category, item_id) of the best match for a typed name."""
+        matches = self.search(name, category, limit=1)
+        return (matches[0][0], matches[0][1]) if matches else None
+
+    def search(self, query: str, category: Optional[str] = None, limit: int = MAX_SUGGESTIONS) -> List[Tuple[str, int, str]]:
+        """Items whose name starts with the query, then items containing every word of it."""
+        key = normalize(query)
+        category = category.strip().lower() if category else None
+        results: List[Tuple[str, int, str]] = []
+        seen = set()
+
+        start = bisect_left(self._index, (key,))
+        for name_key, item_category, item_id, name in islice(self._index, start, None):
+            if not name_key.startswith(key) or len(results) >= limit:
+                break
+            if category in (None, item_category):
+                results.append((item_category, item_id, name))
+                seen.add((item_category, item_id))
+
+        words = key.split()
+        if len(results) < limit and words:
+            # Only the names containing the longest word are looked at
+            longest = max(words, key=len)
+            position = self._names.find(longest)
+            while position != -1 and len(results) < limit:
+                line = bisect_right(self._offsets, position) - 1
+                name_key, item_category, item_id, name = self._index[line]
+                if ((item_category, item_id) not in seen and category in (None, item_category)
+                        and all(word in name_key for word in words)):
+                    results.append((item_category, item_id, name))
+                if line + 1 == len(self._offsets):
+                    break
+                position = self._names.find(longest, self._offsets[line + 1])
+        return results
+
+    def search_categories(self, query: str) -> List[str]:
+        key = normalize(query)
+        return [category for category in self._categories if key in category][:MAX_SUGGESTIONS]
+
+    def stale_items(self, older_than: float, limit: int) -> List[Tuple[str, int]]:
+        """Items not refreshed for `older_than` seconds, oldest first."""
+        rows = self.conn.execute(
+            "SELECT category, item_id FROM items WHERE updated_at < ? ORDER BY updated_at LIMIT ?",
+            (time.time() - older_than, limit)
+        ).fetchall()
+        return [(row["category"], row["item_id"]) for row in rows]
+
+    def touch(self, items: Iterable[Tuple[str, int]]):
+        """Mark items as just refreshed without changing them, so they leave the front of the refresh queue."""
+        now = time.time()
+        self.conn.executemany(
+            "UPDATE items SET updated_at = ? WHERE category = ? AND item_id = ?",
+            [(now, category, item_id) for category, item_id in items]
+        )
+        self.conn.commit()
+
+
+def import_dump(path: str, category: Optional[str] = None, conn: Optional[sqlite3.Connection] = None) -> Dict[str, int]:
+    """Import a bulk DOFAPI dump.
+
+    The file holds either {"category": [items, ...], ...} or, with `category`
+    given, the list returned by one DOFAPI category endpoint.
+    """
+    with open(path, encoding="utf-8") as dump:
+        content = json.load(dump)
+    if isinstance(content, list):
+        if not category:
+            raise ValueError("A list dump needs --category")
+        content = {category: content}
+
+    catalogue = ItemCatalogue(conn)
+    return {name: catalogue.upsert(name, items, reindex=False) for name, items in content.items()}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import a DOFAPI dump into the local item catalogue.")
+    parser.add_argument("dump", nargs="+", help="JSON dump file(s)")
+    parser.add_argument("--category", help="Category of the items when a file holds a single list")
+    args = parser.parse_args(argv)
+    for path in args.dump:
+        for category, count in import_dump(path, args.category).items():
+            print(f"{path}: {count} items imported into '{category}'")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+import discord
+import asyncio
+import logging
+import time
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+COALESCE_DELAY = 0.5  # Seconds a member's changes are collected before the edit
+WORKERS = 2  # Members edited at once; they share the guild member route bucket
+
+QUEUE_DEPTH = metrics.Gauge("bot_member_edit_queue_depth", "Members waiting for a role or nickname edit.")
+EDIT_LATENCY = metrics.Histogram("bot_member_edit_latency_seconds", "Time from the first queued change to the member edit.")
+MERGED_CHANGES = metrics.Counter("bot_member_edit_merged_total", "Changes merged into an already queued member edit.")
+
+_UNCHANGED = object()
+
+MemberKey = Tuple[int, int]  # (guild_id, member_id)
+
+
+class PendingEdit:
+    """Role and nickname changes waiting to be applied to one member."""
+
+    def __init__(self, guild: discord.Guild, member_id: int):
+        self.guild = guild
+        self.member_id = member_id
+        self.add_roles: Set[int] = set()
+        self.remove_roles: Set[int] = set()
+        self.nick = _UNCHANGED
+        self.reasons: List[str] = []
+        self.queued_at = time.monotonic()
+        self.waiters: List[asyncio.Future] = []
+
+
+class MemberEditQueue:
+    """Routes role and nickname mutations through one member.edit per member.
+
+    Changes submitted for a member while an edit is pending are merged into
+    it. Members are served in the order their first change arrived, so a
+    burst of newcomers is processed round-robin instead of one member's
+    repeated changes starving the others.
+
+    Edits of one member never overlap: changes arriving while the member's
+    edit is in flight wait for it and are queued again behind it. Roles
+    are never rewritten from the cache. Role-only changes go through the
+    per-role endpoints, which can't clobber concurrent changes by admins or
+    other bots. A change with a nickname is a single member.edit built on a
+    freshly fetched member.
+    """
+
+    def __init__(self, coalesce_delay: float = COALESCE_DELAY, workers: int = WORKERS):
+        self.coalesce_delay = coalesce_delay
+        self.workers = workers
+        self._pending: Dict[MemberKey, PendingEdit] = {}
+        self._in_flight: Set[MemberKey] = set()  # Members whose edit is being applied
+        self._order: Optional[asyncio.Queue] = None  # Members in the order of their first queued change
+        self._tasks: List[asyncio.Task] = []
+
+    def submit(self, member: discord.Member, *, add_roles: Iterable[discord.abc.Snowflake] = (),
+               remove_roles: Iterable[discord.abc.Snowflake] = (), nick=_UNCHANGED,
+               reason: Optional[str] = None) -> asyncio.Future:
+        """Queue changes for a member; the future resolves once they are applied."""
+        self._start()
+        key = (member.guild.id, member.id)
+        pending = self._pending.get(key)
+        if pending is None:
+            pending = self._pending[key] = PendingEdit(member.guild, member.id)
+            if key not in self._in_flight:
+                # Otherwise queued again once the edit in flight is done
+                self._order.put_nowait(key)
+        else:
+            MERGED_CHANGES.inc()
+
+        for role in add_roles:
+            pending.add_roles.add(role.id)
+            pending.remove_roles.discard(role.id)
+        for role in remove_roles:
+            pending.remove_roles.add(role.id)
+            pending.add_roles.discard(role.id)
+        if nick is not _UNCHANGED:
+            pending.nick = nick
+        if reason and reason not in pending.reasons:
+            pending.reasons.append(reason)
+
+        waiter = asyncio.get_running_loop().create_future()
+        # Callers may fire and forget; failures are already logged by the worker
+        waiter.add_done_callback(lambda future: future.cancelled() or future.exception())
+        pending.waiters.append(waiter)
+        QUEUE_DEPTH.set(self._order.qsize())
+        return waiter
+
+    def _start(self):
+        if self._tasks:
+            return
+        self._order = asyncio.Queue()
+        self._tasks = [asyncio.get_running_loop().create_task(self._worker()) for _ in range(self.workers)]
+
+    def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+
+    async def _worker(self):
+        while True:
+            key = await self._order.get()
+            pending = self._pending[key]
+            # Leave a little time for related changes (role, then nickname) to arrive
+            delay = pending.queued_at + self.coalesce_delay - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            # Changes submitted from now on start a new edit, applied after this one
+            del self._pending[key]
+            self._in_flight.add(key)
+            QUEUE_DEPTH.set(self._order.qsize())
+            try:
+                await self._apply(pending)
+            finally:
+                self._in_flight.discard(key)
+                if key in self._pending:
+                    self._order.put_nowait(key)
+
+    async def _apply(self, pending: PendingEdit):
+        reason = "; ".join(pending.reasons) or None
+        try:
+            if pending.nick is _UNCHANGED:
+                member = pending.guild.get_member(pending.member_id) or await pending.guild.fetch_member(pending.member_id)
+                # One request per role, each atomic on Discord's side
+                if pending.add_roles:
+                    await member.add_roles(*(discord.Object(id=role_id) for role_id in pending.add_roles), reason=reason)
+                if pending.remove_roles:
+                    await member.remove_roles(*(discord.Object(id=role_id) for role_id in pending.remove_roles), reason=reason)
+            else:
+                # Roles and nickname in one request, based on the member as Discord has it now
+                member = await pending.guild.fetch_member(pending.member_id)
+                changes = {}
+                current = {role.id for role in member.roles[1:]}  # roles[0] is @everyone
+                wanted = (current | pending.add_roles) - pending.remove_roles
+                if wanted != current:
+                    changes["roles"] = [discord.Object(id=role_id) for role_id in wanted]
+                if pending.nick != member.nick:
+                    changes["nick"] = pending.nick
+                if changes:
+                    await member.edit(**changes, reason=reason)
+        except Exception as e:
+            logger.warning(f"Could not edit member {pending.member_id}: {e}")
+            for waiter in pending.waiters:
+                if not waiter.done():
+                    waiter.set_exception(e)
+        else:
+            for waiter in pending.waiters:
+                if not waiter.done():
+                    waiter.set_result(None)
+        finally:
+            EDIT_LATENCY.observe(time.monotonic() - pending.queued_at)
+
+
+member_edits = MemberEditQueue()
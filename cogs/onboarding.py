@@ -0,0 +1,62 @@
+import sqlite3
+from dataclasses import dataclass
+from typing import List, Optional
+
+from local_db import get_connection
+
+# Onboarding of a newcomer: welcomed -> role chosen -> IGN set.
+WELCOMED = "welcomed"  # Selection panel sent, no role picked yet
+ROLE_CHOSEN = "role_chosen"  # Guild role assigned, waiting for the in-game name in DM
+IGN_SET = "ign_set"  # Nickname set, kept until expiry so the member isn't welcomed twice
+
+
+@dataclass
+class OnboardingSession:
+    user_id: int
+    guild_id: int
+    state: str
+    expires_at: float
+    role_name: Optional[str] = None
+    attempts: int = 0
+
+
+class OnboardingStore:
+    """Persisted onboarding sessions, so pending newcomers survive a restart."""
+
+    def __init__(self, conn: Optional[sqlite3.Connection] = None):
+        self.conn = conn or get_connection()
+        self.initialize()
+
+    def initialize(self):
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS onboarding (
+                user_id INTEGER PRIMARY KEY,
+                guild_id INTEGER NOT NULL,
+                state TEXT NOT NULL,
+                expires_at REAL NOT NULL,
+                role_name TEXT,
+                attempts INTEGER NOT NULL DEFAULT 0
+            );
+        """)
+        self.conn.commit()
+
+    def load(self) -> List[OnboardingSession]:
+        rows = self.conn.execute(
+            "SELECT user_id, guild_id, state, expires_at, role_name, attempts FROM onboarding"
+        ).fetchall()
+        return [OnboardingSession(**dict(row)) for row in rows]
+
+    def save(self, session: OnboardingSession):
+        self.conn.execute("""
+            INSERT INTO onboarding (user_id, guild_id, state, expires_at, role_name, attempts)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT (user_id) DO UPDATE SET
+                guild_id = excluded.guild_id, state = excluded.state, expires_at = excluded.expires_at,
+                role_name = excluded.role_name, attempts = excluded.attempts
+        """, (session.user_id, session.guild_id, session.state, session.expires_at,
+              session.role_name, session.attempts))
+        self.conn.commit()
+
+    def delete(self, user_id: int):
+        self.conn.execute("DELETE FROM onboarding WHERE user_id = ?", (user_id,))
+        self.conn.commit()
@@ -0,0 +1,282 @@
+import discord
+from discord import app_commands
+from discord.ext import commands, tasks
+import asyncio
+import json
+import logging
+import os
+import re
+import sqlite3
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set
+
+from local_db import get_connection
+from sharding import is_primary_worker
+from .config import GUILD_ID
+from .fanout import FanOut, FanOutReport, retry_after
+from .member_edits import member_edits
+from .role import DEF_ROLE_ID, ROLE_DATA
+
+logger = logging.getLogger(__name__)
+
+# The plan is computed from the full member list of the alliance guild
+REQUIRED_INTENTS = ("members",)
+CHUNK_GUILDS = (GUILD_ID,)
+
+RECONCILE_INTERVAL_HOURS = 6
+# The scheduled run only logs its plan unless RECONCILE_AUTO_APPLY=1; /reconcile applies on demand
+RECONCILE_AUTO_APPLY = os.getenv("RECONCILE_AUTO_APPLY", "0").lower() in ("1", "true", "yes")
+MAX_ATTEMPTS = 3  # Runs a failing fix is tried in before it is skipped
+BATCH_CONCURRENCY = 4  # Member edits running at once
+REPORT_LINES = 15  # Planned fixes listed in the report
+RULES_EMOJI = "✅"
+NICK_PREFIX_PATTERN = re.compile(r"^\[[^\]]*\]\s*")
+MAX_NICK_LENGTH = 32
+
+
+@dataclass
+class MemberFix:
+    member_id: int
+    add_role_ids: List[int] = field(default_factory=list)
+    nick: Optional[str] = None
+    reasons: List[str] = field(default_factory=list)
+
+
+class ReconcileStore:
+    """Fixes of the last applied run with their failed attempts.
+
+    Rows are removed as fixes are applied. Every run rebuilds its plan from
+    the current members, so a row left by an interrupted run is never
+    applied as-is; it only carries the member's failed attempts over
+    restarts.
+    """
+
+    def __init__(self, conn: Optional[sqlite3.Connection] = None):
+        self.conn = conn or get_connection()
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS reconcile_pending (
+                member_id INTEGER PRIMARY KEY,
+                add_role_ids TEXT NOT NULL,
+                nick TEXT,
+                reasons TEXT NOT NULL,
+                planned_at REAL NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0
+            );
+        """)
+        columns = {row["name"] for row in self.conn.execute("PRAGMA table_info(reconcile_pending)")}
+        if "attempts" not in columns:
+            # Table created before failed attempts were persisted
+            self.conn.execute("ALTER TABLE reconcile_pending ADD COLUMN attempts INTEGER NOT NULL DEFAULT 0")
+        self.conn.commit()
+
+    def attempts(self) -> Dict[int, int]:
+        """Failed attempts by member ID."""
+        rows = self.conn.execute("SELECT member_id, attempts FROM reconcile_pending WHERE attempts > 0").fetchall()
+        return {row["member_id"]: row["attempts"] for row in rows}
+
+    def save_plan(self, fixes: List[MemberFix]):
+        """Replace the stored plan, keeping the failed attempts of members still in it."""
+        now = time.time()
+        attempts = self.attempts()
+        with self.conn:
+            self.conn.execute("DELETE FROM reconcile_pending")
+            self.conn.executemany(
+                "INSERT INTO reconcile_pending (member_id, add_role_ids, nick, reasons, planned_at, attempts) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [(fix.member_id, json.dumps(fix.add_role_ids), fix.nick, json.dumps(fix.reasons), now,
+                  attempts.get(fix.member_id, 0)) for fix in fixes]
+            )
+
+    def failed(self, member_id: int) -> int:
+        """Record a failed attempt; returns the member's failed attempts so far."""
+        self.conn.execute("UPDATE reconcile_pending SET attempts = attempts + 1 WHERE member_id = ?", (member_id,))
+        self.conn.commit()
+        row = self.conn.execute("SELECT attempts FROM reconcile_pending WHERE member_id = ?", (member_id,)).fetchone()
+        return row["attempts"] if row else 0
+
+    def done(self, member_id: int):
+        self.conn.execute("DELETE FROM reconcile_pending WHERE member_id = ?", (member_id,))
+        self.conn.commit()
+
+
+def plan_fixes(guild: discord.Guild, rules_role_id: Optional[int], rules_reactors: Optional[Set[int]]) -> List[MemberFix]:
+    """Compare the member cache with the expected roles and nicknames."""
+    guild_roles = {info["role_id"]: info["role_name"] for info in ROLE_DATA.values()}
+    top_role = guild.me.top_role
+    assignable = {role.id for role in guild.roles if role < top_role and not role.managed}
+
+    fixes = []
+    for member in guild.members:
+        if member.bot:
+            continue
+        role_ids = {role.id for role in member.roles}
+        fix = MemberFix(member.id)
+
+        member_guilds = [guild_roles[role_id] for role_id in role_ids & guild_roles.keys()]
+        if member_guilds and DEF_ROLE_ID not in role_ids and DEF_ROLE_ID in assignable:
+            fix.add_role_ids.append(DEF_ROLE_ID)
+            fix.reasons.append("DEF")
+        if (rules_reactors is not None and member.id in rules_reactors
+                and rules_role_id not in role_ids and rules_role_id in assignable):
+            fix.add_role_ids.append(rules_role_id)
+            fix.reasons.append("rules")
+
+        editable = member.id != guild.owner_id and member.top_role < top_role
+        if len(member_guilds) == 1 and editable:
+            prefix = f"[{member_guilds[0]}]"
+            if not member.display_name.startswith(prefix):
+                name = NICK_PREFIX_PATTERN.sub("", member.display_name) or member.name
+                fix.nick = f"{prefix} {name}"[:MAX_NICK_LENGTH]
+                fix.reasons.append("nickname")
+
+        if fix.reasons:
+            fixes.append(fix)
+    return fixes
+
+
+def summarize(guild: discord.Guild, fixes: List[MemberFix], skipped: int = 0) -> str:
+    counts: Dict[str, int] = {}
+    for fix in fixes:
+        for reason in fix.reasons:
+            counts[reason] = counts.get(reason, 0) + 1
+    skipped_note = f"{skipped} members skipped after {MAX_ATTEMPTS} failed attempts." if skipped else ""
+    if not fixes:
+        return f"Nothing to reconcile. {skipped_note}".strip()
+
+    lines = [
+        f"**Reconciliation plan**: {len(fixes)} members "
+        f"(missing DEF: {counts.get('DEF', 0)}, rules accepted: {counts.get('rules', 0)}, nicknames: {counts.get('nickname', 0)})"
+    ]
+    if skipped_note:
+        lines.append(skipped_note)
+    for fix in fixes[:REPORT_LINES]:
+        member = guild.get_member(fix.member_id)
+        name = member.display_name if member else str(fix.member_id)
+        detail = ", ".join(fix.reasons) + (f" → {fix.nick}" if fix.nick else "")
+        lines.append(f"• {name}: {detail}")
+    if len(fixes) > REPORT_LINES:
+        lines.append(f"… and {len(fixes) - REPORT_LINES} more")
+    return "\n".join(lines)
+
+
+class Reconcile(commands.Cog):
+    """Repairs role and nickname drift in the alliance guild.
+
+    Fixes: guild role without DEF, ✅ on the rules without the rules role
+    (e.g. reacted while the bot was offline), nickname without the [Guild]
+    prefix. Plans every few hours (applied only with RECONCILE_AUTO_APPLY=1)
+    and runs on demand with /reconcile.
+    """
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.store = ReconcileStore()
+        self.lock = asyncio.Lock()
+
+    async def cog_load(self):
+        if is_primary_worker():
+            self.scheduled_reconcile.start()
+
+    async def cog_unload(self):
+        self.scheduled_reconcile.cancel()
+
+    async def rules_state(self):
+        """Rules role ID and the IDs of the members who accepted the rules, when the Rules cog is loaded."""
+        rules = self.bot.get_cog("Rules")
+        if rules is None:
+            return None, None
+        message = await rules.find_rules_message()
+        if message is None:
+            return rules.role_to_assign, None
+        reaction = discord.utils.find(lambda reaction: str(reaction.emoji) == RULES_EMOJI, message.reactions)
+        if reaction is None:
+            return rules.role_to_assign, set()
+        return rules.role_to_assign, {user.id async for user in reaction.users()}
+
+    async def build_plan(self, guild: discord.Guild) -> List[MemberFix]:
+        if not guild.chunked:
+            await guild.chunk()
+        rules_role_id, rules_reactors = await self.rules_state()
+        return plan_fixes(guild, rules_role_id, rules_reactors)
+
+    async def apply_fix(self, guild: discord.Guild, fix: MemberFix):
+        member = guild.get_member(fix.member_id)
+        if member is None:
+            # Left the guild since the plan was made
+            self.store.done(fix.member_id)
+            return None
+
+        changes = {}
+        if fix.nick:
+            changes["nick"] = fix.nick
+        new_roles = [role for role in map(guild.get_role, fix.add_role_ids) if role]
+        try:
+            # Merged with any change queued for the member by the onboarding flow
+            await member_edits.submit(member, add_roles=new_roles, reason="Role reconciliation", **changes)
+        except Exception as e:
+            if retry_after(e) is not None:
+                raise  # Rate limited: FanOut retries it in this run
+            # Kept with its attempt count: the next runs retry it, then skip it after MAX_ATTEMPTS
+            if self.store.failed(fix.member_id) >= MAX_ATTEMPTS:
+                logger.warning(f"Skipping the reconciliation of member {fix.member_id} after {MAX_ATTEMPTS} failed attempts")
+            raise
+        self.store.done(fix.member_id)
+        return ", ".join(fix.reasons)
+
+    async def run(self, dry_run: bool, on_progress=None) -> str:
+        guild = self.bot.get_guild(GUILD_ID)
+        if guild is None:
+            return "Alliance guild not found."
+
+        async with self.lock:
+            # Always planned from the current members: an interrupted run is picked up
+            # by the next one without applying stale fixes such as old nicknames
+            planned = await self.build_plan(guild)
+            attempts = self.store.attempts()
+            fixes = [fix for fix in planned if attempts.get(fix.member_id, 0) < MAX_ATTEMPTS]
+
+            summary = summarize(guild, fixes, len(planned) - len(fixes))
+            if dry_run:
+                return summary
+            # Members without drift anymore lose their row and failed attempts
+            self.store.save_plan(planned)
+            if not fixes:
+                return summary
+            report: FanOutReport = await FanOut(BATCH_CONCURRENCY, on_progress).run(
+                fixes, lambda fix: self.apply_fix(guild, fix), key=lambda fix: fix.member_id
+            )
+            logger.info(f"Reconciliation applied to {len(report.results)} members, {len(report.failures)} failed")
+            result = f"{summary}\n\nApplied to {len(report.results)} members"
+            if report.failures:
+                result += f", {len(report.failures)} failed"
+            return result + "."
+
+    @tasks.loop(hours=RECONCILE_INTERVAL_HOURS)
+    async def scheduled_reconcile(self):
+        try:
+            logger.info(await self.run(dry_run=not RECONCILE_AUTO_APPLY))
+        except Exception:
+            logger.exception("Scheduled reconciliation failed")
+
+    @scheduled_reconcile.before_loop
+    async def before_scheduled_reconcile(self):
+        await self.bot.wait_until_ready()
+
+    @app_commands.command(name="reconcile", description="Repair missing roles and nickname prefixes of the alliance members")
+    @app_commands.describe(dry_run="Only list what would be fixed (default)")
+    @app_commands.checks.has_permissions(administrator=True)
+    async def reconcile(self, interaction: discord.Interaction, dry_run: bool = True):
+        await interaction.response.defer(ephemeral=True)
+
+        async def show_progress(report: FanOutReport):
+            await interaction.edit_original_response(
+                content=f"Reconciling: {report.done}/{report.total} members, {len(report.failures)} failed."
+            )
+
+        result = await self.run(dry_run, show_progress)
+        await interaction.followup.send(result[:2000], ephemeral=True)
+
+
+async def setup(bot):
+    await bot.add_cog(Reconcile(bot))
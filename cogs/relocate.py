@@ -2,98 +2,95 @@ import discord
 from discord.ext import commands
 from discord import app_commands
 import logging
-import asyncio
-from asyncio import Lock
+
+from .relocation import MAX_MESSAGES, RelocationEngine, parse_selection
+
+logger = logging.getLogger(__name__)
+
+REQUIRED_INTENTS = ("message_content",)
+PROGRESS_EVERY = 10  # Messages between two progress updates
 
 class Relocate(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.relocating_messages = {}  # Dictionary to keep track of relocating messages
-        self.locks = {}  # Locks to prevent race conditions
+        self.engine = RelocationEngine(bot)
+
+    @app_commands.command(name="relocate", description="Relocate messages to a different channel")
+    @app_commands.describe(
+        messages="A message ID, a list of IDs, or a range 'first_id-last_id'",
+        target_channel="Channel the messages are moved to",
+        source_channel="Channel the messages are in (this channel by default)",
+        use_webhook="Keep the author's name and avatar on the copies",
+        delete_original="Delete the original messages once copied"
+    )
+    @app_commands.default_permissions(manage_messages=True)
+    async def relocate(self, interaction: discord.Interaction, messages: str, target_channel: discord.TextChannel,
+                       source_channel: discord.TextChannel = None, use_webhook: bool = True, delete_original: bool = True):
+        channel = source_channel or interaction.channel
+        # default_permissions only hides the command; the member must be able to move messages themselves
+        source_permissions = channel.permissions_for(interaction.user)
+        if not (source_permissions.read_message_history and source_permissions.manage_messages):
+            await interaction.response.send_message(
+                f"You need Read Message History and Manage Messages in {channel.mention} to relocate its messages.",
+                ephemeral=True
+            )
+            return
+        if not target_channel.permissions_for(interaction.user).send_messages:
+            await interaction.response.send_message(
+                f"You cannot send messages in {target_channel.mention}.", ephemeral=True
+            )
+            return
 
-    @app_commands.command(name="relocate", description="Relocate a message to a different channel")
-    async def relocate(self, interaction: discord.Interaction, message_id: str, target_channel: discord.TextChannel):
         try:
             await interaction.response.defer(ephemeral=True)  # Defer the response to give time for processing
         except discord.errors.NotFound:
-            logging.error("Interaction not found when attempting to defer response")
+            logger.error("Interaction not found when attempting to defer response")
             return
 
-        logging.info(f"Relocate command invoked by {interaction.user} for message {message_id} to {target_channel}")
+        logger.info(f"Relocate command invoked by {interaction.user} for {messages} from {channel} to {target_channel}")
 
-        try:
-            # Ensure a lock exists for this message
-            if message_id not in self.locks:
-                self.locks[message_id] = Lock()
-
-            async with self.locks[message_id]:
-                # Fetch the message by ID
-                channel = interaction.channel
-                try:
-                    message = await channel.fetch_message(message_id)
-                except discord.errors.NotFound:
-                    logging.error("The message ID provided does not exist")
-                    await interaction.followup.send("The message ID provided does not exist.")
-                    return
-
-                # Check if the message is already being relocated
-                if message_id in self.relocating_messages:
-                    await interaction.followup.send("This message is already being relocated.")
-                    return
+        selection = parse_selection(messages)
+        if selection.first is None and not selection.ids:
+            await interaction.followup.send("Give a message ID, a list of IDs or a range 'first_id-last_id'.")
+            return
 
-                # Mark the message as being relocated
-                self.relocating_messages[message_id] = True
+        try:
+            found = await self.engine.collect(channel, selection)
+            if not found:
+                await interaction.followup.send("The message ID provided does not exist.")
+                return
 
-                logging.info(f"Fetched message: {message.content if message.content else 'Image/Embed'}")
+            can_delete = channel.permissions_for(channel.guild.me).manage_messages
+            if delete_original and not can_delete:
+                logger.warning("Missing permission to manage messages in the source channel.")
 
-                # Relocate message content or attachments
-                relocated = False
-                if message.content:
-                    await target_channel.send(f"**Message from {message.author.name} in {channel.mention}:**\n{message.content}")
-                    relocated = True
-                elif message.attachments:
-                    for attachment in message.attachments:
-                        await target_channel.send(file=await attachment.to_file())
-                    relocated = True
-                else:
-                    await interaction.followup.send("The message has no content or attachments to relocate.")
-                    return
+            async def show_progress(done: int, total: int):
+                if done % PROGRESS_EVERY == 0 and done < total:
+                    await interaction.edit_original_response(content=f"Relocating messages: {done}/{total}")
 
-                # Ensure only one relocation happens
-                if relocated:
-                    await asyncio.sleep(1)  # Small delay to ensure the message is sent before deleting the original
+            result = await self.engine.relocate(
+                found, target_channel, use_webhook=use_webhook,
+                delete_originals=delete_original and can_delete, on_progress=show_progress
+            )
 
-                    # Check for the necessary permissions to delete the message
-                    if not channel.permissions_for(interaction.guild.me).manage_messages:
-                        logging.warning("Missing permission to manage messages in the source channel.")
-                        await interaction.followup.send("Relocation was successful, but the bot lacks permissions to delete the original message.")
-                    else:
-                        # Delete the original message with retry logic
-                        for attempt in range(3):
-                            try:
-                                await message.delete()
-                                logging.info("Original message deleted")
-                                await interaction.followup.send("Message relocated successfully.")
-                                break
-                            except discord.errors.NotFound:
-                                logging.warning("Message was not found or already deleted on attempt {attempt+1}")
-                                if attempt == 2:
-                                    await interaction.followup.send("Message was not found or already deleted after multiple attempts.")
-                            except discord.errors.Forbidden:
-                                logging.error("The bot lacks permissions to delete the message")
-                                await interaction.followup.send("Relocation was successful, but the bot lacks permissions to delete the original message.")
-                                break
-                            await asyncio.sleep(1)  # Wait before retrying
+            summary = f"Relocated {len(result.moved)} message(s) to {target_channel.mention}."
+            if len(found) == MAX_MESSAGES:
+                summary += f" Only the first {MAX_MESSAGES} messages were selected."
+            if result.failed:
+                summary += f" {result.failed} could not be copied."
+            if result.skipped:
+                summary += f" {result.skipped} skipped (empty or already being relocated)."
+            if delete_original and not can_delete:
+                summary += " The bot lacks permissions to delete the original messages."
+            elif result.deleted and result.deleted.failed:
+                summary += f" {result.deleted.failed} original(s) could not be deleted."
+            await interaction.followup.send(summary)
         except discord.errors.Forbidden:
-            logging.error("The bot lacks permissions to perform this action")
+            logger.error("The bot lacks permissions to perform this action")
             await interaction.followup.send("The bot lacks permissions to perform this action. Please ensure the bot has 'Manage Messages' permission.")
         except Exception as e:
-            logging.exception(f"Error in relocate command: {e}")
+            logger.exception(f"Error in relocate command: {e}")
             await interaction.followup.send(f"An error occurred while processing your request: {e}")
-        finally:
-            # Clear the relocating state for the message and remove the lock
-            self.relocating_messages.pop(message_id, None)
-            self.locks.pop(message_id, None)
 
 async def setup(bot):
     cog = Relocate(bot)
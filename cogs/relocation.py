@@ -0,0 +1,171 @@
+import discord
+import asyncio
+import logging
+import re
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, List, Optional, Set
+
+from .bulk_delete import DeleteResult, delete_messages
+from .transfers import TransferBatch, TransferError, attachment_transfers
+
+logger = logging.getLogger(__name__)
+
+MAX_MESSAGES = 500  # Messages moved by one relocation
+PREFETCH = 4  # Messages downloaded ahead of the one being re-posted
+WEBHOOK_NAME = "Start2000 Relocate"
+MESSAGE_LIMIT = 2000
+RANGE_PATTERN = re.compile(r"^\s*(\d+)\s*(?:-|\.\.)\s*(\d+)\s*$")
+ID_PATTERN = re.compile(r"\d{15,21}")
+
+
+@dataclass
+class Selection:
+    """Messages picked by the user: an inclusive ID range or a list of IDs."""
+    first: Optional[int] = None
+    last: Optional[int] = None
+    ids: List[int] = field(default_factory=list)
+
+
+def parse_selection(text: str) -> Selection:
+    """Parse '123-456' (range, oldest to newest) or '123, 456 789' (list)."""
+    match = RANGE_PATTERN.match(text)
+    if match:
+        first, last = sorted((int(match.group(1)), int(match.group(2))))
+        return Selection(first=first, last=last)
+    ids = [int(message_id) for message_id in ID_PATTERN.findall(text)]
+    return Selection(ids=list(dict.fromkeys(ids)))
+
+
+@dataclass
+class RelocationResult:
+    moved: List[discord.Message] = field(default_factory=list)
+    failed: int = 0
+    skipped: int = 0  # Nothing to copy, or already being moved
+    deleted: Optional[DeleteResult] = None
+
+
+class RelocationEngine:
+    """Moves messages between channels, keeping their text, attachments and embeds.
+
+    Attachments of the next messages are streamed to spool files while the
+    current one is re-posted (at most PREFETCH ahead); re-posts are sequential so the order
+    is kept. Through a webhook, copies keep the author's name and avatar.
+    """
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.webhooks: Dict[int, discord.Webhook] = {}
+        self.in_progress: Set[int] = set()  # IDs of messages being moved
+
+    async def collect(self, channel: discord.TextChannel, selection: Selection) -> List[discord.Message]:
+        """Fetch the selected messages, oldest first."""
+        if selection.first is not None:
+            return [
+                message async for message in channel.history(
+                    limit=MAX_MESSAGES, after=discord.Object(id=selection.first - 1),
+                    before=discord.Object(id=selection.last + 1), oldest_first=True
+                )
+            ]
+
+        async def fetch(message_id: int) -> Optional[discord.Message]:
+            try:
+                return await channel.fetch_message(message_id)
+            except discord.NotFound:
+                return None
+
+        messages = await asyncio.gather(*(fetch(message_id) for message_id in selection.ids[:MAX_MESSAGES]))
+        return sorted((message for message in messages if message), key=lambda message: message.id)
+
+    async def get_webhook(self, channel: discord.TextChannel) -> Optional[discord.Webhook]:
+        """The bot's relocation webhook of a channel, created on first use; None without Manage Webhooks."""
+        webhook = self.webhooks.get(channel.id)
+        if webhook:
+            return webhook
+        try:
+            webhook = discord.utils.find(
+                lambda hook: hook.user == self.bot.user and hook.name == WEBHOOK_NAME, await channel.webhooks()
+            ) or await channel.create_webhook(name=WEBHOOK_NAME, reason="Message relocation")
+        except discord.Forbidden:
+            return None
+        self.webhooks[channel.id] = webhook
+        return webhook
+
+    async def download(self, message: discord.Message) -> TransferBatch:
+        return await attachment_transfers.fetch(message.attachments)
+
+    async def repost(self, message: discord.Message, files: List[discord.File], target: discord.TextChannel,
+                     webhook: Optional[discord.Webhook]):
+        embeds = copyable_embeds(message)
+        no_mentions = discord.AllowedMentions.none()
+        if webhook:
+            chunks = split_text(message.content) or [""]
+            for chunk in chunks[:-1]:
+                await webhook.send(chunk, username=message.author.display_name,
+                                   avatar_url=message.author.display_avatar.url, allowed_mentions=no_mentions, wait=True)
+            await webhook.send(chunks[-1], username=message.author.display_name,
+                               avatar_url=message.author.display_avatar.url, files=files, embeds=embeds,
+                               allowed_mentions=no_mentions, wait=True)
+            return
+
+        header = f"**Message from {message.author.name} in {message.channel.mention}:**"
+        chunks = split_text(f"{header}\n{message.content}" if message.content else header)
+        for chunk in chunks[:-1]:
+            await target.send(chunk, allowed_mentions=no_mentions)
+        await target.send(chunks[-1], files=files, embeds=embeds, allowed_mentions=no_mentions)
+
+    async def relocate(self, messages: List[discord.Message], target: discord.TextChannel, *,
+                       use_webhook: bool = True, delete_originals: bool = True,
+                       on_progress: Optional[Callable[[int, int], Awaitable[None]]] = None) -> RelocationResult:
+        result = RelocationResult()
+        selected = len(messages)
+        messages = [message for message in messages if message.id not in self.in_progress]
+        result.skipped = selected - len(messages)
+        self.in_progress.update(message.id for message in messages)
+        webhook = await self.get_webhook(target) if use_webhook else None
+        prefetch = asyncio.Semaphore(PREFETCH)
+
+        async def prepare(message: discord.Message) -> TransferBatch:
+            await prefetch.acquire()
+            return await self.download(message)
+
+        downloads = [asyncio.create_task(prepare(message)) for message in messages]
+        try:
+            for position, (message, download) in enumerate(zip(messages, downloads), start=1):
+                batch = None
+                try:
+                    batch = await download
+                    if message.content or batch.files or copyable_embeds(message):
+                        await self.repost(message, batch.files, target, webhook)
+                        result.moved.append(message)
+                    else:
+                        result.skipped += 1
+                except (discord.HTTPException, TransferError) as e:
+                    logger.warning(f"Could not relocate message {message.id}: {e}")
+                    result.failed += 1
+                finally:
+                    if batch is not None:
+                        batch.close()
+                    prefetch.release()
+                if on_progress:
+                    await on_progress(position, len(messages))
+        finally:
+            for download in downloads:
+                if not download.done():
+                    download.cancel()
+                elif not download.cancelled() and download.exception() is None:
+                    # Downloaded ahead but never posted: free its files
+                    download.result().close()
+            self.in_progress.difference_update(message.id for message in messages)
+
+        if delete_originals and result.moved:
+            result.deleted = await delete_messages(result.moved[0].channel, result.moved)
+        return result
+
+
+def copyable_embeds(message: discord.Message) -> List[discord.Embed]:
+    # Link previews are regenerated by Discord; only rich embeds are copied
+    return [embed for embed in message.embeds if embed.type == "rich"][:10]
+
+
+def split_text(text: str) -> List[str]:
+    return [text[start:start + MESSAGE_LIMIT] for start in range(0, len(text), MESSAGE_LIMIT)]
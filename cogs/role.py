@@ -1,15 +1,15 @@
 import discord
-from discord.ext import commands
+from discord.ext import commands, tasks
 from typing import Dict, Optional
 import logging
-import asyncio
+import time
+from dataclasses import replace
 from datetime import datetime
 
-# Setup logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+from .config import GUILD_ID
+from .member_edits import member_edits
+from .onboarding import IGN_SET, ROLE_CHOSEN, WELCOMED, OnboardingSession, OnboardingStore
+
 logger = logging.getLogger(__name__)
 
 # Role configuration
@@ -60,15 +60,25 @@ ROLE_DATA: Dict[str, Dict[str, any]] = {
     },
 }
 
+# Member roles are read on every message and updated from the selection panel
+REQUIRED_INTENTS = ("members",)
+
 DEF_ROLE_ID: int = 1300093554064097401
 NICKNAME_TIMEOUT: int = 300  # 5 minutes
 MAX_RETRIES: int = 3
+WELCOME_COOLDOWN: int = 300  # Seconds before a member still without roles is welcomed again
+DONE_RETENTION: int = 24 * 3600  # Seconds a finished onboarding is remembered
 
 class RoleSelectionView(discord.ui.View):
-    def __init__(self, bot: commands.Bot, member: discord.Member):
+    """Role selection panel shared by every welcome DM.
+
+    It is registered once with bot.add_view, so panels sent before a restart
+    keep working; the member is resolved from the interaction.
+    """
+
+    def __init__(self, bot: commands.Bot):
         super().__init__(timeout=None)
         self.bot = bot
-        self.member = member
         self._add_role_buttons()
 
     def _add_role_buttons(self) -> None:
@@ -77,7 +87,6 @@ class RoleSelectionView(discord.ui.View):
             self.add_item(
                 RoleButton(
                     self.bot,
-                    self.member,
                     role_name,
                     role_info["emoji"],
                     role_info["role_name"],
@@ -90,7 +99,6 @@ class RoleButton(discord.ui.Button):
     def __init__(
         self, 
         bot: commands.Bot,
-        member: discord.Member,
         role_name: str,
         emoji: str,
         role_display_name: str,
@@ -104,7 +112,6 @@ class RoleButton(discord.ui.Button):
             custom_id=f"role_{role_name.lower()}"
         )
         self.bot = bot
-        self.member = member
         self.role_display_name = role_display_name
         self.role_id = role_id
         self.color = color
@@ -114,22 +121,39 @@ class RoleButton(discord.ui.Button):
         try:
             await interaction.response.defer(ephemeral=True)
             
-            server = interaction.guild or self.member.guild
+            # Panels are clicked from DMs, where the interaction has no guild
+            server = interaction.guild or self.bot.get_guild(GUILD_ID)
             if not server:
                 await interaction.followup.send("Server not found. Please try again.", ephemeral=True)
                 return
 
+            member = await self._resolve_member(server, interaction.user)
+            if member is None:
+                await interaction.followup.send("You are no longer a member of the server.", ephemeral=True)
+                return
+
             # Handle role assignment
-            success = await self._handle_role_assignment(server, interaction)
+            success = await self._handle_role_assignment(server, member, interaction)
             if success:
-                # Handle nickname setup
-                await self._handle_nickname_setup(interaction)
+                # The in-game name is collected from the member's next DM
+                await self.bot.get_cog("RoleCog").start_nickname_setup(member, self.role_display_name, interaction)
                 
         except Exception as e:
             logger.error(f"Error in button callback: {str(e)}")
             await interaction.followup.send("An error occurred. Please try again or contact an admin.", ephemeral=True)
 
-    async def _handle_role_assignment(self, server: discord.Guild, interaction: discord.Interaction) -> bool:
+    @staticmethod
+    async def _resolve_member(server: discord.Guild, user: discord.abc.User) -> Optional[discord.Member]:
+        """The guild member behind the user who clicked"""
+        member = server.get_member(user.id)
+        if member is None:
+            try:
+                member = await server.fetch_member(user.id)
+            except discord.NotFound:
+                return None
+        return member
+
+    async def _handle_role_assignment(self, server: discord.Guild, member: discord.Member, interaction: discord.Interaction) -> bool:
         """Handle the role assignment process"""
         try:
             # Get or create guild role
@@ -145,7 +169,7 @@ class RoleButton(discord.ui.Button):
                 return False
 
             # Assign roles
-            await self.member.add_roles(role, def_role, reason=f"Roles assigned via selection panel at {datetime.now()}")
+            await member_edits.submit(member, add_roles=(role, def_role), reason=f"Roles assigned via selection panel at {datetime.now()}")
             await interaction.followup.send(
                 f"✅ You've been assigned the **{self.role_display_name}** and **DEF** roles successfully!",
                 ephemeral=True
@@ -174,58 +198,114 @@ class RoleButton(discord.ui.Button):
             logger.error(f"Error creating role: {str(e)}")
             return None
 
-    async def _handle_nickname_setup(self, interaction: discord.Interaction) -> None:
-        """Handle the nickname setup process"""
-        for attempt in range(MAX_RETRIES):
-            try:
-                # Ask for IGN
-                await self.member.send("Please enter your in-game name:")
-                
-                response = await self.bot.wait_for(
-                    "message",
-                    check=lambda m: m.author == self.member and isinstance(m.channel, discord.DMChannel),
-                    timeout=NICKNAME_TIMEOUT
-                )
-
-                new_nickname = f"[{self.role_display_name}] {response.content}"
-                await self.member.edit(nick=new_nickname)
-                await self.member.send(f"✅ Your nickname has been set to **{new_nickname}**")
-                return
-
-            except asyncio.TimeoutError:
-                remaining_attempts = MAX_RETRIES - attempt - 1
-                if remaining_attempts > 0:
-                    await self.member.send(f"Time out! You have {remaining_attempts} more attempts.")
-                else:
-                    await self.member.send("Nickname setup timed out. Please contact an admin to set your nickname.")
-            except discord.Forbidden:
-                await interaction.followup.send(
-                    "I couldn't send you a DM or change your nickname. Please check your privacy settings and contact an admin.",
-                    ephemeral=True
-                )
-                return
-            except Exception as e:
-                logger.error(f"Error in nickname setup: {str(e)}")
-                await self.member.send("An error occurred. Please contact an admin to set your nickname.")
-                return
-
 class RoleCog(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
-        self.recent_welcomes = set()  # Prevent duplicate welcomes
+        self.store = OnboardingStore()
+        self.selection_view = RoleSelectionView(bot)
+        # Onboarding sessions by user ID: checked on every guild message, DM replies are routed through it
+        self.sessions: Dict[int, OnboardingSession] = {}
+
+    async def cog_load(self) -> None:
+        self.sessions = {session.user_id: session for session in self.store.load()}
+        self.bot.add_view(self.selection_view)
+        self.expire_sessions.start()
+
+    async def cog_unload(self) -> None:
+        self.expire_sessions.cancel()
+        self.selection_view.stop()
+
+    def _save(self, session: OnboardingSession) -> None:
+        self.sessions[session.user_id] = session
+        self.store.save(session)
+
+    def _end(self, user_id: int) -> None:
+        self.sessions.pop(user_id, None)
+        self.store.delete(user_id)
 
     @commands.Cog.listener()
     async def on_message(self, message: discord.Message) -> None:
         """Handle new messages for role assignment"""
-        if message.author.bot or not message.guild:
+        if message.author.bot:
+            return
+
+        if not message.guild:
+            session = self.sessions.get(message.author.id)
+            if session and session.state == ROLE_CHOSEN:
+                await self.set_nickname(session, message)
             return
 
         user = message.author
-        if len(user.roles) <= 1 and user.id not in self.recent_welcomes:
-            self.recent_welcomes.add(user.id)
-            await self.send_welcome_message(user)
-            await asyncio.sleep(300)  # Clear from recent welcomes after 5 minutes
-            self.recent_welcomes.discard(user.id)
+        if user.id in self.sessions:
+            return
+        if len(user.roles) > 1:
+            return
+        self._save(OnboardingSession(user.id, message.guild.id, WELCOMED, time.time() + WELCOME_COOLDOWN))
+        await self.send_welcome_message(user)
+
+    async def start_nickname_setup(self, member: discord.Member, role_display_name: str, interaction: discord.Interaction) -> None:
+        """Move a member to the "role chosen" state and ask for their in-game name"""
+        self._save(OnboardingSession(
+            member.id, member.guild.id, ROLE_CHOSEN, time.time() + NICKNAME_TIMEOUT, role_display_name, attempts=1
+        ))
+        try:
+            await member.send("Please enter your in-game name:")
+        except discord.Forbidden:
+            self._end(member.id)
+            await interaction.followup.send(
+                "I couldn't send you a DM or change your nickname. Please check your privacy settings and contact an admin.",
+                ephemeral=True
+            )
+
+    async def set_nickname(self, session: OnboardingSession, message: discord.Message) -> None:
+        """Apply the in-game name received in DM"""
+        new_nickname = f"[{session.role_name}] {message.content}"
+        try:
+            guild = self.bot.get_guild(session.guild_id)
+            member = guild.get_member(session.user_id) or await guild.fetch_member(session.user_id)
+            await member_edits.submit(member, nick=new_nickname, reason="In-game name given during onboarding")
+        except discord.Forbidden:
+            self._end(session.user_id)
+            await message.channel.send("I couldn't change your nickname. Please contact an admin.")
+            return
+        except Exception as e:
+            logger.error(f"Error in nickname setup: {str(e)}")
+            self._end(session.user_id)
+            await message.channel.send("An error occurred. Please contact an admin to set your nickname.")
+            return
+
+        self._save(replace(session, state=IGN_SET, expires_at=time.time() + DONE_RETENTION))
+        await message.channel.send(f"✅ Your nickname has been set to **{new_nickname}**")
+
+    @tasks.loop(seconds=30)
+    async def expire_sessions(self) -> None:
+        """Advance or drop the sessions whose deadline has passed"""
+        now = time.time()
+        for session in [session for session in self.sessions.values() if session.expires_at <= now]:
+            if session.state == ROLE_CHOSEN:
+                await self._nickname_timed_out(session)
+            else:
+                # Welcomed members may be welcomed again, finished ones are forgotten
+                self._end(session.user_id)
+
+    @expire_sessions.before_loop
+    async def before_expire_sessions(self) -> None:
+        await self.bot.wait_until_ready()
+
+    async def _nickname_timed_out(self, session: OnboardingSession) -> None:
+        remaining_attempts = MAX_RETRIES - session.attempts
+        try:
+            user = self.bot.get_user(session.user_id) or await self.bot.fetch_user(session.user_id)
+            if remaining_attempts > 0:
+                self._save(replace(session, attempts=session.attempts + 1, expires_at=time.time() + NICKNAME_TIMEOUT))
+                await user.send(f"Time out! You have {remaining_attempts} more attempts.")
+                await user.send("Please enter your in-game name:")
+            else:
+                self._end(session.user_id)
+                await user.send("Nickname setup timed out. Please contact an admin to set your nickname.")
+        except discord.HTTPException as e:
+            logger.warning(f"Could not continue the nickname setup of {session.user_id}: {e}")
+            self._end(session.user_id)
 
     async def send_welcome_message(self, member: discord.Member) -> None:
         """Send welcome message with role selection panel"""
@@ -245,7 +325,7 @@ class RoleCog(commands.Cog):
 
             await member.send(
                 embed=embed,
-                view=RoleSelectionView(self.bot, member)
+                view=self.selection_view
             )
             logger.info(f"Welcome message sent to {member.name}#{member.discriminator}")
             
@@ -1,5 +1,13 @@
 import discord
 from discord.ext import commands
+import logging
+from sharding import is_primary_worker
+
+from .member_edits import member_edits
+
+logger = logging.getLogger(__name__)
+
+REQUIRED_INTENTS = ("members",)
 
 class Rules(commands.Cog):
    def __init__(self, bot):
@@ -40,23 +48,35 @@ class Rules(commands.Cog):
 
    @commands.Cog.listener()
    async def on_ready(self):
-       print(f"{self.bot.user} is ready and Rules Cog is active!")
-       await self.check_rules()
+       logger.info(f"{self.bot.user} is ready and Rules Cog is active!")
+       if is_primary_worker():
+           await self.check_rules()
 
-   async def check_rules(self):
+   async def find_rules_message(self):
+       """Return the rules message posted by the bot, if any."""
        channel = self.bot.get_channel(self.rules_channel_id)
        if not channel:
-           print("Rules channel not found. Please check the ID.")
-           return
+           logger.error("Rules channel not found. Please check the ID.")
+           return None
 
-       # Check for existing rules message
        async for message in channel.history(limit=10):
            if message.author == self.bot.user and message.embeds:
                if message.embeds[0].title == "Règlement du Serveur Discord de l'Alliance [START]":
-                   # Rules already exist, just ensure reaction is present
-                   if not any(reaction.emoji == "✅" for reaction in message.reactions):
-                       await message.add_reaction("✅")
-                   return
+                   return message
+       return None
+
+   async def check_rules(self):
+       if not self.bot.get_channel(self.rules_channel_id):
+           logger.error("Rules channel not found. Please check the ID.")
+           return
+
+       # Check for existing rules message
+       message = await self.find_rules_message()
+       if message:
+           # Rules already exist, just ensure reaction is present
+           if not any(reaction.emoji == "✅" for reaction in message.reactions):
+               await message.add_reaction("✅")
+           return
 
        # If no rules message found, post new one
        await self.post_rules()
@@ -82,8 +102,8 @@ class Rules(commands.Cog):
            guild = self.bot.get_guild(payload.guild_id)
            role = guild.get_role(self.role_to_assign)
            if role and role not in payload.member.roles:
-               await payload.member.add_roles(role)
-               print(f"Assigned role {role.name} to {payload.member.display_name}.")
+               await member_edits.submit(payload.member, add_roles=(role,), reason="Rules accepted")
+               logger.info(f"Assigned role {role.name} to {payload.member.display_name}.")
 
 async def setup(bot):
    await bot.add_cog(Rules(bot))
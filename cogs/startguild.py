@@ -3,9 +3,21 @@ from discord.ext import commands
 from collections import defaultdict
 from datetime import datetime, timedelta
 import asyncio
+import os
 from typing import Optional
+import logging
 from .config import GUILD_ID, PING_DEF_CHANNEL_ID, ALERTE_DEF_CHANNEL_ID
-from .views import GuildPingView
+from .views import AlertActionButton, GuildPingView, pending_uploads
+from metrics import timed
+from sharding import is_primary_worker
+
+# Online counts of the DEF roles need the presences intent, which streams every status
+# change of the guild; it is opt-in (DEF_ONLINE_COUNTS=1), otherwise all DEF members are counted
+ONLINE_COUNTS = os.getenv("DEF_ONLINE_COUNTS", "0").lower() in ("1", "true", "yes")
+REQUIRED_INTENTS = ("members", "presences") if ONLINE_COUNTS else ("members",)
+CHUNK_GUILDS = (GUILD_ID,)
+
+logger = logging.getLogger(__name__)
 
 class StartGuildCog(commands.Cog):
     def __init__(self, bot: commands.Bot):
@@ -14,6 +26,16 @@ class StartGuildCog(commands.Cog):
         self.ping_history = defaultdict(list)
         self.member_counts = {}
         self.panel_message: Optional[discord.Message] = None
+        self.panel_view = GuildPingView(bot)
+
+    async def cog_load(self):
+        # Registered once: the panel and every alert message keep working across restarts
+        self.bot.add_view(self.panel_view)
+        self.bot.add_dynamic_items(AlertActionButton)
+
+    async def cog_unload(self):
+        self.panel_view.stop()
+        self.bot.remove_dynamic_items(AlertActionButton)
 
     @staticmethod
     def create_progress_bar(percentage: float, length: int = 10) -> str:
@@ -25,12 +47,13 @@ class StartGuildCog(commands.Cog):
         """Mise à jour précise des membres connectés"""
         guild = self.bot.get_guild(GUILD_ID)
         if guild:
-            await guild.chunk()  # Charge tous les membres
+            if not guild.chunked:
+                await guild.chunk()  # Charge tous les membres
             for role in guild.roles:
                 if role.name.startswith("DEF"):
                     self.member_counts[role.name] = sum(
                         1 for m in role.members 
-                        if not m.bot and m.raw_status != 'offline'
+                        if not m.bot and (not ONLINE_COUNTS or m.raw_status != 'offline')
                     )
 
     def add_ping_record(self, guild_name: str, author_id: int):
@@ -85,7 +108,7 @@ class StartGuildCog(commands.Cog):
             "1️⃣ Cliquez sur le bouton de votre guilde\n"
             "2️⃣ Suivez les mises à jour dans #║╟➢📯alertes-def \n"
             "3️⃣ Ajoutez des notes si nécessaire\n\n"
-            f"👥 Membres connectés: {total_connectes}\n"
+            f"👥 Membres {'connectés' if ONLINE_COUNTS else 'DEF'}: {total_connectes}\n"
             "```ansi\n[2;34m[!] Statut système: [0m[2;32mOPÉRATIONNEL[0m```"
         )
 
@@ -114,6 +137,7 @@ class StartGuildCog(commands.Cog):
         
         return embed
 
+    @timed("panel_refresh")
     async def ensure_panel(self):
         await self.update_member_counts()
         
@@ -131,7 +155,7 @@ class StartGuildCog(commands.Cog):
                     self.panel_message = msg
                     break
 
-        view = GuildPingView(self.bot)
+        view = self.panel_view
         embed = await self.create_panel_embed()
 
         if self.panel_message:
@@ -220,8 +244,15 @@ class StartGuildCog(commands.Cog):
         
         await channel.send(embed=log_embed)
 
+    @commands.Cog.listener()
+    async def on_message(self, message: discord.Message):
+        if message.attachments and not message.author.bot:
+            await pending_uploads.dispatch(message)
+
     @commands.Cog.listener()
     async def on_ready(self):
+        if not is_primary_worker():
+            return
         await self.ensure_panel()
         guild = self.bot.get_guild(GUILD_ID)
         
@@ -241,7 +272,7 @@ class StartGuildCog(commands.Cog):
                 name=f"{sum(self.member_counts.values())} défenseurs"
             )
         )
-        print(f"✅ Système opérationnel • {datetime.now().strftime('%d/%m/%Y %H:%M')}")
+        logger.info(f"✅ Système opérationnel • {datetime.now().strftime('%d/%m/%Y %H:%M')}")
 
 async def setup(bot: commands.Bot):
     await bot.add_cog(StartGuildCog(bot))
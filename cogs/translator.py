@@ -1,6 +1,15 @@
 import discord
 from discord.ext import commands
 from googletrans import Translator, LANGUAGES
+import logging
+from logging_setup import log_extra
+
+logger = logging.getLogger(__name__)
+
+# on_reaction_add only fires for cached messages: flags are added to recent
+# messages, so a short window is enough (discord.py's default keeps 1000)
+REQUIRED_INTENTS = ("message_content",)
+MESSAGE_CACHE = 200
 
 class TranslatorCog(commands.Cog):
     def __init__(self, bot):
@@ -10,9 +19,9 @@ class TranslatorCog(commands.Cog):
         self.translator = Translator()
         try:
             test_translation = self.translator.translate("Hello", dest="es")
-            print(f"Translator initialized successfully. Test translation: 'Hello' -> '{test_translation.text}'")
+            logger.info(f"Translator initialized successfully. Test translation: 'Hello' -> '{test_translation.text}'")
         except Exception as e:
-            print(f"Error initializing Translator: {e}")
+            logger.error(f"Error initializing Translator: {e}")
 
         # Language map for reactions
         self.LANGUAGE_MAP = {
@@ -32,34 +41,32 @@ class TranslatorCog(commands.Cog):
 
     @commands.Cog.listener()
     async def on_reaction_add(self, reaction, user):
-        print("Reaction detected.")
-
         # Ignore bot reactions
         if user.bot:
-            print("Ignoring reaction from a bot.")
+            return
+
+        # Most reactions are not translation flags: check that before anything else
+        emoji_used = str(reaction.emoji)
+        language_code = self.LANGUAGE_MAP.get(emoji_used)
+        if not language_code:
             return
 
         channel = reaction.message.channel
+        context = log_extra(guild=channel.guild, user=user, channel=channel)
         bot_permissions = channel.permissions_for(channel.guild.me)
         if not bot_permissions.read_message_history:
-            print("Bot lacks 'read_message_history' permission.")
+            logger.warning("Bot lacks 'read_message_history' permission.", extra=context)
             return
         if not bot_permissions.send_messages:
-            print("Bot lacks 'send_messages' permission.")
-            return
-
-        emoji_used = str(reaction.emoji)
-        language_code = self.LANGUAGE_MAP.get(emoji_used)
-        if not language_code:
-            print(f"Unsupported emoji detected: {emoji_used}")
+            logger.warning("Bot lacks 'send_messages' permission.", extra=context)
             return
 
         original_text = reaction.message.content.strip()
         if not original_text:
-            print("Message content is empty or non-text. Skipping.")
+            logger.debug("Message content is empty or non-text. Skipping.", extra=context)
             return
 
-        print(f"Translating message: '{original_text}' to {LANGUAGES.get(language_code, 'unknown language')}.")
+        logger.debug(f"Translating message to {LANGUAGES.get(language_code, 'unknown language')}.", extra=context)
 
         try:
             translation = self.translator.translate(original_text, dest=language_code)
@@ -72,7 +79,7 @@ class TranslatorCog(commands.Cog):
             else:
                 target_lang = LANGUAGES.get(language_code, language_code).capitalize()
             
-            print(f"Translation successful: '{original_text}' from {source_lang} to {target_lang} -> '{translated_text}'")
+            logger.info(f"Translation successful from {source_lang} to {target_lang}", extra=context)
 
             embed = discord.Embed(
                 title="Translation Result",
@@ -96,7 +103,7 @@ class TranslatorCog(commands.Cog):
             await channel.send(embed=embed)
 
         except Exception as e:
-            print(f"Translation failed: {e}")
+            logger.exception(f"Translation failed: {e}", extra=context)
             await channel.send("An error occurred while translating the message. Please try again later.")
 
     @commands.command()
@@ -114,7 +121,7 @@ class TranslatorCog(commands.Cog):
             translated_text = translation.text
             source_lang = LANGUAGES.get(translation.src, translation.src).capitalize()
             target_lang = LANGUAGES.get(lang, lang).capitalize()
-            print(f"Translation successful: '{original_text}' from {source_lang} to {target_lang} -> '{translated_text}'")
+            logger.info(f"Translation successful from {source_lang} to {target_lang}", extra=log_extra(ctx.guild, ctx.author, ctx.channel))
 
             embed = discord.Embed(
                 title="Translation Result",
@@ -138,7 +145,7 @@ class TranslatorCog(commands.Cog):
             await ctx.send(embed=embed)
 
         except Exception as e:
-            print(f"Translation failed: {e}")
+            logger.exception(f"Translation failed: {e}", extra=log_extra(ctx.guild, ctx.author, ctx.channel))
             await ctx.send("An error occurred while translating the message. Please try again later.")
 
 async def setup(bot):
@@ -1,7 +1,49 @@
 import discord
-from discord.ui import View, Button, Modal, TextInput
+from discord.ui import View, Button, Modal, TextInput, DynamicItem
+from typing import Dict, List, Optional, Tuple
+import logging
 import random
+import time
 from .config import ALERTE_DEF_CHANNEL_ID, ALERT_MESSAGES, GUILD_ID, GUILD_EMOJIS_ROLES
+from .alert_records import AlertRecord, STATUS_OUTCOMES, parse_alert_message, parse_attacker
+from .alert_store import get_alert_store
+from .alert_state import alert_editor, get_alert_thread
+
+logger = logging.getLogger(__name__)
+
+SECOND_DEFENSE_ROLE_ID = 1300093554064097401
+
+# Screenshot gallery settings
+SCREENSHOT_TIMEOUT = 120  # Seconds a member has to post screenshots after clicking Screens-Def
+MAX_SCREENSHOTS = 10  # Screenshots accepted per click
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+
+# Modal file uploads only exist in recent discord.py releases
+FileUpload = getattr(discord.ui, "FileUpload", None)
+Label = getattr(discord.ui, "Label", None)
+
+# Buttons of an alert message; custom_ids are "alert:<action>:<alert message id>"
+ALERT_BUTTONS = {
+    "note": {"label": "Ajouter une note", "style": discord.ButtonStyle.secondary, "emoji": "📝"},
+    "won": {"label": "Won", "style": discord.ButtonStyle.success},
+    "lost": {"label": "Lost", "style": discord.ButtonStyle.danger},
+    "screens": {"label": "Screens-Def", "style": discord.ButtonStyle.primary, "emoji": "🖼️"},
+    # Custom triangle emoji button for second defense (purple/violet)
+    "second": {"style": discord.ButtonStyle.primary, "emoji": "<:triangle_emoji:1223045245428568106>"},
+}
+
+
+def ensure_alert_record(message: discord.Message):
+    """Create the record of an alert posted before alerts were persisted."""
+    store = get_alert_store()
+    if not store.has_alert(message.id):
+        record = parse_alert_message(message) or AlertRecord(
+            message_id=message.id,
+            channel_id=message.channel.id,
+            guild_name="Unknown",
+            created_at=message.created_at.timestamp(),
+        )
+        store.save_alert(record)
 
 
 class NoteModal(Modal):
@@ -17,136 +59,232 @@ class NoteModal(Modal):
         )
         self.add_item(self.note_input)
 
+        self.attacker_input = TextInput(
+            label="Guilde attaquante (optionnel)",
+            placeholder="Nom de la guilde ou de l'alliance qui attaque",
+            max_length=50,
+            required=False,
+        )
+        self.add_item(self.attacker_input)
+
     async def on_submit(self, interaction: discord.Interaction):
-        embed = self.message.embeds[0] if self.message.embeds else None
-        if not embed:
+        if not self.message.embeds:
             await interaction.response.send_message("Impossible de récupérer l'embed à modifier.", ephemeral=True)
             return
 
-        existing_notes = embed.fields[0].value if embed.fields else "Aucune note."
-        updated_notes = f"{existing_notes}\n- **{interaction.user.display_name}**: {self.note_input.value.strip()}"
-        embed.clear_fields()
-        embed.add_field(name="📝 Notes", value=updated_notes, inline=False)
+        note = self.note_input.value.strip()
+        attacker = self.attacker_input.value.strip() or parse_attacker(note)
+        if self.attacker_input.value.strip():
+            note = f"Attaquant: {attacker} — {note}"
+
+        ensure_alert_record(self.message)
+        get_alert_store().add_note(self.message.id, interaction.user.id, interaction.user.display_name, note, attacker)
 
-        await self.message.edit(embed=embed)
+        alert_editor.submit(self.message, note=(interaction.user.display_name, note))
         await interaction.response.send_message("Votre note a été ajoutée avec succès !", ephemeral=True)
 
 
-class AlertActionView(View):
-    def __init__(self, bot, message: discord.Message):
-        super().__init__(timeout=None)
-        self.bot = bot
-        self.message = message
-        self.is_locked = False
+def is_image(attachment: discord.Attachment) -> bool:
+    return attachment.filename.lower().endswith(IMAGE_EXTENSIONS)
 
-        self.add_note_button = Button(
-            label="Ajouter une note",
-            style=discord.ButtonStyle.secondary,
-            emoji="📝"
-        )
-        self.add_note_button.callback = self.add_note_callback
-        self.add_item(self.add_note_button)
 
-        self.won_button = Button(
-            label="Won",
-            style=discord.ButtonStyle.success,
-        )
-        self.won_button.callback = self.mark_as_won
-        self.add_item(self.won_button)
+async def add_screenshots(message: discord.Message, user: discord.abc.User, attachments: List[discord.Attachment]):
+    """Use the first screenshot of an alert as its embed image and record the responder."""
+    ensure_alert_record(message)
+    get_alert_store().add_responder(message.id, user.id, "screenshot")
+    await alert_editor.submit(message, image_url=attachments[0].url)
 
-        self.lost_button = Button(
-            label="Lost",
-            style=discord.ButtonStyle.danger,
-        )
-        self.lost_button.callback = self.mark_as_lost
-        self.add_item(self.lost_button)
 
-        self.screens_def_button = Button(
-            label="Screens-Def",
-            style=discord.ButtonStyle.primary,
-            emoji="🖼️"
+class PendingUpload:
+    __slots__ = ("alert_channel_id", "alert_message_id", "expires_at", "remaining")
+
+    def __init__(self, alert_message: discord.Message):
+        # Only IDs: the alert is fetched again when the screenshots arrive
+        self.alert_channel_id = alert_message.channel.id
+        self.alert_message_id = alert_message.id
+        self.expires_at = time.monotonic() + SCREENSHOT_TIMEOUT
+        self.remaining = MAX_SCREENSHOTS
+
+
+class PendingUploadRegistry:
+    """Screenshots awaited from members, indexed by (user_id, channel_id)."""
+
+    def __init__(self):
+        self._pending: Dict[Tuple[int, int], PendingUpload] = {}
+
+    def register(self, user_id: int, channel_id: int, alert_message: discord.Message):
+        self.sweep()
+        self._pending[(user_id, channel_id)] = PendingUpload(alert_message)
+
+    def get(self, user_id: int, channel_id: int) -> Optional[PendingUpload]:
+        pending = self._pending.get((user_id, channel_id))
+        if pending and pending.expires_at < time.monotonic():
+            del self._pending[(user_id, channel_id)]
+            return None
+        return pending
+
+    def sweep(self):
+        """Drop expired uploads so the registry stays bounded."""
+        now = time.monotonic()
+        for key in [key for key, pending in self._pending.items() if pending.expires_at < now]:
+            del self._pending[key]
+
+    async def dispatch(self, message: discord.Message):
+        """Route a message with attachments to the alert waiting for it, if any."""
+        pending = self.get(message.author.id, message.channel.id)
+        if not pending:
+            return
+
+        images = [attachment for attachment in message.attachments if is_image(attachment)][:pending.remaining]
+        if not images:
+            await message.reply("Format de fichier non supporté. Veuillez uploader un fichier jpg ou png.", delete_after=10)
+            return
+
+        channel = message.guild.get_channel(pending.alert_channel_id)
+        alert_message = None
+        if channel is not None:
+            try:
+                alert_message = await channel.fetch_message(pending.alert_message_id)
+            except discord.HTTPException as e:
+                # Deleted, or no longer readable by the bot: drop the upload either way
+                logger.warning(f"Could not fetch alert {pending.alert_message_id} for screenshots: {e}")
+        if alert_message is None:
+            self._pending.pop((message.author.id, message.channel.id), None)
+            await message.reply("L'alerte n'existe plus.", delete_after=10)
+            return
+
+        pending.remaining -= len(images)
+        if pending.remaining <= 0:
+            self._pending.pop((message.author.id, message.channel.id), None)
+        await add_screenshots(alert_message, message.author, images)
+        await message.add_reaction("✅")
+
+
+pending_uploads = PendingUploadRegistry()
+
+
+class ScreenshotModal(Modal):
+    """Ephemeral file-upload modal, used when the installed discord.py supports it."""
+
+    def __init__(self, message: discord.Message):
+        super().__init__(title="Screens-Def")
+        self.message = message
+        self.upload = Label(
+            text="Vos screenshots",
+            description="Formats supportés: jpg, png",
+            component=FileUpload(min_values=1, max_values=MAX_SCREENSHOTS),
         )
-        self.screens_def_button.callback = self.upload_screenshot
-        self.add_item(self.screens_def_button)
+        self.add_item(self.upload)
 
-        # Adding the custom triangle emoji button for second defense
-        self.second_defense_button = Button(
-            style=discord.ButtonStyle.primary,  # Purple/violet color
-            emoji="<:triangle_emoji:1223045245428568106>"  # Custom emoji with ID
+    async def on_submit(self, interaction: discord.Interaction):
+        images = [attachment for attachment in self.upload.component.values if is_image(attachment)]
+        if not images:
+            await interaction.response.send_message("Format de fichier non supporté. Veuillez uploader un fichier jpg ou png.", ephemeral=True)
+            return
+
+        await interaction.response.defer(ephemeral=True)
+        thread = await get_alert_thread(self.message)
+        gallery = await thread.send(
+            f"📸 Screenshots de {interaction.user.mention}",
+            files=[await attachment.to_file() for attachment in images],
+            allowed_mentions=discord.AllowedMentions.none()
         )
-        self.second_defense_button.callback = self.call_second_defense
-        self.add_item(self.second_defense_button)
+        await add_screenshots(self.message, interaction.user, gallery.attachments)
+        await interaction.followup.send("Screenshot ajouté avec succès !", ephemeral=True)
+
+
+class AlertActionButton(DynamicItem[Button], template=r"alert:(?P<action>note|won|lost|screens|second):(?P<alert_id>[0-9]+)"):
+    """Persistent alert button; the alert it acts on is encoded in its custom_id."""
+
+    def __init__(self, action: str, alert_id: int, disabled: bool = False):
+        super().__init__(Button(custom_id=f"alert:{action}:{alert_id}", disabled=disabled, **ALERT_BUTTONS[action]))
+        self.action = action
+        self.alert_id = alert_id
+
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: Button, match):
+        return cls(match["action"], int(match["alert_id"]))
 
-    async def add_note_callback(self, interaction: discord.Interaction):
+    async def callback(self, interaction: discord.Interaction):
+        handlers = {
+            "note": self.add_note_callback,
+            "won": self.mark_as_won,
+            "lost": self.mark_as_lost,
+            "screens": self.upload_screenshot,
+            "second": self.call_second_defense,
+        }
+        await handlers[self.action](interaction, interaction.message)
+
+    async def add_note_callback(self, interaction: discord.Interaction, message: discord.Message):
         if interaction.channel_id != ALERTE_DEF_CHANNEL_ID:
             await interaction.response.send_message("Vous ne pouvez pas ajouter de note ici.", ephemeral=True)
             return
 
-        modal = NoteModal(self.message)
+        modal = NoteModal(message)
         await interaction.response.send_modal(modal)
 
-    async def mark_as_won(self, interaction: discord.Interaction):
-        await self.mark_alert(interaction, "Gagnée", discord.Color.green())
+    async def mark_as_won(self, interaction: discord.Interaction, message: discord.Message):
+        await self.mark_alert(interaction, message, "Gagnée", discord.Color.green())
 
-    async def mark_as_lost(self, interaction: discord.Interaction):
-        await self.mark_alert(interaction, "Perdue", discord.Color.red())
+    async def mark_as_lost(self, interaction: discord.Interaction, message: discord.Message):
+        await self.mark_alert(interaction, message, "Perdue", discord.Color.red())
 
-    async def mark_alert(self, interaction: discord.Interaction, status: str, color: discord.Color):
-        if self.is_locked:
+    async def mark_alert(self, interaction: discord.Interaction, message: discord.Message, status: str, color: discord.Color):
+        # The store is the source of truth for the lock, so it survives restarts and concurrent clicks
+        ensure_alert_record(message)
+        if not get_alert_store().resolve_alert(self.alert_id, STATUS_OUTCOMES.get(status, status), interaction.user.id):
             await interaction.response.send_message("Cette alerte a déjà été marquée.", ephemeral=True)
             return
 
-        self.is_locked = True
-        for item in self.children:
-            item.disabled = True
-        await self.message.edit(view=self)
-
-        embed = self.message.embeds[0]
-        embed.color = color
-        embed.add_field(name="Statut", value=f"L'alerte a été marquée comme **{status}** par {interaction.user.mention}.", inline=False)
-
-        await self.message.edit(embed=embed)
+        alert_editor.submit(
+            message,
+            status=(status, color, interaction.user.mention),
+            view=AlertActionView(self.alert_id, locked=True)
+        )
         await interaction.response.send_message(f"Alerte marquée comme **{status}** avec succès.", ephemeral=True)
 
-    async def upload_screenshot(self, interaction: discord.Interaction):
-        await interaction.response.send_message("Veuillez uploader votre screenshot (formats supportés: jpg, png).", ephemeral=True)
-
-        def check(m):
-            return m.author == interaction.user and m.attachments
+    async def upload_screenshot(self, interaction: discord.Interaction, message: discord.Message):
+        if FileUpload and Label:
+            await interaction.response.send_modal(ScreenshotModal(message))
+            return
 
+        # Fallback: collect the screenshots posted in the alert's gallery thread
+        await interaction.response.defer(ephemeral=True)
         try:
-            message = await self.bot.wait_for('message', check=check, timeout=60.0)
-            attachment = message.attachments[0]
-            if attachment.filename.lower().endswith(('.png', '.jpg', '.jpeg')):
-                embed = self.message.embeds[0]
-                embed.set_image(url=attachment.url)
-                await self.message.edit(embed=embed)
-                await interaction.followup.send("Screenshot ajouté avec succès !", ephemeral=True)
-            else:
-                await interaction.followup.send("Format de fichier non supporté. Veuillez uploader un fichier jpg ou png.", ephemeral=True)
+            thread = await get_alert_thread(message)
+            pending_uploads.register(interaction.user.id, thread.id, message)
+            await interaction.followup.send(
+                f"Envoyez vos screenshots (jpg, png) dans {thread.mention} dans les {SCREENSHOT_TIMEOUT // 60} minutes.",
+                ephemeral=True
+            )
         except Exception as e:
             await interaction.followup.send(f"Une erreur est survenue: {e}", ephemeral=True)
 
-    async def call_second_defense(self, interaction: discord.Interaction):
+    async def call_second_defense(self, interaction: discord.Interaction, message: discord.Message):
         # Get the role to tag
-        role = interaction.guild.get_role(1300093554064097401)
+        role = interaction.guild.get_role(SECOND_DEFENSE_ROLE_ID)
         if not role:
             await interaction.response.send_message("Le rôle pour la deuxième défense est introuvable.", ephemeral=True)
             return
 
         # Update the embed
-        embed = self.message.embeds[0]
-        embed.add_field(
-            name="⚠️ Deuxième Défense",
-            value=f"Une équipe défend déjà un percepteur, besoin de monde pour une deuxième défense. {role.mention}",
-            inline=False
-        )
-        await self.message.edit(embed=embed)
+        alert_editor.submit(message, second_defense=role.mention)
+        ensure_alert_record(message)
+        get_alert_store().add_responder(self.alert_id, interaction.user.id, "second_defense")
 
         # Send a confirmation message
         await interaction.response.send_message(f"Demande de deuxième défense envoyée. {role.mention}", ephemeral=True)
 
 
+class AlertActionView(View):
+    """Components attached to an alert message; interactions are handled by AlertActionButton."""
+
+    def __init__(self, alert_id: int, locked: bool = False):
+        super().__init__(timeout=None)
+        for action in ALERT_BUTTONS:
+            self.add_item(AlertActionButton(action, alert_id, disabled=locked))
+
+
 class GuildPingView(View):
     def __init__(self, bot):
         super().__init__(timeout=None)
@@ -155,7 +293,8 @@ class GuildPingView(View):
             button = Button(
                 label=f"  {guild_name.upper()}  ",
                 emoji=data["emoji"],
-                style=discord.ButtonStyle.primary
+                style=discord.ButtonStyle.primary,
+                custom_id=f"ping:{guild_name}"
             )
             button.callback = self.create_ping_callback(guild_name, data["role_id"])
             self.add_item(button)
@@ -189,15 +328,21 @@ class GuildPingView(View):
                 embed.add_field(name="📝 Notes", value="Aucune note.", inline=False)
 
                 sent_message = await alert_channel.send(content=alert_message, embed=embed)
-                view = AlertActionView(self.bot, sent_message)
-                await sent_message.edit(view=view)
+                get_alert_store().save_alert(AlertRecord(
+                    message_id=sent_message.id,
+                    channel_id=alert_channel.id,
+                    guild_name=guild_name,
+                    created_at=sent_message.created_at.timestamp(),
+                    initiator_id=interaction.user.id,
+                ))
+                await sent_message.edit(view=AlertActionView(sent_message.id))
 
                 await interaction.response.send_message(
                     f"Alerte envoyée à {guild_name} dans le canal d'alerte !", ephemeral=True
                 )
 
             except Exception as e:
-                print(f"Error in ping callback for {guild_name}: {e}")
+                logger.exception(f"Error in ping callback for {guild_name}: {e}")
                 await interaction.response.send_message("Une erreur est survenue.", ephemeral=True)
 
         return callback
@@ -9,13 +9,10 @@ import random
 import tempfile
 from datetime import datetime, timedelta
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
 logger = logging.getLogger(__name__)
 
+MEMBER_CACHE = ("voice",)
+
 class VoiceConfig:
     """Configuration settings for voice features"""
     RETRY_ATTEMPTS: int = 3
@@ -6,6 +6,8 @@ import aiohttp
 import io
 import logging
 
+logger = logging.getLogger(__name__)
+
 class Watermark(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
@@ -60,7 +62,7 @@ class Watermark(commands.Cog):
                 await interaction.response.send_message("Here is your watermarked image:", file=file)
 
         except Exception as e:
-            logging.exception(f"Error in watermark command: {e}")
+            logger.exception(f"Error in watermark command: {e}")
             await interaction.response.send_message("An error occurred while processing your image.")
 
 async def setup(bot):
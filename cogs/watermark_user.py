@@ -6,6 +6,8 @@ import aiohttp
 import io
 import logging
 
+logger = logging.getLogger(__name__)
+
 class WatermarkUser(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
@@ -65,7 +67,7 @@ class WatermarkUser(commands.Cog):
                 await interaction.response.send_message("Here is your watermarked image:", file=file)
 
         except Exception as e:
-            logging.exception(f"Error in watermark_user command: {e}")
+            logger.exception(f"Error in watermark_user command: {e}")
             await interaction.response.send_message("An error occurred while processing your image.")
 
 async def setup(bot):
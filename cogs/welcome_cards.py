@@ -0,0 +1,145 @@
+import discord
+import asyncio
+import io
+import logging
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from PIL import Image, ImageDraw, ImageFont
+
+logger = logging.getLogger(__name__)
+
+BANNER_PATH = "./Alliance Start2000.png"
+FONT_PATH = "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf"
+CARD_WIDTH = 1024  # The banner is scaled to this width once, at load time
+AVATAR_SIZE = 200
+RENDER_WORKERS = 2  # Threads composing cards
+QUEUE_SIZE = 25  # Cards waiting to be rendered; joins beyond that get the plain banner
+AVATAR_CACHE_SIZE = 256
+CARD_FILENAME = "welcome.jpg"
+
+
+class WelcomeCardRenderer:
+    """Composes the member's avatar and name onto the alliance banner.
+
+    The banner is decoded and scaled once; avatars are kept in a small LRU
+    cache. Renders go through a bounded queue served by RENDER_WORKERS
+    threads, so a raid can't pile up hundreds of render tasks: when the
+    queue is full the pre-encoded banner is sent instead.
+    """
+
+    def __init__(self, banner_path: str = BANNER_PATH):
+        self.banner_path = banner_path
+        self.executor = ThreadPoolExecutor(max_workers=RENDER_WORKERS, thread_name_prefix="welcome-card")
+        self._banner: Optional[Image.Image] = None
+        self._banner_jpeg = b""
+        self._mask: Optional[Image.Image] = None
+        self._fonts = None
+        self._avatars: "OrderedDict[str, bytes]" = OrderedDict()
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers = []
+
+    def load(self):
+        """Decode the banner and prepare the shared drawing resources (blocking)."""
+        with Image.open(self.banner_path) as banner:
+            height = round(banner.height * CARD_WIDTH / banner.width)
+            self._banner = banner.convert("RGB").resize((CARD_WIDTH, height), Image.LANCZOS)
+        self._banner_jpeg = encode(self._banner)
+
+        self._mask = Image.new("L", (AVATAR_SIZE, AVATAR_SIZE), 0)
+        ImageDraw.Draw(self._mask).ellipse((0, 0, AVATAR_SIZE - 1, AVATAR_SIZE - 1), fill=255)
+        try:
+            self._fonts = (ImageFont.truetype(FONT_PATH, 48), ImageFont.truetype(FONT_PATH, 28))
+        except OSError:
+            self._fonts = (ImageFont.load_default(), ImageFont.load_default())
+
+    async def start(self):
+        try:
+            await asyncio.get_running_loop().run_in_executor(self.executor, self.load)
+        except OSError as e:
+            logger.error(f"Could not load the welcome banner {self.banner_path}: {e}")
+            return
+        self._queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(RENDER_WORKERS)]
+
+    def close(self):
+        for worker in self._workers:
+            worker.cancel()
+        self.executor.shutdown(wait=False)
+
+    def banner_file(self) -> Optional[discord.File]:
+        if not self._banner_jpeg:
+            return None
+        return discord.File(io.BytesIO(self._banner_jpeg), filename=CARD_FILENAME)
+
+    async def card_for(self, member: discord.Member) -> Optional[discord.File]:
+        """A welcome card for the member, the plain banner when overloaded or failing, None without a banner."""
+        if self._queue is None:
+            return self.banner_file()
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self._queue.put_nowait((member, future))
+        except asyncio.QueueFull:
+            logger.info(f"Welcome card queue full, sending the plain banner to {member}")
+            return self.banner_file()
+        try:
+            return discord.File(await future, filename=CARD_FILENAME)
+        except Exception as e:
+            logger.warning(f"Could not render the welcome card of {member}: {e}")
+            return self.banner_file()
+
+    async def _worker(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            member, future = await self._queue.get()
+            try:
+                avatar = await self._avatar(member)
+                card = await loop.run_in_executor(
+                    self.executor, self.render, avatar, member.display_name, f"Membre #{member.guild.member_count}"
+                )
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+            else:
+                if not future.done():
+                    future.set_result(card)
+
+    async def _avatar(self, member: discord.Member) -> bytes:
+        asset = member.display_avatar.replace(size=256, static_format="png")
+        data = self._avatars.get(asset.key)
+        if data is None:
+            data = await asset.read()
+            self._avatars[asset.key] = data
+            if len(self._avatars) > AVATAR_CACHE_SIZE:
+                self._avatars.popitem(last=False)
+        else:
+            self._avatars.move_to_end(asset.key)
+        return data
+
+    def render(self, avatar: bytes, name: str, subtitle: str) -> io.BytesIO:
+        """Compose one card (runs in the worker threads)."""
+        card = self._banner.copy()
+        width, height = card.size
+
+        # Darkened band at the bottom so the text stays readable on the banner
+        band_top = height - AVATAR_SIZE - 40
+        band = Image.new("RGB", (width, height - band_top), (0, 0, 0))
+        card.paste(Image.blend(card.crop((0, band_top, width, height)), band, 0.55), (0, band_top))
+
+        with Image.open(io.BytesIO(avatar)) as image:
+            avatar_image = image.convert("RGB").resize((AVATAR_SIZE, AVATAR_SIZE), Image.LANCZOS)
+        card.paste(avatar_image, (30, band_top + 20), self._mask)
+
+        draw = ImageDraw.Draw(card)
+        title_font, subtitle_font = self._fonts
+        text_left = 30 + AVATAR_SIZE + 30
+        draw.text((text_left, band_top + 50), f"Bienvenue {name} !"[:40], font=title_font, fill=(255, 255, 255))
+        draw.text((text_left, band_top + 120), subtitle, font=subtitle_font, fill=(200, 200, 200))
+        return io.BytesIO(encode(card))
+
+
+def encode(image: Image.Image) -> bytes:
+    output = io.BytesIO()
+    image.save(output, format="JPEG", quality=85)
+    return output.getvalue()
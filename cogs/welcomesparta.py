@@ -1,23 +1,50 @@
 import discord
 from discord.ext import commands
 import logging
-from typing import Optional
+import os
+import time
+from collections import deque
+from typing import List, Optional
 from datetime import datetime
 import asyncio
 
-# Configure logging with more detailed format
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    datefmt='%Y-%m-%d %H:%M:%S'
-)
+from .welcome_cards import CARD_FILENAME, WelcomeCardRenderer
+
 logger = logging.getLogger(__name__)
 
+REQUIRED_INTENTS = ("members",)  # on_member_join
+
+BURST_JOINS = int(os.getenv("WELCOME_BURST_JOINS", "5"))  # Joins within BURST_WINDOW that switch to aggregated mode
+BURST_WINDOW = float(os.getenv("WELCOME_BURST_WINDOW", "10"))  # Seconds
+AGGREGATE_INTERVAL = 15  # Seconds between two aggregated welcome messages
+AGGREGATE_LIST_LIMIT = 50  # Members mentioned by name in one aggregated message
+DM_INTERVAL = 1.5  # Seconds between two welcome DMs
+DM_QUEUE_SIZE = 500
+
+
+class JoinRateDetector:
+    """Sliding window of join times: a burst is BURST_JOINS or more joins within BURST_WINDOW seconds."""
+
+    def __init__(self, joins: int = BURST_JOINS, window: float = BURST_WINDOW):
+        self.joins = joins
+        self.window = window
+        self._times = deque()
+
+    def record(self) -> bool:
+        """Record a join; True while the join rate is above the burst threshold."""
+        self._times.append(time.monotonic())
+        return self.bursting()
+
+    def bursting(self) -> bool:
+        now = time.monotonic()
+        while self._times and now - self._times[0] > self.window:
+            self._times.popleft()
+        return len(self._times) >= self.joins
+
 class WelcomeConfig:
     """Configuration class to store all constants"""
     GUILD_ID = 1300093554064097400
     WELCOME_CHANNEL_ID = 1300093554399645707
-    WELCOME_IMAGE_URL = "https://github.com/Momonga-OP/Start2000/blob/main/Alliance%20Start2000.png?raw=true"
     
     # Colors for embeds
     WELCOME_COLOR = discord.Color.blue()
@@ -30,6 +57,10 @@ class WelcomeConfig:
         "Nous sommes ravis de vous accueillir ici ! N'oubliez pas de "
         "consulter nos salons et de profiter de votre séjour. 🎊"
     )
+    WELCOME_DM = (
+        "Bienvenue sur {guild_name}! 🎉\n"
+        "N'hésitez pas à lire nos règles et à vous présenter!"
+    )
 
 class WelcomeSparta(commands.Cog):
     """A cog for handling welcome messages and member joins"""
@@ -38,6 +69,21 @@ class WelcomeSparta(commands.Cog):
         self.bot = bot
         self.config = WelcomeConfig()
         self.last_error_time = {}  # Track error timestamps for rate limiting
+        self.cards = WelcomeCardRenderer()
+        self.detector = JoinRateDetector()
+        self.aggregating = False  # Burst mode: joins are welcomed together every AGGREGATE_INTERVAL
+        self.pending: List[discord.Member] = []
+        self.dm_queue: asyncio.Queue = asyncio.Queue(maxsize=DM_QUEUE_SIZE)
+        self._tasks: List[asyncio.Task] = []
+
+    async def cog_load(self):
+        await self.cards.start()
+        self._tasks.append(asyncio.create_task(self._send_dms()))
+
+    async def cog_unload(self):
+        for task in self._tasks:
+            task.cancel()
+        self.cards.close()
         
     async def get_welcome_channel(self) -> Optional[discord.TextChannel]:
         """Get the welcome channel with error handling"""
@@ -53,17 +99,34 @@ class WelcomeSparta(commands.Cog):
             
         return channel
         
-    def create_welcome_embed(self, member: discord.Member) -> discord.Embed:
-        """Create a welcome embed for new members"""
+    def create_welcome_embed(self, member: discord.Member, card: Optional[discord.File] = None) -> discord.Embed:
+        """Create a welcome embed for new members, showing the attached welcome card"""
         embed = discord.Embed(
             description=self.config.WELCOME_MESSAGE.format(member_mention=member.mention),
             color=self.config.WELCOME_COLOR,
             timestamp=datetime.utcnow()
         )
-        embed.set_image(url=self.config.WELCOME_IMAGE_URL)
-        embed.set_footer(text=f"Member #{len(member.guild.members)}")
+        if card:
+            embed.set_image(url=f"attachment://{CARD_FILENAME}")
+        embed.set_footer(text=f"Member #{member.guild.member_count}")
         embed.set_author(name=member.name, icon_url=member.display_avatar.url)
         return embed
+
+    def create_aggregated_embed(self, members: List[discord.Member], card: Optional[discord.File] = None) -> discord.Embed:
+        """One welcome embed for all the members who joined during a burst window"""
+        mentions = ", ".join(member.mention for member in members[:AGGREGATE_LIST_LIMIT])
+        if len(members) > AGGREGATE_LIST_LIMIT:
+            mentions += f" et {len(members) - AGGREGATE_LIST_LIMIT} autres"
+        embed = discord.Embed(
+            title=f"🎉 {len(members)} nouveaux membres !",
+            description=self.config.WELCOME_MESSAGE.format(member_mention=mentions),
+            color=self.config.WELCOME_COLOR,
+            timestamp=datetime.utcnow()
+        )
+        if card:
+            embed.set_image(url=f"attachment://{CARD_FILENAME}")
+        embed.set_footer(text=f"Member #{members[-1].guild.member_count}")
+        return embed
         
     async def log_error(self, error_msg: str, error: Exception = None):
         """Rate-limited error logging to prevent spam"""
@@ -86,24 +149,28 @@ class WelcomeSparta(commands.Cog):
             return
             
         logger.info(f"New member joined: {member.name} ({member.id}) in {member.guild.name}")
+
+        if self.detector.record() or self.aggregating:
+            self.pending.append(member)
+            self.queue_dm(member)
+            if not self.aggregating:
+                logger.warning(f"Join burst detected, welcoming new members every {AGGREGATE_INTERVAL}s")
+                self.aggregating = True
+                self._tasks.append(asyncio.create_task(self._aggregate()))
+            return
         
         welcome_channel = await self.get_welcome_channel()
         if not welcome_channel:
             return
             
         try:
-            embed = self.create_welcome_embed(member)
-            await welcome_channel.send(embed=embed)
+            card = await self.cards.card_for(member)
+            embed = self.create_welcome_embed(member, card)
+            await welcome_channel.send(embed=embed, file=card or discord.utils.MISSING)
             logger.info(f"Welcome message sent for {member.name}")
             
             # Optional: Send a private message to the new member
-            try:
-                await member.send(
-                    f"Bienvenue sur {member.guild.name}! 🎉\n"
-                    "N'hésitez pas à lire nos règles et à vous présenter!"
-                )
-            except discord.Forbidden:
-                logger.info(f"Could not send DM to {member.name} - they might have DMs disabled")
+            self.queue_dm(member)
                 
         except discord.Forbidden:
             await self.log_error("Missing permissions to send welcome message")
@@ -112,6 +179,53 @@ class WelcomeSparta(commands.Cog):
         except Exception as e:
             await self.log_error("Unexpected error in on_member_join", e)
             
+    async def _aggregate(self):
+        """Burst mode: post the pending joins together until the join rate drops again."""
+        try:
+            while True:
+                await asyncio.sleep(AGGREGATE_INTERVAL)
+                members, self.pending = self.pending, []
+                if members:
+                    await self.send_aggregated(members)
+                if not self.pending and not self.detector.bursting():
+                    break
+        finally:
+            self.aggregating = False
+            self._tasks.remove(asyncio.current_task())
+        logger.info("Join rate back to normal, welcoming new members individually again")
+
+    async def send_aggregated(self, members: List[discord.Member]):
+        welcome_channel = await self.get_welcome_channel()
+        if not welcome_channel:
+            return
+        try:
+            card = self.cards.banner_file()
+            embed = self.create_aggregated_embed(members, card)
+            await welcome_channel.send(embed=embed, file=card or discord.utils.MISSING)
+            logger.info(f"Aggregated welcome message sent for {len(members)} members")
+        except discord.Forbidden:
+            await self.log_error("Missing permissions to send welcome message")
+        except discord.HTTPException as e:
+            await self.log_error("Failed to send aggregated welcome message", e)
+
+    def queue_dm(self, member: discord.Member):
+        try:
+            self.dm_queue.put_nowait(member)
+        except asyncio.QueueFull:
+            logger.info(f"Welcome DM queue full, skipping the DM to {member.name}")
+
+    async def _send_dms(self):
+        """Send the queued welcome DMs one at a time, DM_INTERVAL apart."""
+        while True:
+            member = await self.dm_queue.get()
+            try:
+                await member.send(self.config.WELCOME_DM.format(guild_name=member.guild.name))
+            except discord.Forbidden:
+                logger.info(f"Could not send DM to {member.name} - they might have DMs disabled")
+            except discord.HTTPException as e:
+                await self.log_error("Failed to send welcome DM", e)
+            await asyncio.sleep(DM_INTERVAL)
+
     @commands.Cog.listener()
     async def on_ready(self):
         """Handle bot ready event"""
@@ -151,8 +265,9 @@ class WelcomeSparta(commands.Cog):
     async def test_welcome(self, ctx):
         """Test the welcome message (Admin only)"""
         try:
-            embed = self.create_welcome_embed(ctx.author)
-            await ctx.send("Testing welcome message:", embed=embed)
+            card = await self.cards.card_for(ctx.author)
+            embed = self.create_welcome_embed(ctx.author, card)
+            await ctx.send("Testing welcome message:", embed=embed, file=card or discord.utils.MISSING)
             logger.info(f"Welcome test performed by {ctx.author.name}")
         except Exception as e:
             await self.log_error("Error in test_welcome command", e)
@@ -1,11 +1,10 @@
 import discord
 from discord.ext import commands
 from discord import app_commands
-from io import BytesIO
 import logging
 
-# Set up logging
-logging.basicConfig(level=logging.INFO)
+from .transfers import attachment_transfers
+
 logger = logging.getLogger(__name__)
 
 class WriteCog(commands.Cog):
@@ -19,16 +18,15 @@ class WriteCog(commands.Cog):
         try:
             # Prepare the message content
             content = message
-            files = []
 
-            # Check if an image is provided
-            if image:
-                # Create a discord.File object directly from the attachment
-                img_file = discord.File(fp=BytesIO(await image.read()), filename=image.filename)
-                files.append(img_file)
+            # Stream the optional image from the CDN instead of reading it into memory
+            batch = await attachment_transfers.fetch([image] if image else [])
 
             # Send the anonymized message with the optional image
-            await interaction.channel.send(content=content, files=files)
+            try:
+                await interaction.channel.send(content=content, files=batch.files)
+            finally:
+                batch.close()
             
             # Defer the interaction response and delete it
             await interaction.response.defer(ephemeral=True)
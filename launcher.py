@@ -0,0 +1,89 @@
+import json
+import logging
+import os
+import subprocess
+import sys
+import time
+import urllib.request
+
+from cogs.config import GUILD_ID
+from sharding import parse_shard_ids, shard_for
+
+# Multi-process launcher: splits the shards of the bot across worker processes
+# on this machine, each one running main.py with its own SHARD_IDS range.
+#   SHARD_COUNT   total number of shards (Discord's recommendation if unset)
+#   WORKERS       number of worker processes (default: one per CPU)
+#   SHARD_IDS     optional subset of shards handled by this machine
+#   METRICS_PORT  metrics port of the first worker; worker N serves on METRICS_PORT + N
+# The worker holding the alliance guild's shard is the primary one (BOT_PRIMARY=1):
+# it alone syncs commands and runs the panel, backfill and scheduled jobs.
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger("launcher")
+
+RESTART_DELAY = 10  # Seconds before a crashed worker is restarted
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9108"))  # Same default as metrics.py; 0 disables the endpoint
+
+
+def recommended_shard_count(token: str) -> int:
+    """Ask Discord how many shards the bot should use."""
+    request = urllib.request.Request(
+        "https://discord.com/api/v10/gateway/bot",
+        headers={"Authorization": f"Bot {token}", "User-Agent": "Start2000 launcher"}
+    )
+    with urllib.request.urlopen(request, timeout=10) as response:
+        return json.load(response)["shards"]
+
+
+def split_shards(shard_ids, workers: int):
+    """Split shard IDs into contiguous, evenly sized ranges."""
+    workers = max(1, min(workers, len(shard_ids)))
+    size, extra = divmod(len(shard_ids), workers)
+    ranges, start = [], 0
+    for index in range(workers):
+        end = start + size + (1 if index < extra else 0)
+        ranges.append(shard_ids[start:end])
+        start = end
+    return ranges
+
+
+def start_worker(index: int, shard_ids, shard_count: int) -> subprocess.Popen:
+    primary = shard_for(GUILD_ID, shard_count) in shard_ids
+    env = dict(os.environ, BOT_SHARDED="1", SHARD_COUNT=str(shard_count),
+               SHARD_IDS=",".join(str(shard_id) for shard_id in shard_ids),
+               METRICS_PORT=str(METRICS_PORT + index if METRICS_PORT else 0),
+               BOT_PRIMARY="1" if primary else "0")
+    logger.info(f"Starting {'primary ' if primary else ''}worker for shards {shard_ids[0]}-{shard_ids[-1]}")
+    return subprocess.Popen([sys.executable, "main.py"], env=env)
+
+
+def main():
+    token = os.getenv("DISCORD_TOKEN")
+    if not token:
+        logger.error("Bot token not found")
+        return
+
+    shard_count = int(os.getenv("SHARD_COUNT") or recommended_shard_count(token))
+    shard_ids = parse_shard_ids(os.getenv("SHARD_IDS", f"0-{shard_count - 1}"))
+    workers = int(os.getenv("WORKERS", str(os.cpu_count() or 1)))
+    logger.info(f"Launching {shard_count} shards over {min(workers, len(shard_ids))} workers")
+
+    ranges = split_shards(shard_ids, workers)
+    processes = {index: start_worker(index, ids, shard_count) for index, ids in enumerate(ranges)}
+    try:
+        while True:
+            time.sleep(RESTART_DELAY)
+            for index, process in list(processes.items()):
+                if process.poll() is not None:
+                    ids = ranges[index]
+                    logger.warning(f"Worker for shards {ids[0]}-{ids[-1]} exited with code {process.returncode}, restarting")
+                    processes[index] = start_worker(index, ids, shard_count)
+    except KeyboardInterrupt:
+        logger.info("Stopping workers")
+        for process in processes.values():
+            process.terminate()
+        for process in processes.values():
+            process.wait()
+
+
+if __name__ == "__main__":
+    main()
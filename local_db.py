@@ -0,0 +1,26 @@
+import os
+import sqlite3
+
+# Local SQLite store used for bot-side indexes (alert archive, ...).
+# Unlike the Supabase database in database.py, it lives next to the bot and
+# is queried on hot paths, so a single shared connection is kept open.
+LOCAL_DB_PATH = os.getenv("LOCAL_DB_PATH", "start2000.db")
+
+_connection = None
+
+def get_connection() -> sqlite3.Connection:
+    """Return the shared connection to the local SQLite store."""
+    global _connection
+    if _connection is None:
+        _connection = sqlite3.connect(LOCAL_DB_PATH, check_same_thread=False)
+        _connection.row_factory = sqlite3.Row
+        _connection.execute("PRAGMA journal_mode=WAL")
+        _connection.execute("PRAGMA synchronous=NORMAL")
+    return _connection
+
+def close_connection():
+    """Close the shared connection if it is open."""
+    global _connection
+    if _connection is not None:
+        _connection.close()
+        _connection = None
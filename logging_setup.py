@@ -0,0 +1,132 @@
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import time
+from datetime import datetime, timezone
+
+# Central logging pipeline. Records are enqueued on the event loop by a
+# QueueHandler and formatted/written by a QueueListener on a background thread.
+#   LOG_LEVEL        root level (default INFO)
+#   LOG_LEVELS       per-logger overrides, e.g. "cogs.translator=WARNING,discord=INFO"
+#   LOG_FORMAT       "json" (default) or "text"
+#   LOG_RATE_LIMIT   identical INFO/DEBUG records allowed per LOG_RATE_WINDOW seconds
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_LEVELS = os.getenv("LOG_LEVELS", "")
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()
+LOG_RATE_LIMIT = int(os.getenv("LOG_RATE_LIMIT", "20"))
+LOG_RATE_WINDOW = float(os.getenv("LOG_RATE_WINDOW", "60"))
+
+STRUCTURED_FIELDS = ("guild", "user", "channel", "command", "suppressed")
+
+
+def log_extra(guild=None, user=None, channel=None, **fields) -> dict:
+    """Build the `extra` of a log call from Discord objects or IDs.
+
+    Pass sample_rate=0.01 to only keep 1% of a high-volume record.
+    """
+    extra = dict(fields)
+    for name, value in (("guild", guild), ("user", user), ("channel", channel)):
+        if value is not None:
+            extra[name] = getattr(value, "id", value)
+    return extra
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if record.name.startswith("cogs."):
+            entry["cog"] = record.name.split(".", 2)[1]
+        for name in STRUCTURED_FIELDS:
+            value = getattr(record, name, None)
+            if value is not None:
+                entry[name] = value
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """Drop records carrying a `sample_rate` with the complementary probability."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        sample_rate = getattr(record, "sample_rate", None)
+        return sample_rate is None or random.random() < sample_rate
+
+
+class RateLimitFilter(logging.Filter):
+    """Let at most `limit` identical INFO/DEBUG records through per window.
+
+    Records are identical when they come from the same call site; the next
+    record let through carries the number of suppressed ones.
+    """
+
+    def __init__(self, limit: int, window: float):
+        super().__init__()
+        self.limit = limit
+        self.window = window
+        self._windows = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or self.limit <= 0:
+            return True
+        key = (record.name, record.pathname, record.lineno)
+        now = time.monotonic()
+        started, count, suppressed = self._windows.get(key, (now, 0, 0))
+        if now - started >= self.window:
+            started, count = now, 0
+        if count >= self.limit:
+            self._windows[key] = (started, count, suppressed + 1)
+            return False
+        if suppressed:
+            record.suppressed = suppressed
+        self._windows[key] = (started, count + 1, 0)
+        return True
+
+
+class PreparedQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that leaves the formatting to the listener thread."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def configure_logging() -> logging.handlers.QueueListener:
+    """Install the queue-based pipeline on the root logger and start its listener."""
+    stream_handler = logging.StreamHandler(sys.stdout)
+    if LOG_FORMAT == "json":
+        stream_handler.setFormatter(JsonFormatter())
+    else:
+        stream_handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = PreparedQueueHandler(log_queue)
+    queue_handler.addFilter(SamplingFilter())
+    queue_handler.addFilter(RateLimitFilter(LOG_RATE_LIMIT, LOG_RATE_WINDOW))
+
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(LOG_LEVEL)
+
+    for override in filter(None, (item.strip() for item in LOG_LEVELS.split(","))):
+        name, _, level = override.partition("=")
+        logging.getLogger(name.strip()).setLevel(level.strip().upper())
+
+    listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    listener.start()
+    return listener
@@ -0,0 +1,138 @@
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import List, Optional
+
+import metrics
+
+# Event-loop stall detector. A side thread watches a heartbeat scheduled on the
+# loop; when the loop stops beating for longer than STALL_THRESHOLD seconds the
+# main thread's stack is captured while the blocking call is still running.
+#   STALL_THRESHOLD   seconds before a callback counts as a stall (0 disables)
+#   STALL_CAPACITY    number of worst stalls kept for the !stalls command
+STALL_THRESHOLD = float(os.getenv("STALL_THRESHOLD", "0.25"))
+STALL_CAPACITY = int(os.getenv("STALL_CAPACITY", "20"))
+HEARTBEAT_INTERVAL = 0.05  # Seconds between heartbeats on the loop
+STACK_DEPTH = 25  # Innermost frames kept per stall
+
+logger = logging.getLogger(__name__)
+
+LOOP_STALLS = metrics.Counter("bot_event_loop_stalls_total", "Callbacks that blocked the event loop.", ("cog",))
+
+
+@dataclass
+class Stall:
+    started_at: datetime
+    duration: float
+    cog: str
+    location: str
+    blocking_call: str
+    task: str
+    stack: str
+
+
+def _frame_label(frame: traceback.FrameSummary) -> str:
+    return f"{os.path.basename(frame.filename)}:{frame.lineno} in {frame.name}"
+
+
+def attribute(frames: List[traceback.FrameSummary]):
+    """Find the cog and the line of our code responsible for a stack."""
+    for frame in reversed(frames):
+        parts = os.path.normpath(frame.filename).split(os.sep)
+        if "cogs" in parts[:-1]:
+            return os.path.splitext(parts[-1])[0], _frame_label(frame)
+    for frame in reversed(frames):
+        if "site-packages" not in frame.filename and not frame.filename.startswith(sys.base_prefix):
+            return os.path.splitext(os.path.basename(frame.filename))[0], _frame_label(frame)
+    return "unknown", _frame_label(frames[-1]) if frames else "unknown"
+
+
+class LoopWatchdog:
+    def __init__(self, threshold: float = STALL_THRESHOLD, capacity: int = STALL_CAPACITY):
+        self.threshold = threshold
+        self.capacity = capacity
+        self.stalls: List[Stall] = []  # Worst first, at most `capacity`
+        self.total = 0
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+        self._beat = 0.0
+        self._handle: Optional[asyncio.TimerHandle] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self, loop: asyncio.AbstractEventLoop):
+        """Start watching `loop`; must be called from the loop's thread."""
+        if self.threshold <= 0 or self._thread is not None:
+            return
+        self._loop = loop
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat()
+        self._thread = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._thread.start()
+        logger.info(f"Event-loop watchdog started (threshold {self.threshold * 1000:.0f} ms)")
+
+    def stop(self):
+        self._stopped.set()
+        if self._handle is not None:
+            self._handle.cancel()
+
+    def _heartbeat(self):
+        self._beat = time.monotonic()
+        self._handle = self._loop.call_later(HEARTBEAT_INTERVAL, self._heartbeat)
+
+    def _watch(self):
+        pending = None  # (beat, captured stall details) of the stall in progress
+        while not self._stopped.wait(HEARTBEAT_INTERVAL):
+            beat = self._beat
+            if pending is not None and pending[0] != beat:
+                # The loop beat again: the stall is over and its length is known
+                self._record(pending[1], beat - pending[0] - HEARTBEAT_INTERVAL)
+                pending = None
+            lag = time.monotonic() - beat - HEARTBEAT_INTERVAL
+            if pending is None and lag > self.threshold:
+                pending = (beat, self._capture())
+
+    def _capture(self) -> Optional[dict]:
+        frame = sys._current_frames().get(self._loop_thread_id)
+        if frame is None:
+            return None
+        frames = traceback.extract_stack(frame)[-STACK_DEPTH:]
+        cog, location = attribute(frames)
+        try:
+            task = asyncio.current_task(self._loop)
+        except RuntimeError:
+            task = None
+        return {
+            "started_at": datetime.now(timezone.utc),
+            "cog": cog,
+            "location": location,
+            "blocking_call": _frame_label(frames[-1]) if frames else "unknown",
+            "task": task.get_coro().__qualname__ if task is not None else "callback",
+            "stack": "".join(traceback.format_list(frames)),
+        }
+
+    def _record(self, details: Optional[dict], duration: float):
+        if details is None:
+            return
+        stall = Stall(duration=duration, **details)
+        LOOP_STALLS.inc(cog=stall.cog)
+        logger.warning(
+            f"Event loop blocked for {duration * 1000:.0f} ms by {stall.task} "
+            f"({stall.location}, blocked in {stall.blocking_call})"
+        )
+        with self._lock:
+            self.total += 1
+            self.stalls.append(stall)
+            self.stalls.sort(key=lambda item: item.duration, reverse=True)
+            del self.stalls[self.capacity:]
+
+    def worst(self) -> List[Stall]:
+        with self._lock:
+            return list(self.stalls)
@@ -4,23 +4,42 @@ import os
 import asyncio
 import logging
 from database import initialize_db  # Import the database initialization function
-
-# Set up logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+from sharding import ShardedBot, create_bot, is_primary_worker
+from cache_profile import CacheProfile, cache_report
+from logging_setup import configure_logging, log_extra
+import metrics
+from loop_watchdog import LoopWatchdog
+from cogs.config import OWNER_ID
+from cogs.transfers import attachment_transfers
+
+# Set up logging (queue-based, written from a background thread; see logging_setup.py)
+log_listener = configure_logging()
 logger = logging.getLogger(__name__)
 
-# Define intents
-intents = discord.Intents.default()
-intents.message_content = True
-intents.members = True
-intents.presences = True  # Required to see online/offline status
+# List of extensions (cogs) to load
+EXTENSIONS = [
+    'cogs.admin',
+    'cogs.relocate', 'cogs.watermark', 'cogs.talk', 'cogs.role',
+    'cogs.watermark_user', 'cogs.metiers',
+    'cogs.image_converter', 'cogs.startguild', 'cogs.clear',
+    'cogs.alerts', 'cogs.defense_stats', 'cogs.welcomesparta',
+    'cogs.super', 'cogs.reconcile', 'cogs.translator', 'cogs.voice', 'cogs.rules', 'cogs.write', 'cogs.dofustouch',
+    'cogs.dm_relay',
+]
+
+# Intents and caches are derived from what the cogs declare (see cache_profile.py);
+# message content is needed here for prefix commands
+cache_profile = CacheProfile(EXTENSIONS, base_intents=("message_content",))
 
-# Create the bot
-bot = commands.Bot(command_prefix='!', intents=intents)
+# Create the bot (sharded when BOT_SHARDED=1, see sharding.py and launcher.py)
+bot = create_bot(command_prefix='!', **cache_profile.bot_options())
 
 # Constants
-OWNER_ID = 486652069831376943  # Replace with your Discord user ID
 TOKEN = os.getenv('DISCORD_TOKEN')
+MESSAGE_LOG_SAMPLE_RATE = float(os.getenv('LOG_MESSAGE_SAMPLE_RATE', '0.01'))  # Share of messages logged
+
+# Reports callbacks that block the event loop (see loop_watchdog.py)
+loop_watchdog = LoopWatchdog()
 
 # Initialize the database
 initialize_db()
@@ -29,7 +48,10 @@ initialize_db()
 async def on_ready():
     """Event triggered when the bot is ready."""
     logger.info(f'Logged in as {bot.user}')
-    await sync_commands()
+    await cache_profile.chunk_required_guilds(bot)
+    logger.info(cache_report(bot))
+    if is_primary_worker():
+        await sync_commands()
 
 async def sync_commands():
     """Sync slash commands with Discord."""
@@ -46,25 +68,65 @@ async def memory_command(ctx):
     """Command to notify users about memory management."""
     await ctx.send("Memory management has been removed from this bot.")
 
+@bot.command(name='shards')
+async def shards_command(ctx):
+    """Owner-only command showing per-shard latency, event rate and guild count."""
+    if ctx.author.id != OWNER_ID:
+        return
+    if not isinstance(bot, ShardedBot):
+        await ctx.send(f"Sharding disabled · latency {bot.latency * 1000:.0f} ms · {len(bot.guilds)} guilds")
+        return
+
+    lines = [
+        f"Shard {shard['shard_id']}: {shard['latency'] * 1000:.0f} ms · {shard['rate']:.1f} ev/s · "
+        f"{shard['guilds']} guilds{' · CLOSED' if shard['closed'] else ''}"
+        for shard in bot.shard_report()
+    ]
+    lines.append(f"Unattributed: {bot.shard_metrics.rate(None):.1f} ev/s")
+    await ctx.send("```\n" + "\n".join(lines) + "\n```")
+
+@bot.command(name='stalls')
+async def stalls_command(ctx, index: int = None):
+    """Owner-only command listing the worst event-loop stalls, or the stack of one of them."""
+    if ctx.author.id != OWNER_ID:
+        return
+    stalls = loop_watchdog.worst()
+    if not stalls:
+        await ctx.send("No event-loop stall recorded.")
+        return
+
+    if index is not None:
+        if not 1 <= index <= len(stalls):
+            await ctx.send(f"Choose a stall between 1 and {len(stalls)}.")
+            return
+        stall = stalls[index - 1]
+        header = f"{stall.duration * 1000:.0f} ms in {stall.task} ({stall.cog}), {stall.started_at:%Y-%m-%d %H:%M:%S} UTC\n"
+        await ctx.send(header + "```\n" + stall.stack[-(1900 - len(header)):] + "\n```")
+        return
+
+    lines = [
+        f"{position}. {stall.duration * 1000:.0f} ms · {stall.cog} · {stall.location} · blocked in {stall.blocking_call}"
+        for position, stall in enumerate(stalls[:10], start=1)
+    ]
+    lines.append(f"{loop_watchdog.total} stalls over {loop_watchdog.threshold * 1000:.0f} ms since startup")
+    await ctx.send("```\n" + "\n".join(lines)[:1900] + "\n```")
+
+@bot.event
+async def on_shard_ready(shard_id: int):
+    """Event triggered when a shard is ready."""
+    logger.info(f"Shard {shard_id} ready")
+
 @bot.event
 async def on_message(message: discord.Message):
     """Event triggered when a message is sent."""
     if message.author != bot.user:
-        logger.info(f"Message from {message.author}: {message.content}")
-
-    # Forward DMs to the bot owner
-    if isinstance(message.channel, discord.DMChannel) and message.author != bot.user:
-        await forward_dm(message)
+        logger.info("Message received", extra=log_extra(
+            message.guild, message.author, message.channel, sample_rate=MESSAGE_LOG_SAMPLE_RATE
+        ))
 
     # Process commands
     await bot.process_commands(message)
 
-async def forward_dm(message: discord.Message):
-    """Forward DMs to the bot owner."""
-    owner = await bot.fetch_user(OWNER_ID)
-    if owner:
-        await owner.send(f"Message from {message.author}: {message.content}")
-
 @bot.event
 async def on_disconnect():
     """Event triggered when the bot disconnects."""
@@ -84,16 +146,8 @@ async def on_close():
 async def close_sessions():
     """Perform cleanup before closing the bot."""
     logger.info("Performing cleanup before closing...")
-
-# List of extensions (cogs) to load
-EXTENSIONS = [
-    'cogs.admin',
-    'cogs.relocate', 'cogs.watermark', 'cogs.talk', 'cogs.role',
-    'cogs.watermark_user', 'cogs.metiers',
-    'cogs.image_converter', 'cogs.startguild', 'cogs.clear',
-    'cogs.alerts', 'cogs.welcomesparta',
-    'cogs.super', 'cogs.translator', 'cogs.voice', 'cogs.rules', 'cogs.write', 'cogs.dofustouch',
-]
+    # Shared by the relocate, write and DM relay cogs, so it outlives cog reloads
+    await attachment_transfers.close()
 
 async def load_extensions():
     """Load all extensions (cogs) listed in EXTENSIONS."""
@@ -110,6 +164,11 @@ async def main():
         # Load extensions
         await load_extensions()
 
+        # Instrument commands, listeners and HTTP calls, then expose /metrics
+        metrics.instrument(bot)
+        await metrics.start_server(bot)
+        loop_watchdog.start(asyncio.get_running_loop())
+
         # Check if the bot token is available
         if not TOKEN:
             logger.error("Bot token not found")
@@ -122,6 +181,8 @@ async def main():
             logger.error("Invalid token")
         except Exception as e:
             logger.exception("Failed to start the bot")
+        finally:
+            await close_sessions()
 
 if __name__ == "__main__":
     try:
@@ -130,3 +191,6 @@ if __name__ == "__main__":
         logger.info("Bot stopped by user")
     except Exception as e:
         logger.exception("Bot encountered an error and stopped")
+    finally:
+        loop_watchdog.stop()
+        log_listener.stop()
@@ -0,0 +1,241 @@
+import asyncio
+import functools
+import logging
+import os
+import time
+from bisect import bisect_left
+from typing import Dict, Iterable, Tuple
+
+from aiohttp import web
+import discord
+
+# Prometheus-style metrics exposed on http://METRICS_HOST:METRICS_PORT/metrics.
+# METRICS_PORT=0 disables the endpoint (metrics are still collected); launcher.py
+# gives each worker its own port, METRICS_PORT + worker index.
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9108"))
+LAG_INTERVAL = 0.5  # Seconds between event-loop lag probes
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+logger = logging.getLogger(__name__)
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{str(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labels: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        registry[name] = self
+
+    def _key(self, labels: dict) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")).replace('"', "'") for name in self.label_names)
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} {self.kind}"
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        self.values[key] = self.values.get(key, 0) + amount
+
+    def render(self):
+        yield from super().render()
+        for key, value in self.values.items():
+            yield f"{self.name}{_format_labels(self.label_names, key)} {value}"
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        self.values[self._key(labels)] = value
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labels: Iterable[str] = (), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(buckets)
+        self.values: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        series = self.values.get(key)
+        if series is None:
+            # One count per bucket, then sum and total count
+            series = self.values[key] = [0] * len(self.buckets) + [0.0, 0]
+        index = bisect_left(self.buckets, value)
+        if index < len(self.buckets):
+            series[index] += 1
+        series[-2] += value
+        series[-1] += 1
+
+    def render(self):
+        yield from super().render()
+        for key, series in self.values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                labels = _format_labels(self.label_names, key, 'le="%s"' % bound)
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = _format_labels(self.label_names, key, 'le="+Inf"')
+            yield f"{self.name}_bucket{labels} {series[-1]}"
+            yield f"{self.name}_sum{_format_labels(self.label_names, key)} {series[-2]}"
+            yield f"{self.name}_count{_format_labels(self.label_names, key)} {series[-1]}"
+
+
+registry: Dict[str, Metric] = {}
+
+COMMAND_DURATION = Histogram("bot_app_command_duration_seconds", "Time from interaction creation to command completion.", ("command", "status"))
+LISTENER_DURATION = Histogram("bot_listener_duration_seconds", "Run time of event listeners.", ("event", "listener"))
+OPERATION_DURATION = Histogram("bot_operation_duration_seconds", "Run time of instrumented operations.", ("operation",))
+HTTP_REQUESTS = Counter("bot_discord_http_requests_total", "Discord HTTP API calls.", ("method", "route"))
+HTTP_RATE_LIMITS = Counter("bot_discord_rate_limits_total", "429 responses received from Discord.", ("scope",))
+LOOP_LAG = Gauge("bot_event_loop_lag_seconds", "Delay of the last event-loop probe.")
+GATEWAY_LATENCY = Gauge("bot_gateway_latency_seconds", "Heartbeat latency to the Discord gateway.")
+
+
+def render() -> str:
+    lines = []
+    for metric in registry.values():
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+def timed(operation: str):
+    """Decorator recording the run time of a coroutine function."""
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                OPERATION_DURATION.observe(time.perf_counter() - started, operation=operation)
+        return wrapper
+    return decorator
+
+
+class TimedListener:
+    """Wraps a cog listener; compares equal to it so remove_listener keeps working."""
+
+    def __init__(self, event: str, func):
+        self.event = event
+        self.func = func
+        self.__name__ = getattr(func, "__name__", event)
+        self.label = getattr(func, "__qualname__", self.__name__)
+
+    async def __call__(self, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return await self.func(*args, **kwargs)
+        finally:
+            LISTENER_DURATION.observe(time.perf_counter() - started, event=self.event, listener=self.label)
+
+    def __eq__(self, other):
+        return self.func == (other.func if isinstance(other, TimedListener) else other)
+
+    def __hash__(self):
+        return hash(self.func)
+
+
+class RateLimitCounter(logging.Handler):
+    """Counts the rate-limit warnings discord.py logs when it receives a 429."""
+
+    def emit(self, record: logging.LogRecord):
+        message = record.getMessage()
+        # Route 429s: "We are being rate limited..."; global ones: "Global rate limit has been hit..."
+        if "rate limited" in message or "rate limit has been hit" in message:
+            HTTP_RATE_LIMITS.inc(scope="global" if "global" in message.lower() else "route")
+
+
+def instrument(bot):
+    """Hook metrics into the bot once every extension is loaded."""
+    for event, listeners in bot.extra_events.items():
+        bot.extra_events[event] = [
+            listener if isinstance(listener, TimedListener) else TimedListener(event, listener)
+            for listener in listeners
+        ]
+
+    async def on_app_command_completion(interaction: discord.Interaction, command):
+        elapsed = (discord.utils.utcnow() - interaction.created_at).total_seconds()
+        COMMAND_DURATION.observe(elapsed, command=command.qualified_name, status="ok")
+    bot.add_listener(on_app_command_completion)
+
+    original_on_error = bot.tree.on_error
+
+    async def on_tree_error(interaction: discord.Interaction, error):
+        command = interaction.command.qualified_name if interaction.command else "unknown"
+        elapsed = (discord.utils.utcnow() - interaction.created_at).total_seconds()
+        COMMAND_DURATION.observe(elapsed, command=command, status="error")
+        await original_on_error(interaction, error)
+    bot.tree.on_error = on_tree_error
+
+    original_request = bot.http.request
+
+    async def request(route, **kwargs):
+        HTTP_REQUESTS.inc(method=route.method, route=route.path)
+        try:
+            return await original_request(route, **kwargs)
+        except discord.HTTPException as e:
+            if e.status == 429:
+                HTTP_RATE_LIMITS.inc(scope="exhausted")
+            raise
+    bot.http.request = request
+
+    logging.getLogger("discord.http").addHandler(RateLimitCounter(logging.WARNING))
+
+
+async def probe_loop_lag(bot):
+    """Measure how late the event loop wakes up compared to the requested sleep."""
+    loop = asyncio.get_running_loop()
+    while not bot.is_closed():
+        started = loop.time()
+        await asyncio.sleep(LAG_INTERVAL)
+        LOOP_LAG.set(max(0.0, loop.time() - started - LAG_INTERVAL))
+        if bot.latency == bot.latency:  # NaN until the first heartbeat
+            GATEWAY_LATENCY.set(bot.latency)
+
+
+async def start_server(bot):
+    """Serve /metrics and start the loop-lag probe."""
+    asyncio.get_running_loop().create_task(probe_loop_lag(bot))
+    if not METRICS_PORT:
+        return None
+
+    async def handle_metrics(request):
+        return web.Response(text=render(), content_type="text/plain", charset="utf-8",
+                            headers={"X-Content-Type-Options": "nosniff"})
+
+    app = web.Application()
+    app.router.add_get("/metrics", handle_metrics)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    try:
+        await web.TCPSite(runner, METRICS_HOST, METRICS_PORT).start()
+    except OSError as e:
+        # Port taken (another worker, another bot): keep running without the endpoint
+        logger.error(f"Could not serve metrics on {METRICS_HOST}:{METRICS_PORT}: {e}")
+        await runner.cleanup()
+        return None
+    logger.info(f"Metrics available on http://{METRICS_HOST}:{METRICS_PORT}/metrics")
+    return runner
@@ -0,0 +1,138 @@
+import discord
+from discord.ext import commands
+import os
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+RATE_WINDOW = 60  # Seconds covered by the per-shard event rate
+
+
+def parse_shard_ids(value: str) -> List[int]:
+    """Parse a shard selection such as '0-3' or '0,2,5'."""
+    shard_ids = []
+    for part in value.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if "-" in part:
+            start, end = part.split("-", 1)
+            shard_ids.extend(range(int(start), int(end) + 1))
+        else:
+            shard_ids.append(int(part))
+    return sorted(set(shard_ids))
+
+
+def shard_for(guild_id: int, shard_count: int) -> int:
+    """Shard that receives the events of a guild."""
+    return (guild_id >> 22) % shard_count
+
+
+def is_primary_worker() -> bool:
+    """Whether this process runs the jobs that must happen once across workers.
+
+    Command sync, panels, backfills and scheduled jobs run in one process
+    only. launcher.py sets BOT_PRIMARY=1 on the worker holding the alliance
+    guild's shard and 0 on the others; a process started on its own is
+    always primary.
+    """
+    return os.getenv("BOT_PRIMARY", "1").lower() in ("1", "true", "yes")
+
+
+def get_shard_config() -> Optional[dict]:
+    """Read the opt-in sharding settings from the environment.
+
+    BOT_SHARDED=1 enables AutoShardedBot. SHARD_COUNT fixes the total number
+    of shards (Discord's recommendation is used otherwise) and SHARD_IDS
+    restricts this process to a range such as '0-3'.
+    """
+    if os.getenv("BOT_SHARDED", "0").lower() not in ("1", "true", "yes"):
+        return None
+    config = {}
+    if os.getenv("SHARD_COUNT"):
+        config["shard_count"] = int(os.getenv("SHARD_COUNT"))
+    if os.getenv("SHARD_IDS"):
+        if "shard_count" not in config:
+            raise ValueError("SHARD_IDS requires SHARD_COUNT")
+        config["shard_ids"] = parse_shard_ids(os.getenv("SHARD_IDS"))
+    return config
+
+
+class ShardMetrics:
+    """Per-shard event counters with a sliding one-minute rate."""
+
+    def __init__(self):
+        self.events: Dict[Optional[int], int] = defaultdict(int)
+        self._buckets: Dict[Optional[int], List[int]] = defaultdict(lambda: [0] * RATE_WINDOW)
+        self._bucket_seconds: Dict[Optional[int], List[int]] = defaultdict(lambda: [0] * RATE_WINDOW)
+
+    def record(self, shard_id: Optional[int]):
+        now = int(time.monotonic())
+        index = now % RATE_WINDOW
+        seconds = self._bucket_seconds[shard_id]
+        buckets = self._buckets[shard_id]
+        if seconds[index] != now:
+            seconds[index] = now
+            buckets[index] = 0
+        buckets[index] += 1
+        self.events[shard_id] += 1
+
+    def rate(self, shard_id: Optional[int]) -> float:
+        """Events per second over the last minute."""
+        now = int(time.monotonic())
+        seconds = self._bucket_seconds[shard_id]
+        buckets = self._buckets[shard_id]
+        return sum(count for count, second in zip(buckets, seconds) if now - second < RATE_WINDOW) / RATE_WINDOW
+
+
+def event_guild_id(args) -> Optional[int]:
+    """Find the guild an event belongs to from its dispatch arguments."""
+    for arg in args:
+        guild_id = getattr(arg, "guild_id", None)
+        if isinstance(guild_id, int):
+            return guild_id
+        guild = getattr(arg, "guild", None)
+        if guild is not None:
+            return guild.id
+        if isinstance(arg, discord.Guild):
+            return arg.id
+    return None
+
+
+class ShardedBot(commands.AutoShardedBot):
+    """AutoShardedBot that attributes every dispatched event to its shard."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.shard_metrics = ShardMetrics()
+
+    def dispatch(self, event_name: str, /, *args, **kwargs):
+        guild_id = event_guild_id(args)
+        shard_id = shard_for(guild_id, self.shard_count) if guild_id is not None and self.shard_count else None
+        self.shard_metrics.record(shard_id)
+        super().dispatch(event_name, *args, **kwargs)
+
+    def shard_report(self) -> List[dict]:
+        """Latency, event rate and guild count of every shard run by this process."""
+        guild_counts = defaultdict(int)
+        for guild in self.guilds:
+            guild_counts[guild.shard_id] += 1
+        return [
+            {
+                "shard_id": shard_id,
+                "latency": shard.latency,
+                "rate": self.shard_metrics.rate(shard_id),
+                "events": self.shard_metrics.events[shard_id],
+                "guilds": guild_counts[shard_id],
+                "closed": shard.is_closed(),
+            }
+            for shard_id, shard in sorted(self.shards.items())
+        ]
+
+
+def create_bot(**options) -> commands.Bot:
+    """Build a plain Bot, or a ShardedBot when sharding is enabled in the environment."""
+    shard_config = get_shard_config()
+    if shard_config is None:
+        return commands.Bot(**options)
+    return ShardedBot(**options, **shard_config)